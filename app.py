@@ -1,51 +1,66 @@
+from collections import OrderedDict
 from functools import wraps
-from flask import Flask, render_template, request, redirect, session, send_from_directory, url_for, jsonify
-from flask_sqlalchemy import SQLAlchemy
+from flask import (
+    Blueprint,
+    Flask,
+    current_app,
+    g,
+    has_request_context,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    send_from_directory,
+    session,
+    stream_with_context,
+    url_for,
+)
+from sqlalchemy import event, func, insert, inspect as sa_inspect, select, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
+import click
+import csv
 import datetime
-import base64
+import heapq
+import hmac
+import io
 import json
+import logging
+import mimetypes
 import os
 import random
-import requests
-import numpy as np
-import smtplib
-from email.message import EmailMessage
 import threading
 import time
-
-try:
-    import cv2
-except Exception:
-    cv2 = None
+import queue
+
+import attendance_archive
+import attendance_stats
+import db_breaker
+import live_events
+import metrics
+import page_cache
+import presence
+import query_profiler
+import search_index
+from models import Announcement, Attendance, Resource, Student, StudentAttendanceStats, User, db
+
+# Heavy subsystems are imported inside the functions that use them so web
+# workers boot without OpenCV/numpy (face), smtplib/requests (notifications,
+# storage) or pypdf (search indexing). tools/check_import_time.py guards this.
 
 load_dotenv()
 
-app = Flask(__name__)
-app.secret_key = os.environ.get("SECRET_KEY", "college_secret_key")
-
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
 NOTES_DIR = os.path.join(BASE_DIR, "notes")
 MODEL_DIR = os.path.join(BASE_DIR, "model")
 FACE_MODEL_PATH = os.path.join(MODEL_DIR, "face_model.xml")
-
-raw_db_url = os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'attendance.db')}")
-if raw_db_url.startswith("postgres://"):
-    raw_db_url = raw_db_url.replace("postgres://", "postgresql://", 1)
-
-if raw_db_url.startswith("postgresql://") and "sslmode=" not in raw_db_url:
-    sep = "&" if "?" in raw_db_url else "?"
-    raw_db_url = f"{raw_db_url}{sep}sslmode=require"
-
-app.config["SQLALCHEMY_DATABASE_URI"] = raw_db_url
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_pre_ping": True,
-    "pool_recycle": 280,
-}
+# Per-section model shards written by train_model.py (see face_dataset.py).
+FACE_SHARDS_DIR = os.path.join(MODEL_DIR, "shards")
 
 AUTH_FILE = "auth_users.json"
 STUDENT_FILE = "student_data.json"
@@ -57,11 +72,102 @@ STUDENT_FILE = os.path.join(BASE_DIR, "student_data.json")
 ANNOUNCEMENT_FILE = os.path.join(BASE_DIR, "announcements.json")
 SYLLABUS_FILE = os.path.join(BASE_DIR, "syllabus.json")
 
-os.makedirs(UPLOADS_DIR, exist_ok=True)
-os.makedirs(NOTES_DIR, exist_ok=True)
-os.makedirs(MODEL_DIR, exist_ok=True)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = int(float(os.environ.get("MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+
+# Optional hand-off of PDF bodies to the front proxy: "x-accel" (nginx) or "x-sendfile" (Apache/lighttpd).
+FILE_SENDFILE_MODE = os.environ.get("FILE_SENDFILE_MODE", "").strip().lower()
+X_ACCEL_PREFIX = os.environ.get("X_ACCEL_PREFIX", "/protected-files").rstrip("/")
+# Length of the content-hash prefix in ?v= links; only that exact prefix earns the immutable cache header.
+RESOURCE_VERSION_CHARS = 16
+
+
+def _database_url():
+    raw_db_url = os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'attendance.db')}")
+    if raw_db_url.startswith("postgres://"):
+        raw_db_url = raw_db_url.replace("postgres://", "postgresql://", 1)
+
+    if raw_db_url.startswith("postgresql://") and "sslmode=" not in raw_db_url:
+        sep = "&" if "?" in raw_db_url else "?"
+        raw_db_url = f"{raw_db_url}{sep}sslmode=require"
+    if raw_db_url.startswith("postgresql://") and "connect_timeout=" not in raw_db_url:
+        # Bound how long an unreachable database can hold a worker before the breaker counts it.
+        raw_db_url = f"{raw_db_url}&connect_timeout={int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))}"
+    return raw_db_url
+
+
+bp = Blueprint("portal", __name__, cli_group=None)
+
+HTTP_REQUEST_SECONDS = metrics.Histogram(
+    "campusnexus_http_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method", "status")
+)
+DB_QUERIES_PER_REQUEST = metrics.Histogram(
+    "campusnexus_db_queries_per_request", "SQL statements executed per request.", ("endpoint",), metrics.COUNT_BUCKETS
+)
+DB_SECONDS_PER_REQUEST = metrics.Histogram(
+    "campusnexus_db_seconds_per_request", "Total SQL execution time per request.", ("endpoint",)
+)
+DB_RETRIES = metrics.Counter(
+    "campusnexus_db_retries_total", "OperationalErrors seen by _query_with_retry.", ("outcome",)
+)
+
+
+DB_BREAKER_TRANSITIONS = metrics.Counter(
+    "campusnexus_db_breaker_transitions_total", "Database circuit breaker state changes.", ("state",)
+)
+STALE_READS = metrics.Counter(
+    "campusnexus_stale_reads_total", "Views served from the last good data during a database outage.", ("view",)
+)
+
+
+def _breaker_changed(state):
+    DB_BREAKER_TRANSITIONS.inc(state=state)
+    logging.getLogger(__name__).warning("Database circuit breaker %s", state)
+
+
+DB_BREAKER = db_breaker.CircuitBreaker(
+    failure_threshold=int(os.environ.get("DB_BREAKER_FAILURES", "5")),
+    probe_interval=float(os.environ.get("DB_BREAKER_PROBE_SECONDS", "10")),
+    on_change=_breaker_changed,
+)
+
+
+def _probe_database(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+@event.listens_for(Engine, "do_connect")
+def _breaker_gate(dialect, conn_rec, cargs, cparams):
+    if not DB_BREAKER.allow():
+        raise db_breaker.DatabaseUnavailable("Database unavailable (circuit open); not connecting.")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_BREAKER.record_success()
+    if has_request_context() and "sql_count" in g:
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _sql_failed(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+    # Connect failures and dropped connections count toward the breaker; query errors do not.
+    lost = conn is None or exception_context.is_disconnect
+    if lost and not isinstance(exception_context.original_exception, db_breaker.DatabaseUnavailable):
+        engine = exception_context.engine
+        DB_BREAKER.record_failure(lambda: _probe_database(engine))
 
-db = SQLAlchemy(app)
 
 def _query_with_retry(fn, *, retries=2, delay_seconds=0.7):
     """Small retry for transient DB connectivity issues (Render cold starts, pool hiccups)."""
@@ -71,59 +177,14 @@ def _query_with_retry(fn, *, retries=2, delay_seconds=0.7):
             return fn()
         except OperationalError as exc:
             last_exc = exc
-            app.logger.warning("DB OperationalError (attempt %s/%s): %s", attempt, retries, exc)
-            if attempt < retries:
+            DB_RETRIES.inc(outcome="retry" if attempt < retries else "exhausted")
+            current_app.logger.warning("DB OperationalError (attempt %s/%s): %s", attempt, retries, exc)
+            if attempt < retries and DB_BREAKER.allow():
                 time.sleep(delay_seconds * attempt)
     # Re-raise after final attempt so callers can handle consistently.
     raise last_exc  # type: ignore[misc]
 
 
-class Student(db.Model):
-    __tablename__ = "students"
-    student_id = db.Column(db.String(40), primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
-    branch = db.Column(db.String(80), nullable=True)
-    year = db.Column(db.String(50), nullable=True)
-
-
-class User(db.Model):
-    __tablename__ = "users"
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    username = db.Column(db.String(100), nullable=False, index=True)
-    password = db.Column(db.String(200), nullable=False)
-    role = db.Column(db.String(20), nullable=False, index=True)
-    name = db.Column(db.String(120), nullable=True)
-    linked_student_id = db.Column(db.String(40), db.ForeignKey("students.student_id"), nullable=True)
-
-
-class Attendance(db.Model):
-    __tablename__ = "attendance"
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    student_id = db.Column(db.String(40), db.ForeignKey("students.student_id"), nullable=False, index=True)
-    date = db.Column(db.String(10), nullable=False, index=True)
-    time = db.Column(db.String(8), nullable=False)
-
-
-class Announcement(db.Model):
-    __tablename__ = "announcements"
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    title = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text, nullable=False)
-    date = db.Column(db.String(10), nullable=False)
-
-
-class Resource(db.Model):
-    __tablename__ = "resources"
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    kind = db.Column(db.String(30), nullable=False, index=True)  # notes or syllabus
-    subject = db.Column(db.String(200), nullable=True)
-    topic = db.Column(db.String(200), nullable=True)
-    file_name = db.Column(db.String(300), nullable=False)
-    storage_path = db.Column(db.String(500), nullable=False)
-    file_url = db.Column(db.String(1000), nullable=True)
-    uploaded_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
-
-
 DEFAULT_AUTH_USERS = {
     "admins": {
         "admin": {
@@ -150,23 +211,23 @@ def load_json(file, default):
         return json.load(f)
 
 
-def _is_truthy(value):
-    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+_STUDENT_CONTACT_FIELDS = ("email", "phone", "parent_email", "parent_phone")
 
 
 def _get_student_contact_targets(student_id):
-    data = load_json(STUDENT_FILE, {})
-    info = data.get(str(student_id), {})
+    # Identity-map lookup: free when the caller already loaded the Student rows.
+    student = db.session.get(Student, str(student_id))
+    info = {"name": student.name} if student else {}
     emails = []
     phones = []
 
     for key in ("email", "parent_email"):
-        val = str(info.get(key, "")).strip()
+        val = str(getattr(student, key, None) or "").strip()
         if val:
             emails.append(val)
 
     for key in ("phone", "parent_phone"):
-        val = str(info.get(key, "")).strip()
+        val = str(getattr(student, key, None) or "").strip()
         if val:
             phones.append(val)
 
@@ -176,54 +237,8 @@ def _get_student_contact_targets(student_id):
     return emails, phones, info
 
 
-def _send_email_notification(to_email, subject, message):
-    smtp_host = os.environ.get("SMTP_HOST", "").strip()
-    smtp_port = int(os.environ.get("SMTP_PORT", "587"))
-    smtp_user = os.environ.get("SMTP_USER", "").strip()
-    smtp_pass = os.environ.get("SMTP_PASS", "").strip()
-    smtp_from = os.environ.get("SMTP_FROM", smtp_user).strip()
-    use_tls = _is_truthy(os.environ.get("SMTP_USE_TLS", "true"))
-
-    if not (smtp_host and smtp_user and smtp_pass and smtp_from):
-        return False, "SMTP not configured"
-
-    try:
-        msg = EmailMessage()
-        msg["Subject"] = subject
-        msg["From"] = smtp_from
-        msg["To"] = to_email
-        msg.set_content(message)
-
-        with smtplib.SMTP(smtp_host, smtp_port, timeout=20) as server:
-            if use_tls:
-                server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.send_message(msg)
-        return True, "sent"
-    except Exception as exc:
-        return False, f"email error: {exc}"
-
-
-def _send_sms_notification(to_phone, message):
-    account_sid = os.environ.get("TWILIO_ACCOUNT_SID", "").strip()
-    auth_token = os.environ.get("TWILIO_AUTH_TOKEN", "").strip()
-    from_phone = os.environ.get("TWILIO_FROM_PHONE", "").strip()
-
-    if not (account_sid and auth_token and from_phone):
-        return False, "Twilio not configured"
-
-    try:
-        url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
-        payload = {"From": from_phone, "To": to_phone, "Body": message}
-        resp = requests.post(url, data=payload, auth=(account_sid, auth_token), timeout=20)
-        if resp.status_code in (200, 201):
-            return True, "sent"
-        return False, f"sms error: {resp.status_code}"
-    except Exception as exc:
-        return False, f"sms error: {exc}"
-
-
-def send_attendance_notifications(student_id, status, date_text, time_text=""):
+def send_attendance_notifications(student_id, status, date_text, time_text="", synced_at=None):
+    """Email/SMS the student's contacts. `synced_at` marks a kiosk capture that reached the server late."""
     emails, phones, info = _get_student_contact_targets(student_id)
     student_name = info.get("name") or student_id
     status_text = "PRESENT" if status == "present" else "ABSENT"
@@ -235,26 +250,14 @@ def send_attendance_notifications(student_id, status, date_text, time_text=""):
     )
     if time_text:
         message += f"Time: {time_text}\n"
+    if synced_at:
+        message += f"Recorded offline by a kiosk; received {synced_at:%Y-%m-%d %H:%M}.\n"
 
-    subject = f"Attendance {status_text}: {student_name}"
-    result = {
-        "emails_sent": 0,
-        "sms_sent": 0,
-        "emails_total": len(emails),
-        "sms_total": len(phones),
-    }
+    subject = f"Attendance {status_text}{' (late sync)' if synced_at else ''}: {student_name}"
 
-    for email in emails:
-        ok, _ = _send_email_notification(email, subject, message)
-        if ok:
-            result["emails_sent"] += 1
-
-    for phone in phones:
-        ok, _ = _send_sms_notification(phone, message)
-        if ok:
-            result["sms_sent"] += 1
+    import notifications
 
-    return result
+    return notifications.deliver(emails, phones, subject, message)
 
 
 def current_role():
@@ -274,19 +277,65 @@ def require_roles(*roles):
     return decorator
 
 
+def require_api_roles(*roles):
+    """require_roles for JSON endpoints: 401 instead of a redirect to the login page."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            if current_role() not in roles:
+                return jsonify({"ok": False, "message": "Login required."}), 401
+            return view_func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Shared secret for services (camera_ingest.py) that post marks without a teacher session.
+ATTENDANCE_INGEST_TOKEN = os.environ.get("ATTENDANCE_INGEST_TOKEN", "").strip()
+
+
+def require_roles_or_ingest_token(*roles):
+    """require_roles, or `Authorization: Bearer <ATTENDANCE_INGEST_TOKEN>` from an ingestion service."""
+
+    def decorator(view_func):
+        with_session = require_roles(*roles)(view_func)
+
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            supplied = request.headers.get("Authorization", "")
+            if ATTENDANCE_INGEST_TOKEN and hmac.compare_digest(supplied, f"Bearer {ATTENDANCE_INGEST_TOKEN}"):
+                return view_func(*args, **kwargs)
+            return with_session(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 def seed_data():
     students_data = load_json(STUDENT_FILE, {})
 
+    # student_data.json only bootstraps the roster; the DB is the source of truth
+    # afterwards and new batches come in through the roster import.
     for sid, info in students_data.items():
-        if not Student.query.filter_by(student_id=sid).first():
+        contacts = {key: str(info.get(key, "")).strip() or None for key in _STUDENT_CONTACT_FIELDS}
+        student = Student.query.filter_by(student_id=sid).first()
+        if not student:
             db.session.add(
                 Student(
                     student_id=sid,
                     name=info.get("name", "Student"),
                     branch=info.get("branch", ""),
                     year=info.get("year", ""),
+                    **contacts,
                 )
             )
+        elif not any(getattr(student, key) for key in _STUDENT_CONTACT_FIELDS):
+            # Rows created before contacts moved into the DB.
+            for key, value in contacts.items():
+                setattr(student, key, value)
 
     db.session.commit()
 
@@ -380,17 +429,53 @@ def seed_data():
         db.session.commit()
 
 
+# create_all() only creates missing tables; columns/indexes added to existing
+# tables after first deploy are applied here (both statements are idempotent).
+_SCHEMA_COLUMN_UPGRADES = [
+    ("resources", "content_hash", "VARCHAR(64)"),
+    ("students", "email", "VARCHAR(200)"),
+    ("students", "phone", "VARCHAR(40)"),
+    ("students", "parent_email", "VARCHAR(200)"),
+    ("students", "parent_phone", "VARCHAR(40)"),
+    ("attendance", "kiosk_id", "VARCHAR(64)"),
+]
+_SCHEMA_INDEX_UPGRADES = [
+    "CREATE INDEX IF NOT EXISTS ix_resources_content_hash ON resources (content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_resources_kind_uploaded_at ON resources (kind, uploaded_at)",
+    "CREATE INDEX IF NOT EXISTS ix_resources_file_name ON resources (file_name)",
+    "CREATE INDEX IF NOT EXISTS ix_announcements_date_id ON announcements (date, id)",
+]
+
+
+def _ensure_schema_upgrades():
+    inspector = sa_inspect(db.engine)
+    for table, column, ddl in _SCHEMA_COLUMN_UPGRADES:
+        existing = {col["name"] for col in inspector.get_columns(table)}
+        if column not in existing:
+            db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    for statement in _SCHEMA_INDEX_UPGRADES:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
 def init_db():
-    with app.app_context():
-        try:
-            db.create_all()
-            seed_data()
-            return True
-        except Exception as exc:
-            # Keep web process alive even if DB is temporarily unreachable.
-            # This allows Render health checks and manual retry without crash loops.
-            app.logger.error("Database init failed at startup: %s", exc)
-            return False
+    try:
+        db.create_all()
+        _ensure_schema_upgrades()
+        attendance_archive.ensure_partitions(db.engine)
+        search_index.ensure_search_schema(db.engine)
+        seed_data()
+        attendance_stats.ensure_populated(db.session)
+        PRESENCE.warm(datetime.date.today().strftime("%Y-%m-%d"))
+        return True
+    except Exception as exc:
+        # Keep web process alive even if DB is temporarily unreachable.
+        # This allows Render health checks and manual retry without crash loops.
+        # Roll back so the request that triggered init (e.g. a worker losing the
+        # seeding race to another worker) can still use the session.
+        db.session.rollback()
+        current_app.logger.error("Database init failed at startup: %s", exc)
+        return False
 
 
 _db_initialized = False
@@ -405,7 +490,7 @@ def ensure_db_initialized():
     global _db_init_next_retry_at
     if _db_initialized:
         return
-    if time.time() < _db_init_next_retry_at:
+    if time.time() < _db_init_next_retry_at or not DB_BREAKER.allow():
         return
     with _db_init_lock:
         if _db_initialized:
@@ -421,97 +506,437 @@ def ensure_db_initialized():
         except Exception:
             _db_init_next_retry_at = time.time() + _db_init_backoff_seconds
             try:
-                app.logger.exception("Lazy DB init failed")
+                current_app.logger.exception("Lazy DB init failed")
             except Exception:
                 pass
 
 
-@app.before_request
+@bp.before_app_request
+def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+
+
+@bp.after_app_request
+def _record_request_metrics(response):
+    if "request_started" in g:
+        endpoint = request.endpoint or "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - g.request_started,
+            endpoint=endpoint,
+            method=request.method,
+            status=response.status_code,
+        )
+        DB_QUERIES_PER_REQUEST.observe(g.sql_count, endpoint=endpoint)
+        DB_SECONDS_PER_REQUEST.observe(g.sql_seconds, endpoint=endpoint)
+    return response
+
+
+@bp.before_app_request
 def _lazy_db_init_hook():
-    if request.path in ("/healthz", "/favicon.ico"):
+    if request.path in ("/healthz", "/metrics", "/favicon.ico"):
         return
     ensure_db_initialized()
 
 
-@app.context_processor
+@bp.app_context_processor
 def inject_session_data():
     return {
         "session_role": session.get("role"),
         "session_display_name": session.get("display_name"),
         "parent_students": session.get("parent_students", []),
+        "page_cache_render": g.get("page_cache_render", False),
+        "stale_data_since": g.get("stale_data_since"),
+        "resource_url": resource_url,
     }
 
 
+def resource_url(resource_id, content_hash=None):
+    """Link to a stored resource, versioned by its content hash when known."""
+    url = f"/resource/{resource_id}"
+    return f"{url}?v={content_hash[:RESOURCE_VERSION_CHARS]}" if content_hash else url
+
+
+def _upload_target_dir(folder):
+    if folder == "uploads":
+        return UPLOADS_DIR
+    if folder == "notes":
+        return NOTES_DIR
+    return os.path.join(BASE_DIR, folder)
+
+
 def store_uploaded_file(file_obj, folder):
+    import storage
+
     file_name = secure_filename(file_obj.filename)
     if not file_name:
-        return None, None, None
+        return None, None, None, None
+
+    # Spool to disk next to the final location so memory stays flat and the
+    # local fallback is a single atomic rename.
+    target_dir = _upload_target_dir(folder)
+    tmp_path, size, sha256 = storage.stream_upload_to_temp(file_obj, target_dir, MAX_UPLOAD_BYTES)
+    blob_path = storage.blob_relpath(sha256)
+
+    config = storage.supabase_config()
+    if config:
+        storage_path = f"{folder}/{blob_path}"
+        public_url = storage.public_url(config, storage_path)
+
+        # Same bytes already in the bucket: the new Resource row just points at it.
+        if Resource.query.filter_by(content_hash=sha256, storage_path=storage_path).first():
+            storage.remove_quietly(tmp_path)
+            return file_name, storage_path, public_url, sha256
+
+        ok, error = storage.upload_to_bucket(
+            config, storage_path, tmp_path, size, file_obj.mimetype or "application/pdf"
+        )
+        if ok:
+            storage.remove_quietly(tmp_path)
+            return file_name, storage_path, public_url, sha256
+        current_app.logger.warning("Storage upload failed, keeping local copy: %s", error)
 
-    content = file_obj.read()
+    return file_name, storage.store_local_blob(tmp_path, target_dir, sha256), None, sha256
 
-    supabase_url = os.environ.get("SUPABASE_URL")
-    service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-    bucket = os.environ.get("SUPABASE_STORAGE_BUCKET")
 
-    if supabase_url and service_key and bucket:
-        unique_name = f"{datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{file_name}"
-        storage_path = f"{folder}/{unique_name}"
-        endpoint = f"{supabase_url}/storage/v1/object/{bucket}/{storage_path}"
+def gc_unreferenced_blobs(grace_seconds=3600, dry_run=False):
+    """Delete content-addressed blobs no Resource row points at. Returns the removed paths."""
+    import storage
 
-        headers = {
-            "apikey": service_key,
-            "Authorization": f"Bearer {service_key}",
-            "x-upsert": "true",
-            "Content-Type": file_obj.mimetype or "application/pdf",
-        }
+    referenced = {
+        row.content_hash for row in db.session.query(Resource.content_hash).filter(Resource.content_hash.isnot(None))
+    }
+    cutoff = time.time() - grace_seconds
+    removed = []
+
+    for base_dir in (UPLOADS_DIR, NOTES_DIR):
+        blob_root = os.path.join(base_dir, "blobs")
+        for dirpath, _dirnames, filenames in os.walk(blob_root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                # Grace period so we never race an upload whose row is not committed yet.
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                removed.append(path)
+                if not dry_run:
+                    storage.remove_quietly(path)
+
+    config = storage.supabase_config()
+    if config:
+        # Same grace period; an object without a listed date is treated as new.
+        stale = [
+            path
+            for folder in ("uploads", "notes")
+            for path, modified in storage.list_bucket_objects(config, f"{folder}/blobs")
+            if path.rsplit("/", 1)[-1] not in referenced and modified is not None and modified <= cutoff
+        ]
+        removed.extend(stale)
+        if stale and not dry_run:
+            storage.delete_bucket_objects(config, stale)
+
+    return removed
+
+
+@bp.cli.command("gc-blobs")
+@click.option("--dry-run", is_flag=True, help="List unreferenced blobs without deleting them.")
+@click.option("--grace-seconds", default=3600, show_default=True, help="Skip blobs (local and bucket) newer than this.")
+def gc_blobs_command(dry_run, grace_seconds):
+    """Remove stored files that no notes/syllabus resource references."""
+    for path in gc_unreferenced_blobs(grace_seconds=grace_seconds, dry_run=dry_run):
+        click.echo(("would remove " if dry_run else "removed ") + path)
+
+
+def _resource_base_folder(resource):
+    return UPLOADS_DIR if resource.kind == "syllabus" else NOTES_DIR
+
+
+def _index_resource(resource):
+    """Extract a resource's PDF text and (re)index it. Runs off the request path."""
+    import storage
+
+    tmp_path = None
+    local_path = safe_join(_resource_base_folder(resource), resource.storage_path)
+    if resource.file_url:
+        tmp_path = local_path = storage.download_to_temp(resource.file_url)
+    try:
+        body = search_index.extract_pdf_text(local_path) if local_path and os.path.isfile(local_path) else ""
+        search_index.index_document(db.engine, resource.id, resource.kind, resource.subject, resource.topic, body)
+    finally:
+        if tmp_path:
+            storage.remove_quietly(tmp_path)
 
-        response = requests.post(endpoint, headers=headers, data=content, timeout=40)
-        if response.status_code in (200, 201):
-            public_url = f"{supabase_url}/storage/v1/object/public/{bucket}/{storage_path}"
-            return file_name, storage_path, public_url
 
-    if folder == "uploads":
-        target_dir = UPLOADS_DIR
-    elif folder == "notes":
-        target_dir = NOTES_DIR
-    else:
-        target_dir = os.path.join(BASE_DIR, folder)
-    os.makedirs(target_dir, exist_ok=True)
-    local_path = os.path.join(target_dir, file_name)
-    with open(local_path, "wb") as f:
-        f.write(content)
+_SEARCH_INDEX_QUEUE = queue.Queue()
+_search_index_thread = None
+_search_index_thread_lock = threading.Lock()
+
+
+def _search_index_worker():
+    while True:
+        flask_app, resource_id = _SEARCH_INDEX_QUEUE.get()
+        try:
+            with flask_app.app_context():
+                resource = db.session.get(Resource, resource_id)
+                if resource:
+                    _index_resource(resource)
+        except Exception:
+            flask_app.logger.exception("Search indexing failed for resource %s", resource_id)
+        finally:
+            _SEARCH_INDEX_QUEUE.task_done()
 
-    return file_name, file_name, None
 
+def queue_resource_indexing(resource_id):
+    # Started lazily so each gunicorn worker gets its own thread after fork.
+    global _search_index_thread
+    with _search_index_thread_lock:
+        if _search_index_thread is None or not _search_index_thread.is_alive():
+            _search_index_thread = threading.Thread(target=_search_index_worker, name="search-index", daemon=True)
+            _search_index_thread.start()
+    _SEARCH_INDEX_QUEUE.put((current_app._get_current_object(), resource_id))
 
-def get_selected_student_for_view(requested_sid=None):
-    role = current_role()
 
-    if role == "student":
-        sid = session.get("student")
-        student = Student.query.filter_by(student_id=sid).first()
-        return sid, student
+@bp.cli.command("rebuild-attendance-stats")
+def rebuild_attendance_stats_command():
+    """Recompute student_attendance_stats from the attendance table and archive files."""
+    ensure_db_initialized()
+    written = attendance_stats.rebuild(db.session)
+    db.session.commit()
+    click.echo(f"rebuilt attendance counters for {written} students")
+
+
+@bp.cli.command("import-roster")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry-run", is_flag=True, help="Validate and report without saving anything.")
+def import_roster_command(csv_path, dry_run):
+    """Upsert students, contacts and logins from a roster CSV."""
+    import roster_import
+
+    ensure_db_initialized()
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        report = roster_import.import_roster(db.session, f, dry_run=dry_run)
+    for error in report["errors"]:
+        click.echo(f"line {error['line']} {error['student_id'] or '-'}: {error['message']}", err=True)
+    for warning in report["warnings"]:
+        click.echo(f"warning: {warning}", err=True)
+    click.echo(
+        f"{'validated' if dry_run else 'imported'} {report['valid_rows']}/{report['rows']} rows: "
+        f"{report['students_inserted']} students inserted, {report['students_updated']} updated, "
+        f"{report['accounts_created']} logins created, {report['accounts_updated']} updated, "
+        f"{report['error_count']} errors"
+    )
+    if report["error_count"]:
+        raise SystemExit(1)
+
+
+@bp.cli.command("reindex-search")
+def reindex_search_command():
+    """Rebuild the full-text index for every notes/syllabus resource."""
+    resources = Resource.query.order_by(Resource.id).all()
+    for resource in resources:
+        try:
+            _index_resource(resource)
+        except Exception as exc:
+            click.echo(f"failed {resource.id} {resource.file_name}: {exc}")
+    click.echo(f"indexed {len(resources)} resources")
 
+
+def _selected_student_id(requested_sid=None):
+    role = current_role()
+    if role == "student":
+        return session.get("student")
     if role == "parent":
         parent_students = session.get("parent_students", [])
-        sid = requested_sid if requested_sid in parent_students else (parent_students[0] if parent_students else None)
-        student = Student.query.filter_by(student_id=sid).first() if sid else None
-        return sid, student
+        return requested_sid if requested_sid in parent_students else (parent_students[0] if parent_students else None)
+    return None
 
-    return None, None
+
+def get_selected_student_for_view(requested_sid=None):
+    sid = _selected_student_id(requested_sid)
+    student = Student.query.filter_by(student_id=sid).first() if sid else None
+    return sid, student
 
 
-@app.route("/")
+CATALOG_PAGE_SIZE = 20
+CATALOG_CACHE_TTL_SECONDS = float(os.environ.get("CATALOG_CACHE_TTL", "60"))
+CATALOG_CACHE_MAX_ENTRIES = 512
+
+STALE_READ_MAX_ENTRIES = int(os.environ.get("STALE_READ_MAX_ENTRIES", "2048"))
+
+# Last good result of each read-only view's queries, served (marked stale) when
+# the database fails or the circuit breaker is open.
+_STALE_READS = {"entries": OrderedDict(), "lock": threading.Lock()}
+
+
+def _read_with_stale_fallback(view, key, loader):
+    """Return (value, stale): loader()'s result, or the last good one while the database is failing."""
+    try:
+        value = loader()
+    except SQLAlchemyError:
+        db.session.rollback()
+        with _STALE_READS["lock"]:
+            hit = _STALE_READS["entries"].get((view, key))
+        if hit is None:
+            raise
+        STALE_READS.inc(view=view)
+        if has_request_context():
+            g.stale_data_since = min(g.get("stale_data_since") or hit[0], hit[0])
+        return hit[1], True
+
+    with _STALE_READS["lock"]:
+        entries = _STALE_READS["entries"]
+        entries[(view, key)] = (datetime.datetime.now(), value)
+        entries.move_to_end((view, key))
+        while len(entries) > STALE_READ_MAX_ENTRIES:
+            entries.popitem(last=False)
+    return value, False
+
+
+# Notes/syllabus/announcement listings change a few times a week but are read
+# constantly. Writes in this process bump the version; the TTL bounds how long
+# other gunicorn workers can serve a listing from before the write.
+_CATALOG_CACHE = {"version": 0, "entries": {}, "lock": threading.Lock()}
+
+
+def invalidate_catalog():
+    with _CATALOG_CACHE["lock"]:
+        _CATALOG_CACHE["version"] += 1
+        _CATALOG_CACHE["entries"].clear()
+    PAGE_CACHE.bump_version()
+
+
+def _catalog_cached(key, loader):
+    now = time.time()
+    with _CATALOG_CACHE["lock"]:
+        version = _CATALOG_CACHE["version"]
+        hit = _CATALOG_CACHE["entries"].get(key)
+        if hit and hit[0] == version and hit[1] > now:
+            return hit[2]
+
+    value, stale = _read_with_stale_fallback("catalog", key, loader)
+
+    with _CATALOG_CACHE["lock"]:
+        # Drop results loaded across an invalidation; they may predate the write.
+        if _CATALOG_CACHE["version"] == version and not stale:
+            entries = _CATALOG_CACHE["entries"]
+            if len(entries) >= CATALOG_CACHE_MAX_ENTRIES:
+                entries.clear()
+            entries[key] = (version, now + CATALOG_CACHE_TTL_SECONDS, value)
+    return value
+
+
+# Rendered student/parent pages whose content only depends on role + catalog data.
+PAGE_CACHE = page_cache.PageCache(
+    max_entries=int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.environ.get("PAGE_CACHE_TTL", "60")),
+    backend=page_cache.backend_from_url(os.environ.get("PAGE_CACHE_BACKEND", "")),
+)
+_SESSION_BAR_MARKER = "<!--page-cache:session-bar-->"
+
+
+def cached_page(view_func):
+    """Cache a view's HTML per role/path/query/data version; the per-user navbar is rendered per request."""
+
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        args_key = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        key = "|".join((current_role() or "", request.path, args_key, PAGE_CACHE.version()))
+        uncached = {}
+
+        def render():
+            g.page_cache_render = True
+            try:
+                response = make_response(view_func(*args, **kwargs))
+            finally:
+                g.page_cache_render = False
+            if response.status_code != 200 or response.mimetype != "text/html":
+                uncached["response"] = response
+                return None
+            if g.get("stale_data_since"):
+                # Built from stale data during an outage: serve it, but do not cache it.
+                uncached["html"] = response.get_data(as_text=True)
+                return None
+            return response.get_data(as_text=True)
+
+        html = PAGE_CACHE.get_or_render(key, render) or uncached.get("html")
+        if html is None:
+            return uncached.get("response") or view_func(*args, **kwargs)
+        return html.replace(_SESSION_BAR_MARKER, render_template("_session_bar.html"), 1)
+
+    return wrapper
+
+
+def _page_arg():
+    try:
+        return max(int(request.args.get("page", 1)), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _paginate(query, page):
+    total = query.count()
+    rows = query.limit(CATALOG_PAGE_SIZE).offset((page - 1) * CATALOG_PAGE_SIZE).all()
+    pages = max((total + CATALOG_PAGE_SIZE - 1) // CATALOG_PAGE_SIZE, 1)
+    return rows, {"page": page, "pages": pages, "total": total}
+
+
+def load_resource_catalog(kind, page=1, subject=None, topic=None):
+    """One page of notes/syllabus as plain dicts (safe to share across requests)."""
+
+    def load():
+        query = Resource.query.filter_by(kind=kind)
+        if subject:
+            query = query.filter(Resource.subject == subject)
+        if topic:
+            query = query.filter(Resource.topic == topic)
+        rows, pagination = _paginate(query.order_by(Resource.uploaded_at.desc(), Resource.id.desc()), page)
+        pagination["items"] = [
+            {
+                "id": r.id,
+                "kind": r.kind,
+                "subject": r.subject,
+                "topic": r.topic,
+                "file_name": r.file_name,
+                "content_hash": r.content_hash,
+            }
+            for r in rows
+        ]
+        return pagination
+
+    return _catalog_cached(("resources", kind, page, subject, topic), load)
+
+
+def load_resource_subjects(kind):
+    def load():
+        rows = db.session.query(Resource.subject).filter_by(kind=kind).distinct().order_by(Resource.subject).all()
+        return [row.subject for row in rows if row.subject]
+
+    return _catalog_cached(("subjects", kind), load)
+
+
+def load_announcement_catalog(page=1):
+    def load():
+        query = Announcement.query.order_by(Announcement.date.desc(), Announcement.id.desc())
+        rows, pagination = _paginate(query, page)
+        pagination["items"] = [
+            {"id": a.id, "title": a.title, "description": a.description, "date": a.date} for a in rows
+        ]
+        return pagination
+
+    return _catalog_cached(("announcements", page), load)
+
+
+@bp.route("/")
 def home():
     return redirect("/login")
 
 
-@app.route("/login")
+@bp.route("/login")
 def login_portal():
     return render_template("login_portal.html")
 
 
-@app.route("/login/student", methods=["GET", "POST"])
+@bp.route("/login/student", methods=["GET", "POST"])
 def login_student():
     if request.method == "POST":
         sid = request.form["student_id"].strip()
@@ -520,7 +945,7 @@ def login_student():
         try:
             user = _query_with_retry(lambda: User.query.filter_by(role="student", username=sid).first())
         except SQLAlchemyError:
-            app.logger.exception("DB error during student login")
+            current_app.logger.exception("DB error during student login")
             return render_template("login_student.html", error="Server busy. Please try again in a few seconds.")
 
         if user and user.password == password:
@@ -535,7 +960,7 @@ def login_student():
     return render_template("login_student.html")
 
 
-@app.route("/login/parent", methods=["GET", "POST"])
+@bp.route("/login/parent", methods=["GET", "POST"])
 def login_parent():
     if request.method == "POST":
         username = request.form["username"].strip()
@@ -544,7 +969,7 @@ def login_parent():
         try:
             parent_rows = _query_with_retry(lambda: User.query.filter_by(role="parent", username=username).all())
         except SQLAlchemyError:
-            app.logger.exception("DB error during parent login")
+            current_app.logger.exception("DB error during parent login")
             return render_template("login_parent.html", error="Server busy. Please try again in a few seconds.")
         if parent_rows and parent_rows[0].password == password:
             linked_students = [row.linked_student_id for row in parent_rows if row.linked_student_id]
@@ -561,7 +986,7 @@ def login_parent():
     return render_template("login_parent.html")
 
 
-@app.route("/login/teacher", methods=["GET", "POST"])
+@bp.route("/login/teacher", methods=["GET", "POST"])
 def login_teacher():
     if request.method == "POST":
         username = request.form["username"].strip()
@@ -570,7 +995,7 @@ def login_teacher():
         try:
             user = _query_with_retry(lambda: User.query.filter_by(role="teacher", username=username).first())
         except SQLAlchemyError:
-            app.logger.exception("DB error during teacher login")
+            current_app.logger.exception("DB error during teacher login")
             return render_template("login_teacher.html", error="Server busy. Please try again in a few seconds.")
         if user and user.password == password:
             session.clear()
@@ -584,7 +1009,7 @@ def login_teacher():
     return render_template("login_teacher.html")
 
 
-@app.route("/login/admin", methods=["GET", "POST"])
+@bp.route("/login/admin", methods=["GET", "POST"])
 def login_admin():
     if request.method == "POST":
         username = request.form["username"].strip()
@@ -593,7 +1018,7 @@ def login_admin():
         try:
             user = _query_with_retry(lambda: User.query.filter_by(role="admin", username=username).first())
         except SQLAlchemyError:
-            app.logger.exception("DB error during admin login")
+            current_app.logger.exception("DB error during admin login")
             return render_template("login_admin.html", error="Server busy. Please try again in a few seconds.")
         if user and user.password == password:
             session.clear()
@@ -607,73 +1032,78 @@ def login_admin():
     return render_template("login_admin.html")
 
 
-@app.route("/student/dashboard")
+@bp.route("/student/dashboard")
 @require_roles("student", "parent")
 def student_dashboard():
-    requested_sid = request.args.get("student_id")
-    sid, student = get_selected_student_for_view(requested_sid)
-
-    if not sid or not student:
+    sid = _selected_student_id(request.args.get("student_id"))
+    data = None
+    if sid:
+        data, _ = _read_with_stale_fallback("student_dashboard", sid, lambda: _student_dashboard_data(sid))
+    if not data:
         return render_template("dashboard_student.html", no_data=True)
+    return render_template("dashboard_student.html", selected_student_id=sid, no_data=False, **data)
+
+
+def _student_dashboard_data(sid):
+    # One primary-key read: the student and their counters (student_attendance_stats).
+    row = db.session.execute(
+        select(Student, StudentAttendanceStats)
+        .outerjoin(StudentAttendanceStats, StudentAttendanceStats.student_id == Student.student_id)
+        .where(Student.student_id == sid)
+    ).first()
+    if row is None:
+        return None
+    student, stats = row
+    view = attendance_stats.dashboard_view(stats, datetime.date.today().strftime("%Y-%m-%d"))
+    return {
+        "student": {"name": student.name, "branch": student.branch, "year": student.year},
+        "today_status": "Present ✅" if view["present_today"] else "Absent ❌",
+        "total_records": view["total"],
+        "this_month_records": view["this_month"],
+        "latest_mark": view["latest_mark"],
+        "streak": view["streak"],
+    }
 
-    today = datetime.date.today().strftime("%Y-%m-%d")
-    month_key = datetime.date.today().strftime("%Y-%m")
-
-    present_today = Attendance.query.filter_by(student_id=sid, date=today).count()
-    total_records = Attendance.query.filter_by(student_id=sid).count()
-    this_month_records = Attendance.query.filter(
-        Attendance.student_id == sid, Attendance.date.like(f"{month_key}%")
-    ).count()
-    latest = (
-        Attendance.query.filter_by(student_id=sid)
-        .order_by(Attendance.date.desc(), Attendance.time.desc())
-        .first()
-    )
-
-    status = "Present ✅" if present_today else "Absent ❌"
 
-    return render_template(
-        "dashboard_student.html",
-        student=student,
-        selected_student_id=sid,
-        today_status=status,
-        total_records=total_records,
-        this_month_records=this_month_records,
-        latest_mark=(latest.date, latest.time) if latest else None,
-        no_data=False,
+@bp.route("/parent/dashboard")
+@require_roles("parent")
+def parent_dashboard():
+    parent_students = tuple(session.get("parent_students", []))
+    child_rows, _ = _read_with_stale_fallback(
+        "parent_dashboard", parent_students, lambda: _parent_dashboard_rows(parent_students)
     )
+    return render_template("dashboard_parent.html", children=child_rows)
 
 
-@app.route("/parent/dashboard")
-@require_roles("parent")
-def parent_dashboard():
-    parent_students = session.get("parent_students", [])
+def _parent_dashboard_rows(parent_students):
     today = datetime.date.today().strftime("%Y-%m-%d")
+    rows = db.session.execute(
+        select(Student, StudentAttendanceStats)
+        .outerjoin(StudentAttendanceStats, StudentAttendanceStats.student_id == Student.student_id)
+        .where(Student.student_id.in_(parent_students))
+    ).all()
+    by_id = {child.student_id: (child, stats) for child, stats in rows}
 
     child_rows = []
     for sid in parent_students:
-        child = Student.query.filter_by(student_id=sid).first()
-        if not child:
+        if sid not in by_id:
             continue
-
-        total = Attendance.query.filter_by(student_id=sid).count()
-        present_today = Attendance.query.filter_by(student_id=sid, date=today).count()
-
+        child, stats = by_id[sid]
+        view = attendance_stats.dashboard_view(stats, today)
         child_rows.append(
             {
                 "id": sid,
                 "name": child.name,
                 "branch": child.branch or "-",
                 "year": child.year or "-",
-                "total": total,
-                "today_status": "Present ✅" if present_today else "Absent ❌",
+                "total": view["total"],
+                "today_status": "Present ✅" if view["present_today"] else "Absent ❌",
             }
         )
-
-    return render_template("dashboard_parent.html", children=child_rows)
+    return child_rows
 
 
-@app.route("/student/attendance")
+@bp.route("/student/attendance")
 @require_roles("student", "parent")
 def student_attendance():
     requested_sid = request.args.get("student_id")
@@ -688,6 +1118,9 @@ def student_attendance():
         .all()
     )
     attendance_rows = [(row.date, row.time) for row in rows]
+    archived = [(date, time_text) for date, time_text, _ in attendance_archive.iter_archived(student_id=sid)]
+    if archived:
+        attendance_rows = sorted(attendance_rows + archived, reverse=True)
 
     return render_template(
         "student_attendance.html",
@@ -697,13 +1130,14 @@ def student_attendance():
     )
 
 
-@app.route("/routine")
+@bp.route("/routine")
 @require_roles("student", "parent")
+@cached_page
 def routine():
     return render_template("routine.html")
 
 
-@app.route("/activity")
+@bp.route("/activity")
 @require_roles("student", "parent")
 def activity():
     return render_template(
@@ -719,37 +1153,65 @@ def activity():
     )
 
 
-@app.route("/notes")
+@bp.route("/notes")
 @require_roles("student", "parent")
+@cached_page
 def notes():
-    resources = Resource.query.filter_by(kind="notes").order_by(Resource.uploaded_at.desc()).all()
-    return render_template("notes.html", resources=resources)
+    subject = request.args.get("subject", "").strip() or None
+    topic = request.args.get("topic", "").strip() or None
+    catalog = load_resource_catalog("notes", _page_arg(), subject, topic)
+    return render_template(
+        "notes.html",
+        resources=catalog["items"],
+        pagination=catalog,
+        subjects=load_resource_subjects("notes"),
+        selected_subject=subject,
+        selected_topic=topic,
+    )
 
 
-@app.route("/announcements")
+@bp.route("/announcements")
 @require_roles("student", "parent")
+@cached_page
 def announcements():
-    data = Announcement.query.order_by(Announcement.date.desc(), Announcement.id.desc()).all()
-    return render_template("announcements.html", announcements=data)
+    catalog = load_announcement_catalog(_page_arg())
+    return render_template("announcements.html", announcements=catalog["items"], pagination=catalog)
 
 
-@app.route("/curriculum")
+@bp.route("/curriculum")
 @require_roles("student", "parent")
+@cached_page
 def curriculum():
-    resources = Resource.query.filter_by(kind="syllabus").order_by(Resource.uploaded_at.desc()).all()
-    return render_template("curriculum.html", resources=resources)
+    subject = request.args.get("subject", "").strip() or None
+    catalog = load_resource_catalog("syllabus", _page_arg(), subject)
+    return render_template(
+        "curriculum.html",
+        resources=catalog["items"],
+        pagination=catalog,
+        subjects=load_resource_subjects("syllabus"),
+        selected_subject=subject,
+    )
 
 
-@app.route("/teacher/dashboard")
-@require_roles("teacher", "admin")
-def teacher_dashboard():
-    total_students = Student.query.count()
-    total_records = Attendance.query.count()
+@bp.route("/search")
+@require_roles("student", "parent")
+def search_resources():
+    query = request.args.get("q", "").strip()
+    kind = request.args.get("kind") if request.args.get("kind") in ("notes", "syllabus") else None
+
+    results = []
+    if query:
+        hits = search_index.search(db.engine, query, kind=kind, limit=30)
+        by_id = {r.id: r for r in Resource.query.filter(Resource.id.in_([h["resource_id"] for h in hits])).all()}
+        results = [(by_id[h["resource_id"]], h["snippet"]) for h in hits if h["resource_id"] in by_id]
+
+    return render_template("search.html", query=query, kind=kind, results=results)
 
-    today = datetime.date.today().strftime("%Y-%m-%d")
-    today_attendance = db.session.query(Attendance.student_id).filter_by(date=today).distinct().count()
-    today_absent = max(total_students - today_attendance, 0)
 
+@bp.route("/teacher/dashboard")
+@require_roles("teacher", "admin")
+def teacher_dashboard():
+    counts = _dashboard_counts()
     recent_rows = (
         Attendance.query.order_by(Attendance.date.desc(), Attendance.time.desc()).limit(10).all()
     )
@@ -759,226 +1221,426 @@ def teacher_dashboard():
 
     return render_template(
         "dashboard_teacher.html",
-        total_students=total_students,
-        total_records=total_records,
-        today_attendance=today_attendance,
-        today_absent=today_absent,
+        total_students=counts["total_students"],
+        total_records=counts["total_records"],
+        today_attendance=counts["today_present"],
+        today_absent=counts["today_absent"],
         recent_records=recent_records,
         status_msg=status_msg,
         error_msg=error_msg,
+        live_updates=LIVE_DASHBOARD_ENABLED,
     )
 
 
-@app.route("/mark-attendance")
+def _dashboard_counts():
+    total_students = Student.query.count()
+    total_records = Attendance.query.count() + attendance_archive.archived_count()
+
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    today_present = db.session.query(Attendance.student_id).filter_by(date=today).distinct().count()
+    return {
+        "date": today,
+        "total_students": total_students,
+        "total_records": total_records,
+        "today_present": today_present,
+        "today_absent": max(total_students - today_present, 0),
+    }
+
+
+LIVE_DASHBOARD_ENABLED = os.environ.get("LIVE_DASHBOARD", "true").strip().lower() not in {"0", "false", "no", "off"}
+LIVE_STREAM_MAX_SECONDS = float(os.environ.get("LIVE_STREAM_MAX_SECONDS", "300"))
+# Open streams per worker; each holds a thread, so keep this below gunicorn --threads.
+LIVE_STREAM_MAX_CLIENTS = int(os.environ.get("LIVE_STREAM_MAX_CLIENTS", "4"))
+LIVE_STREAM_HEARTBEAT_SECONDS = 15.0
+LIVE_EVENTS = live_events.EventHub(live_events.broker_from_url(os.environ.get("LIVE_EVENTS_BACKEND", "")))
+LIVE_STREAMS_REFUSED = metrics.Counter(
+    "campusnexus_live_streams_refused_total", "Dashboard streams refused because the worker's stream limit was reached."
+)
+
+
+def publish_attendance_mark(student_id, student_name, date_text, time_text):
+    """Push a newly committed mark for today to open teacher dashboards.
+
+    Callers only publish a student's first mark of the day, so tabs adjust
+    their counts by the delta; nothing is recounted on the write path.
+    """
+    if not LIVE_DASHBOARD_ENABLED:
+        return
+    # Without a relay, streams only live in this worker; with one, publishing is a single Redis call.
+    if LIVE_EVENTS.broker is None and not LIVE_EVENTS.subscriber_count():
+        return
+    try:
+        LIVE_EVENTS.publish(
+            "mark",
+            {
+                "student_id": student_id,
+                "name": student_name,
+                "date": date_text,
+                "time": time_text,
+                "delta": {"total_records": 1, "today_present": 1, "today_absent": -1},
+            },
+        )
+    except Exception:
+        current_app.logger.exception("Live dashboard publish failed")
+
+
+@bp.route("/teacher/dashboard/events")
+@require_roles("teacher", "admin")
+def teacher_dashboard_events():
+    # Each open stream holds a worker thread; on a sync worker it would hold the
+    # whole worker, so answer 204 (EventSource stops retrying) and let the page
+    # fall back to normal reloads.
+    # The same 204 caps open streams per worker so kiosk requests always find a thread.
+    if not LIVE_DASHBOARD_ENABLED or not request.environ.get("wsgi.multithread"):
+        return "", 204
+    sub = LIVE_EVENTS.subscribe(limit=LIVE_STREAM_MAX_CLIENTS)
+    if sub is None:
+        LIVE_STREAMS_REFUSED.inc()
+        return "", 204
+    try:
+        counts = _dashboard_counts()
+    except Exception:
+        LIVE_EVENTS.unsubscribe(sub)
+        raise
+
+    def stream():
+        try:
+            # Browsers reconnect after `retry` ms; fresh counts cover marks made in between.
+            yield "retry: 3000\n\n"
+            yield live_events.format_sse("counts", counts)
+
+            deadline = time.monotonic() + LIVE_STREAM_MAX_SECONDS
+            while not sub.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                item = sub.get(timeout=min(LIVE_STREAM_HEARTBEAT_SECONDS, remaining))
+                if item is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_id, event, data = item
+                yield live_events.format_sse(event, data, event_id)
+        finally:
+            LIVE_EVENTS.unsubscribe(sub)
+
+    response = current_app.response_class(stream_with_context(stream()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: flush each event
+    return response
+
+
+@bp.route("/mark-attendance")
 @require_roles("teacher", "admin")
 def mark_attendance():
     # On cloud hosting (Render), server has no physical webcam.
     if os.environ.get("RENDER") == "true":
         return redirect("/teacher/dashboard?error=Cloud server has no camera. Use manual attendance below.")
 
-    if cv2 is None or not os.path.exists(FACE_MODEL_PATH):
-        return redirect("/teacher/dashboard?error=Face model not found. Train model locally first.")
-
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(FACE_MODEL_PATH)
-
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-
-    cam = cv2.VideoCapture(0)
-    if not cam.isOpened():
-        return redirect("/teacher/dashboard?error=Camera not available. Check local camera permissions.")
+    import face
 
-    show_preview = True
-    start_time = datetime.datetime.now()
-    timeout_seconds = 20
-
-    while True:
-        if (datetime.datetime.now() - start_time).total_seconds() > timeout_seconds:
-            break
+    if face.cv2 is None or not os.path.exists(FACE_MODEL_PATH):
+        return redirect("/teacher/dashboard?error=Face model not found. Train model locally first.")
 
-        ret, frame = cam.read()
-        if not ret or frame is None:
-            continue
+    sid, err = face.scan_local_camera(FACE_MODEL_PATH, timeout_seconds=20)
+    if err:
+        return redirect(f"/teacher/dashboard?error={err}")
+    if sid is None:
+        return redirect("/teacher/dashboard")
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    ok, msg = _mark_attendance_once(sid)
+    if ok:
+        return redirect(f"/teacher/dashboard?status={msg}")
+    return redirect(f"/teacher/dashboard?error={msg}")
 
-        for (x, y, w, h) in faces:
-            label, _ = recognizer.predict(gray[y: y + h, x: x + w])
-            sid = str(label)
-            ok, msg = _mark_attendance_once(sid)
 
-            cam.release()
-            try:
-                cv2.destroyAllWindows()
-            except cv2.error:
-                pass
-            if ok:
-                return redirect(f"/teacher/dashboard?status={msg}")
-            return redirect(f"/teacher/dashboard?error={msg}")
+def _load_present_ids(day):
+    return [sid for (sid,) in db.session.query(Attendance.student_id).filter_by(date=day).distinct()]
 
-        if show_preview:
-            try:
-                cv2.imshow("Face Attendance", frame)
-                key = cv2.waitKey(1) & 0xFF
-                if key in (13, 27):
-                    break
-            except cv2.error:
-                show_preview = False
 
-    cam.release()
-    try:
-        cv2.destroyAllWindows()
-    except cv2.error:
-        pass
-    return redirect("/teacher/dashboard")
-
-
-def _load_face_tools():
-    # Cache face tools so we don't reload model/cascade every request (faster + more stable).
-    if cv2 is None:
-        return None, None, "OpenCV is not available on server."
-    if not hasattr(cv2, "face"):
-        return None, None, "OpenCV face module is not available."
-    if not os.path.exists(FACE_MODEL_PATH):
-        return None, None, "Face model not found. Train model locally first."
-
-    global _FACE_TOOLS_CACHE
-    try:
-        mtime = os.path.getmtime(FACE_MODEL_PATH)
-    except Exception:
-        mtime = None
+def _load_known_ids():
+    return [sid for (sid,) in db.session.query(Student.student_id)]
 
-    with _FACE_TOOLS_CACHE["lock"]:
-        if _FACE_TOOLS_CACHE["recognizer"] is not None and _FACE_TOOLS_CACHE["cascade"] is not None:
-            if _FACE_TOOLS_CACHE["mtime"] == mtime:
-                return _FACE_TOOLS_CACHE["recognizer"], _FACE_TOOLS_CACHE["cascade"], None
 
-        recognizer = cv2.face.LBPHFaceRecognizer_create()
-        recognizer.read(FACE_MODEL_PATH)
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-        if face_cascade.empty():
-            return None, None, "Face detector could not be loaded."
+PRESENCE = presence.PresenceSet(
+    _load_present_ids,
+    _load_known_ids,
+    backend=presence.backend_from_url(os.environ.get("PRESENCE_BACKEND", "")),
+)
+PRESENCE_LOOKUPS = metrics.Counter(
+    "campusnexus_presence_lookups_total", "Mark-path lookups answered by the presence set.", ("kind", "result")
+)
 
-        _FACE_TOOLS_CACHE["recognizer"] = recognizer
-        _FACE_TOOLS_CACHE["cascade"] = face_cascade
-        _FACE_TOOLS_CACHE["mtime"] = mtime
-        return recognizer, face_cascade, None
 
+def _mark_attendance_once(student_id, kiosk_id=None):
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    if PRESENCE.is_present(today, student_id):
+        PRESENCE_LOOKUPS.inc(kind="present", result="hit")
+        return True, "Attendance already marked for today."
+    PRESENCE_LOOKUPS.inc(kind="present", result="miss")
 
-def _mark_attendance_once(student_id):
-    student = Student.query.filter_by(student_id=student_id).first()
+    # get() reuses the row _is_known_student loaded for this request, if any.
+    student = db.session.get(Student, student_id)
     if not student:
         return False, "Student ID not found."
 
-    today = datetime.date.today().strftime("%Y-%m-%d")
     exists_today = Attendance.query.filter_by(student_id=student_id, date=today).first()
     if exists_today:
+        PRESENCE.mark_present(today, student_id)
         return True, "Attendance already marked for today."
 
     now = datetime.datetime.now()
-    db.session.add(
-        Attendance(
-            student_id=student_id,
-            date=now.strftime("%Y-%m-%d"),
-            time=now.strftime("%H:%M:%S"),
-        )
-    )
+    mark = {"student_id": student_id, "date": now.strftime("%Y-%m-%d"), "time": now.strftime("%H:%M:%S")}
+    db.session.add(Attendance(kiosk_id=kiosk_id, **mark))
+    attendance_stats.record_marks(db.session, [mark])
     db.session.commit()
+    PRESENCE.mark_present(now.strftime("%Y-%m-%d"), student_id)
+    publish_attendance_mark(student_id, student.name, now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"))
     send_attendance_notifications(student_id, "present", now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"))
     return True, "Attendance marked successfully."
 
 
-def _normalize_face_roi(face_roi):
-    resized = cv2.resize(face_roi, (200, 200))
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(resized)
-    return cv2.GaussianBlur(enhanced, (3, 3), 0)
+def _is_known_student(student_id):
+    if PRESENCE.is_known(student_id):
+        PRESENCE_LOOKUPS.inc(kind="known", result="hit")
+        return True
+    PRESENCE_LOOKUPS.inc(kind="known", result="miss")
+    if db.session.get(Student, student_id) is None:
+        return False
+    PRESENCE.add_known(student_id)
+    return True
 
 
-_FACE_TOOLS_CACHE = {"recognizer": None, "cascade": None, "mtime": None, "lock": threading.Lock()}
+def _is_known_student_or_assume(student_id):
+    # With the database down, trust the model's label; the sync re-checks the roster.
+    try:
+        return _is_known_student(student_id)
+    except SQLAlchemyError:
+        db.session.rollback()
+        return True
+
+
+OFFLINE_SYNC_MAX_EVENTS = 500
+OFFLINE_SYNC_MAX_AGE_DAYS = float(os.environ.get("OFFLINE_SYNC_MAX_AGE_DAYS", "7"))
+OFFLINE_SYNC_MAX_CLOCK_SKEW_SECONDS = 300
+# Marks captured longer ago than this are notified as a late sync, not as a live "present".
+OFFLINE_SYNC_LATE_NOTICE_MINUTES = float(os.environ.get("OFFLINE_SYNC_LATE_NOTICE_MINUTES", "15"))
+OFFLINE_SYNC_EVENTS = metrics.Counter(
+    "campusnexus_offline_sync_events_total", "Queued kiosk events received by the sync endpoint.", ("status",)
+)
+# Serializes syncs so a kiosk retrying an in-flight batch cannot insert the same mark twice.
+_SYNC_LOCK = threading.Lock()
+_SYNC_ADVISORY_LOCK_KEY = 7_340_042
+
+
+def _parse_sync_event(raw, now):
+    """Return (event, error) for one queued kiosk event."""
+    if not isinstance(raw, dict):
+        return None, "event must be an object"
+    sid = str(raw.get("student_id") or "").strip()
+    if not sid or len(sid) > 40:
+        return None, "student_id is required"
+    captured = raw.get("captured_at")
+    if isinstance(captured, bool) or not isinstance(captured, (int, float)):
+        return None, "captured_at must be epoch milliseconds"
+    try:
+        captured_at = datetime.datetime.fromtimestamp(captured / 1000)
+    except (OverflowError, OSError, ValueError):
+        return None, "captured_at is out of range"
+    if captured_at > now + datetime.timedelta(seconds=OFFLINE_SYNC_MAX_CLOCK_SKEW_SECONDS):
+        return None, "captured_at is in the future"
+    if captured_at < now - datetime.timedelta(days=OFFLINE_SYNC_MAX_AGE_DAYS):
+        return None, f"captured_at is older than {OFFLINE_SYNC_MAX_AGE_DAYS:g} days"
+    kiosk_id = str(raw.get("kiosk_id") or "").strip()[:64] or None
+    return {"student_id": sid, "captured_at": captured_at, "kiosk_id": kiosk_id}, None
+
+
+def _ingest_attendance_events(raw_events):
+    """Insert queued kiosk marks in one transaction, keeping each event's capture time.
+
+    Idempotent: a student already marked on the capture's date (by an earlier
+    sync, or online) is reported as a duplicate. Returns one result per event.
+    """
+    now = datetime.datetime.now()
+    results = []
+    parsed = []
+    for index, raw in enumerate(raw_events):
+        event_id = raw.get("event_id") if isinstance(raw, dict) else None
+        results.append({"event_id": str(event_id)[:64] if event_id else None})
+        event, error = _parse_sync_event(raw, now)
+        if error:
+            results[index].update(status="invalid", message=error)
+        else:
+            parsed.append((index, event))
+
+    new_rows = {}
+    names = {}
+    if parsed:
+        with _SYNC_LOCK:
+            if db.engine.dialect.name == "postgresql":
+                db.session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SYNC_ADVISORY_LOCK_KEY})
+            ids = {event["student_id"] for _, event in parsed}
+            dates = {event["captured_at"].strftime("%Y-%m-%d") for _, event in parsed}
+            names = dict(
+                db.session.execute(select(Student.student_id, Student.name).where(Student.student_id.in_(ids))).all()
+            )
+            marked = set(
+                db.session.execute(
+                    select(Attendance.student_id, Attendance.date).where(
+                        Attendance.student_id.in_(ids), Attendance.date.in_(dates)
+                    )
+                ).all()
+            )
+            # Earliest capture of the day wins when a batch repeats a student.
+            for index, event in sorted(parsed, key=lambda item: item[1]["captured_at"]):
+                sid = event["student_id"]
+                key = (sid, event["captured_at"].strftime("%Y-%m-%d"))
+                if sid not in names:
+                    results[index].update(status="unknown_student", message="Student ID not found.")
+                elif key in marked or key in new_rows:
+                    results[index].update(status="duplicate", message="Attendance already marked for that day.")
+                else:
+                    new_rows[key] = {
+                        "student_id": sid,
+                        "date": key[1],
+                        "time": event["captured_at"].strftime("%H:%M:%S"),
+                        "kiosk_id": event["kiosk_id"],
+                    }
+                    results[index].update(status="marked", message="Attendance marked.")
+            if new_rows:
+                db.session.execute(insert(Attendance), list(new_rows.values()))
+                attendance_stats.record_marks(db.session, new_rows.values())
+            db.session.commit()
+
+    for result in results:
+        OFFLINE_SYNC_EVENTS.inc(status=result["status"])
+    if new_rows:
+        today = now.strftime("%Y-%m-%d")
+        for row in sorted(new_rows.values(), key=lambda r: (r["date"], r["time"])):
+            if row["date"] == today:
+                PRESENCE.mark_present(today, row["student_id"])
+                publish_attendance_mark(row["student_id"], names[row["student_id"]], row["date"], row["time"])
+            captured_at = datetime.datetime.strptime(f"{row['date']} {row['time']}", "%Y-%m-%d %H:%M:%S")
+            late = now - captured_at > datetime.timedelta(minutes=OFFLINE_SYNC_LATE_NOTICE_MINUTES)
+            send_attendance_notifications(
+                row["student_id"], "present", row["date"], row["time"], synced_at=now if late else None
+            )
+    return results
 
 
-def _recognize_student_from_frame(frame, recognizer, face_cascade):
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    gray = cv2.equalizeHist(gray)
-    faces = face_cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.15,
-        minNeighbors=6,
-        minSize=(80, 80),
-    )
-    if len(faces) == 0:
-        return None, None, "No face detected. Keep face centered and closer to camera."
-    if len(faces) > 1:
-        return None, None, "Multiple faces detected. Keep only one face in frame."
+@bp.route("/teacher/attendance/sync", methods=["POST"])
+@require_roles_or_ingest_token("teacher", "admin")
+def sync_offline_attendance():
+    payload = request.get_json(silent=True) or {}
+    events = payload.get("events")
+    if not isinstance(events, list):
+        return jsonify({"ok": False, "message": "Expected {\"events\": [...]}."}), 400
+    if len(events) > OFFLINE_SYNC_MAX_EVENTS:
+        return jsonify({"ok": False, "message": f"At most {OFFLINE_SYNC_MAX_EVENTS} events per batch."}), 413
 
-    x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
-    normalized_roi = _normalize_face_roi(gray[y: y + h, x: x + w])
-    sid_label, confidence = recognizer.predict(normalized_roi)
-    sid = str(sid_label)
+    try:
+        results = _ingest_attendance_events(events)
+    except SQLAlchemyError:
+        db.session.rollback()
+        current_app.logger.exception("Offline attendance sync failed")
+        # Nothing was saved; the kiosk keeps its queue and retries.
+        return jsonify({"ok": False, "offline": True, "message": "Database unavailable."}), 503
 
-    if confidence > 68:
-        return None, float(confidence), "Face not recognized. Move closer and face the camera directly."
-    if not Student.query.filter_by(student_id=sid).first():
-        return None, float(confidence), "Recognized face does not match a valid student."
-    return sid, float(confidence), None
+    summary = {status: 0 for status in ("marked", "duplicate", "unknown_student", "invalid")}
+    for result in results:
+        summary[result["status"]] += 1
+    return jsonify({"ok": True, "results": results, **summary})
 
 
-@app.route("/teacher/face-attendance")
-@require_roles("teacher", "admin")
-def teacher_face_attendance():
-    is_cloud = os.environ.get("RENDER") == "true"
-    return render_template("face_attendance.html", is_cloud=is_cloud)
+_FACE_SECTIONS_CACHE = {"sections": {}, "mtime": None}
 
 
-def _recognize_student_with_lighting_fallback(frame, recognizer, face_cascade):
-    # Baseline + a few brightness shifts to handle poor lighting quickly.
-    sid, conf, err = _recognize_student_from_frame(frame, recognizer, face_cascade)
-    if sid:
-        return sid, conf, None
+def _face_sections():
+    """{section: {"branch", "year", "students", "samples"}} for the trained section shards."""
+    path = os.path.join(FACE_SHARDS_DIR, "index.json")
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _FACE_SECTIONS_CACHE["mtime"] != mtime:
+        _FACE_SECTIONS_CACHE["sections"] = load_json(path, {}).get("sections", {})
+        _FACE_SECTIONS_CACHE["mtime"] = mtime
+    return _FACE_SECTIONS_CACHE["sections"]
 
-    for beta in (-25, 25, 45):
-        adjusted = cv2.convertScaleAbs(frame, alpha=1.0, beta=beta)
-        sid2, conf2, err2 = _recognize_student_from_frame(adjusted, recognizer, face_cascade)
-        if sid2:
-            return sid2, conf2, None
-        if conf is None and conf2 is not None:
-            conf = conf2
-        if not err and err2:
-            err = err2
 
-    return None, conf, err or "Face not recognized. Try better lighting/angle."
+@bp.route("/teacher/face-attendance")
+@require_roles("teacher", "admin")
+def teacher_face_attendance():
+    is_cloud = os.environ.get("RENDER") == "true"
+    sections = sorted(_face_sections().items(), key=lambda item: (item[1]["branch"], item[1]["year"]))
+    return render_template("face_attendance.html", is_cloud=is_cloud, sections=sections)
 
 
-@app.route("/teacher/face-attendance/verify", methods=["POST"])
+@bp.route("/teacher/face-attendance/verify", methods=["POST"])
 @require_roles("teacher", "admin")
 def teacher_face_attendance_verify():
-    recognizer, face_cascade, err = _load_face_tools()
+    import face
+
+    payload = request.get_json(silent=True) or {}
+    # A kiosk set to a section only compares against that section's students.
+    section = str(payload.get("section") or "").strip()
+    model_path = FACE_MODEL_PATH
+    if section:
+        if section not in _face_sections():
+            return jsonify({"ok": False, "message": "No face model for this section. Retrain the model."}), 400
+        model_path = os.path.join(FACE_SHARDS_DIR, f"{section}.xml")
+
+    with face.RECOGNITION_STAGE_SECONDS.time(stage="load_tools"):
+        recognizer, face_detector, err = face.load_face_tools(model_path)
     if err:
         return jsonify({"ok": False, "message": err}), 400
 
-    payload = request.get_json(silent=True) or {}
     image_data = payload.get("image", "")
     if not image_data or "," not in image_data:
         return jsonify({"ok": False, "message": "Invalid image payload."}), 400
 
     try:
-        encoded = image_data.split(",", 1)[1]
-        frame_bytes = base64.b64decode(encoded)
-        frame_array = np.frombuffer(frame_bytes, dtype=np.uint8)
-        frame = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
+        with face.RECOGNITION_STAGE_SECONDS.time(stage="decode"):
+            frame = face.decode_data_url_frame(image_data)
     except Exception:
         return jsonify({"ok": False, "message": "Failed to decode image."}), 400
 
     if frame is None:
         return jsonify({"ok": False, "message": "Empty frame received."}), 400
 
-    best_sid, best_conf, recog_err = _recognize_student_with_lighting_fallback(frame, recognizer, face_cascade)
+    with face.RECOGNITION_STAGE_SECONDS.time(stage="recognize_total"):
+        best_sid, best_conf, recog_err = face.recognize_student_with_lighting_fallback(
+            frame,
+            recognizer,
+            face_detector,
+            _is_known_student_or_assume,
+            thresholds=face.load_thresholds(model_path),
+        )
     if not best_sid:
         return jsonify({"ok": False, "message": recog_err or "Face not recognized."}), 200
 
-    ok, msg = _mark_attendance_once(best_sid)
+    kiosk_id = str(payload.get("kiosk_id") or "").strip()[:64] or None
+    captured_at = payload.get("captured_at")
+    try:
+        with face.RECOGNITION_STAGE_SECONDS.time(stage="mark"):
+            if captured_at is not None:
+                # A frame the kiosk queued while the server was unreachable.
+                result = _ingest_attendance_events(
+                    [{"student_id": best_sid, "captured_at": captured_at, "kiosk_id": kiosk_id}]
+                )[0]
+                ok, msg = result["status"] in ("marked", "duplicate"), result["message"]
+            else:
+                ok, msg = _mark_attendance_once(best_sid, kiosk_id=kiosk_id)
+    except SQLAlchemyError:
+        db.session.rollback()
+        current_app.logger.warning("Mark for %s deferred to the kiosk queue: database unavailable", best_sid)
+        return jsonify(
+            {
+                "ok": False,
+                "offline": True,
+                "student_id": best_sid,
+                "message": f"Recognized {best_sid}; saved on this device until the database is back.",
+            }
+        ), 503
     return jsonify(
         {
             "ok": ok,
@@ -989,7 +1651,7 @@ def teacher_face_attendance_verify():
     )
 
 
-@app.route("/mark-attendance-manual", methods=["POST"])
+@bp.route("/mark-attendance-manual", methods=["POST"])
 @require_roles("teacher", "admin")
 def mark_attendance_manual():
     sid = request.form.get("student_id", "").strip()
@@ -1001,7 +1663,7 @@ def mark_attendance_manual():
     return redirect(f"/teacher/dashboard?error={msg}")
 
 
-@app.route("/teacher/send-absent-alerts", methods=["POST"])
+@bp.route("/teacher/send-absent-alerts", methods=["POST"])
 @require_roles("teacher", "admin")
 def send_absent_alerts():
     today = datetime.date.today().strftime("%Y-%m-%d")
@@ -1019,51 +1681,195 @@ def send_absent_alerts():
     return redirect(f"/teacher/dashboard?status=Absent alerts sent for {notified} students.")
 
 
-@app.route("/teacher/monthly-graph")
+@bp.route("/teacher/monthly-graph")
 @require_roles("teacher", "admin")
 def teacher_monthly_graph():
-    rows = Attendance.query.all()
-    months = {}
-
-    for row in rows:
-        m = row.date[:7]
-        months[m] = months.get(m, 0) + 1
+    # Aggregate in the DB instead of loading every attendance row.
+    month = func.substr(Attendance.date, 1, 7)
+    counts = attendance_archive.archived_month_counts()
+    for key, count in db.session.query(month, func.count(Attendance.id)).group_by(month).all():
+        counts[key] = counts.get(key, 0) + count
+    months = sorted(counts)
 
     return render_template(
         "monthly_graph.html",
-        bar_labels=list(months.keys()),
-        bar_values=list(months.values()),
+        bar_labels=months,
+        bar_values=[counts[m] for m in months],
+    )
+
+
+EXPORT_BATCH_ROWS = 1000
+EXPORT_HEADER = ("Date", "Time", "Student ID", "Name", "Branch", "Year")
+_EXPORT_MIMETYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _parse_export_date(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    return datetime.datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def _attendance_export_rows(start, end, branch, year):
+    live = _live_export_rows(start, end, branch, year)
+    if not attendance_archive.has_archived(start, end):
+        return live
+    archived = _archived_export_rows(start, end, branch, year)
+    return heapq.merge(archived, live, key=lambda row: (row[0], row[1]))
+
+
+def _archived_export_rows(start, end, branch, year):
+    students = {
+        sid: (name, student_branch, student_year)
+        for sid, name, student_branch, student_year in db.session.execute(
+            select(Student.student_id, Student.name, Student.branch, Student.year)
+        )
+    }
+    for date, time_text, sid in attendance_archive.iter_archived(start=start, end=end):
+        name, student_branch, student_year = students.get(sid, (None, None, None))
+        if branch and student_branch != branch:
+            continue
+        if year and student_year != year:
+            continue
+        yield date, time_text, sid, name, student_branch, student_year
+
+
+def _live_export_rows(start, end, branch, year):
+    query = (
+        select(Attendance.date, Attendance.time, Attendance.student_id, Student.name, Student.branch, Student.year)
+        .select_from(Attendance)
+        .outerjoin(Student, Student.student_id == Attendance.student_id)
+        .order_by(Attendance.date, Attendance.time, Attendance.id)
     )
+    # Dates are stored as YYYY-MM-DD strings, so string comparison is date order.
+    if start:
+        query = query.where(Attendance.date >= start)
+    if end:
+        query = query.where(Attendance.date <= end)
+    if branch:
+        query = query.where(Student.branch == branch)
+    if year:
+        query = query.where(Student.year == year)
+
+    # yield_per turns on a server-side cursor (stream_results) on Postgres, so
+    # rows are fetched in batches instead of being buffered by the driver.
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+    try:
+        for row in result:
+            yield tuple(row)
+    finally:
+        result.close()
+
+
+@bp.route("/teacher/export")
+@require_roles("teacher", "admin")
+def export_attendance():
+    fmt = request.args.get("format", "").strip().lower()
+    if not fmt:
+        branches = [b for (b,) in db.session.query(Student.branch).distinct().order_by(Student.branch) if b]
+        years = [y for (y,) in db.session.query(Student.year).distinct().order_by(Student.year) if y]
+        return render_template("export_attendance.html", branches=branches, years=years)
+    if fmt not in _EXPORT_MIMETYPES:
+        return "Unsupported export format", 400
+
+    try:
+        start = _parse_export_date(request.args.get("start"))
+        end = _parse_export_date(request.args.get("end"))
+    except ValueError:
+        return "Dates must be YYYY-MM-DD", 400
+    branch = request.args.get("branch", "").strip()
+    year = request.args.get("year", "").strip()
+
+    import exports
+
+    rows = _attendance_export_rows(start, end, branch, year)
+    if fmt == "xlsx":
+        body = exports.stream_xlsx(EXPORT_HEADER, rows, flush_rows=EXPORT_BATCH_ROWS)
+    else:
+        body = exports.stream_csv(EXPORT_HEADER, rows, flush_rows=EXPORT_BATCH_ROWS)
+
+    download_name = f"attendance_{start or 'all'}_{end or 'all'}.{fmt}"
+    # stream_with_context keeps the DB session open until the last row is sent.
+    response = current_app.response_class(stream_with_context(body), mimetype=_EXPORT_MIMETYPES[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@bp.cli.command("archive-attendance")
+@click.option("--year", type=int, help="Archive one academic year, given by its starting calendar year.")
+@click.option("--dry-run", is_flag=True, help="Count the rows that would move without changing anything.")
+def archive_attendance_command(year, dry_run):
+    """Move closed academic years out of the attendance table into compressed archive files."""
+    ensure_db_initialized()
+    if year and year >= attendance_archive.academic_year_of(datetime.date.today()):
+        raise click.BadParameter("that academic year has not ended yet", param_hint="--year")
+    if not dry_run and not attendance_archive.ARCHIVE_DIR_CONFIGURED:
+        raise click.ClickException(
+            "ATTENDANCE_ARCHIVE_DIR is not set. Point it at persistent storage first: "
+            "archived rows are deleted from the database."
+        )
+    years = [year] if year else attendance_archive.closed_academic_years(db.session)
+    if not years:
+        click.echo("no closed academic years left in the attendance table")
+    for academic_year in years:
+        summary = attendance_archive.archive_academic_year(db.session, academic_year, dry_run=dry_run)
+        if dry_run:
+            click.echo(f"{summary['label']}: would archive {summary['live_rows']} rows to {summary['path']}")
+        else:
+            click.echo(
+                f"{summary['label']}: archived {summary['live_rows']} rows to {summary['path']} "
+                f"({summary['rows']} rows in file, {len(summary['partitions_dropped'])} partitions dropped)"
+            )
 
 
-@app.route("/upload-syllabus", methods=["GET", "POST"])
+@bp.cli.command("attendance-partitions")
+@click.option("--months-ahead", default=attendance_archive.PARTITION_MONTHS_AHEAD, show_default=True)
+def attendance_partitions_command(months_ahead):
+    """Create upcoming monthly attendance partitions (Postgres only; run monthly from cron)."""
+    created = attendance_archive.ensure_partitions(db.engine, months_ahead=months_ahead)
+    click.echo("\n".join(created) if created else "partitions up to date")
+
+
+@bp.route("/upload-syllabus", methods=["GET", "POST"])
 @require_roles("teacher", "admin")
 def upload_syllabus():
     if request.method == "POST":
         sub = request.form["subject"]
         file = request.files["file"]
 
-        file_name, storage_path, file_url = store_uploaded_file(file, "uploads")
+        import storage
+
+        try:
+            file_name, storage_path, file_url, content_hash = store_uploaded_file(file, "uploads")
+        except storage.UploadTooLarge as exc:
+            return str(exc), 413
         if not file_name:
             return "Invalid file", 400
 
-        db.session.add(
-            Resource(
-                kind="syllabus",
-                subject=sub,
-                topic="",
-                file_name=file_name,
-                storage_path=storage_path,
-                file_url=file_url,
-            )
+        resource = Resource(
+            kind="syllabus",
+            subject=sub,
+            topic="",
+            file_name=file_name,
+            storage_path=storage_path,
+            file_url=file_url,
+            content_hash=content_hash,
         )
+        db.session.add(resource)
         db.session.commit()
+        invalidate_catalog()
+        queue_resource_indexing(resource.id)
         return redirect("/curriculum")
 
     return render_template("upload_syllabus.html")
 
 
-@app.route("/teacher/upload-notes", methods=["GET", "POST"])
+@bp.route("/teacher/upload-notes", methods=["GET", "POST"])
 @require_roles("teacher", "admin")
 def upload_notes():
     if request.method == "POST":
@@ -1071,27 +1877,34 @@ def upload_notes():
         topic = request.form.get("topic", "")
         file = request.files["file"]
 
-        file_name, storage_path, file_url = store_uploaded_file(file, "notes")
+        import storage
+
+        try:
+            file_name, storage_path, file_url, content_hash = store_uploaded_file(file, "notes")
+        except storage.UploadTooLarge as exc:
+            return str(exc), 413
         if not file_name:
             return "Invalid file", 400
 
-        db.session.add(
-            Resource(
-                kind="notes",
-                subject=subject,
-                topic=topic,
-                file_name=file_name,
-                storage_path=storage_path,
-                file_url=file_url,
-            )
+        resource = Resource(
+            kind="notes",
+            subject=subject,
+            topic=topic,
+            file_name=file_name,
+            storage_path=storage_path,
+            file_url=file_url,
+            content_hash=content_hash,
         )
+        db.session.add(resource)
         db.session.commit()
+        invalidate_catalog()
+        queue_resource_indexing(resource.id)
 
         return redirect("/teacher/dashboard")
     return render_template("upload_notes.html")
 
 
-@app.route("/teacher/add-announcement", methods=["GET", "POST"])
+@bp.route("/teacher/add-announcement", methods=["GET", "POST"])
 @require_roles("teacher", "admin")
 def add_announcement():
     if request.method == "POST":
@@ -1103,11 +1916,93 @@ def add_announcement():
             )
         )
         db.session.commit()
+        invalidate_catalog()
         return redirect("/teacher/dashboard")
     return render_template("add_announcement.html")
 
 
-@app.route("/resource/<int:resource_id>")
+@bp.route("/admin/roster-import", methods=["GET", "POST"])
+@require_roles("admin")
+def admin_roster_import():
+    if request.method == "GET":
+        return render_template("roster_import.html", report=None, error=None)
+
+    file = request.files.get("file")
+    if not file or not file.filename:
+        return render_template("roster_import.html", report=None, error="Choose a CSV file to import."), 400
+    dry_run = bool(request.form.get("dry_run"))
+
+    import roster_import
+
+    # utf-8-sig drops the BOM Excel writes; rows are read straight off the upload stream.
+    text_stream = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+    try:
+        report = roster_import.import_roster(db.session, text_stream, dry_run=dry_run)
+    except UnicodeDecodeError:
+        return render_template("roster_import.html", report=None, error="The file must be UTF-8 encoded CSV."), 400
+    except csv.Error as exc:
+        return render_template("roster_import.html", report=None, error=f"Malformed CSV: {exc}"), 400
+    except SQLAlchemyError:
+        current_app.logger.exception("Roster import failed")
+        return render_template("roster_import.html", report=None, error="Import failed; nothing was saved."), 500
+    if not dry_run:
+        invalidate_catalog()
+        PRESENCE.invalidate_known()
+    return render_template("roster_import.html", report=report, error=None)
+
+
+def _send_stored_file(base_folder, rel_path, download_name, content_hash=None):
+    """Serve a stored PDF with an ETag, 304s, byte ranges and (optionally) proxy offload.
+
+    Files with a known content hash get it as a strong ETag. Older files (legacy
+    rows, /view-pdf/) get a weak mtime+size ETag, so no request reads a whole
+    PDF just to label it.
+    """
+    local_path = safe_join(base_folder, rel_path)
+    if not local_path or not os.path.isfile(local_path):
+        return None
+
+    stat = os.stat(local_path)
+    if content_hash:
+        etag, weak = content_hash, False
+    else:
+        etag, weak = f"{stat.st_mtime_ns:x}-{stat.st_size:x}", True
+    version = request.args.get("v")
+    # Versioned URLs (?v=<hash prefix>, see resource_url) never change content, so browsers may keep
+    # them forever. Only the full prefix counts: a short or partial ?v= could match the next version too.
+    if content_hash and version and len(etag) >= RESOURCE_VERSION_CHARS and version == etag[:RESOURCE_VERSION_CHARS]:
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        cache_control = "private, no-cache"
+    mimetype = mimetypes.guess_type(download_name)[0] or "application/pdf"
+
+    if FILE_SENDFILE_MODE == "x-accel":
+        folder_name = os.path.basename(os.path.normpath(base_folder))
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = f"{X_ACCEL_PREFIX}/{folder_name}/{rel_path}"
+        response.headers["Content-Disposition"] = f'inline; filename="{download_name}"'
+        response.set_etag(etag, weak=weak)
+        response.make_conditional(request)
+    else:
+        # USE_X_SENDFILE covers the x-sendfile mode; If-None-Match and Range are handled below.
+        response = send_from_directory(
+            base_folder,
+            rel_path,
+            mimetype=mimetype,
+            download_name=download_name,
+            etag=False,
+            conditional=False,
+            max_age=None,
+        )
+        response.set_etag(etag, weak=weak)
+        response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+        if response.status_code == 304:
+            response.headers.pop("X-Sendfile", None)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+@bp.route("/resource/<int:resource_id>")
 @require_roles("student", "parent", "teacher", "admin")
 def view_resource(resource_id):
     resource = Resource.query.get_or_404(resource_id)
@@ -1115,45 +2010,196 @@ def view_resource(resource_id):
     if resource.file_url:
         return redirect(resource.file_url)
 
-    if resource.kind == "syllabus":
-        base_folder = UPLOADS_DIR
-    else:
-        base_folder = NOTES_DIR
+    base_folder = _resource_base_folder(resource)
 
-    local_name = os.path.basename(resource.storage_path)
-    if os.path.exists(os.path.join(base_folder, local_name)):
-        return send_from_directory(base_folder, local_name)
+    # storage_path is a blob path (blobs/ab/cd/<sha256>) or, for older rows, a bare file name.
+    response = _send_stored_file(base_folder, resource.storage_path, resource.file_name, resource.content_hash)
+    if response is not None:
+        return response
 
     return "File not found", 404
 
 
-@app.route("/view-pdf/<name>")
+@bp.route("/view-pdf/<name>")
 @require_roles("student", "parent", "teacher", "admin")
 def view_pdf(name):
     safe_name = os.path.basename(name)
 
-    if os.path.exists(os.path.join(UPLOADS_DIR, safe_name)):
-        return send_from_directory(UPLOADS_DIR, safe_name)
-    if os.path.exists(os.path.join(NOTES_DIR, safe_name)):
-        return send_from_directory(NOTES_DIR, safe_name)
+    for base_folder in (UPLOADS_DIR, NOTES_DIR):
+        response = _send_stored_file(base_folder, safe_name, safe_name)
+        if response is not None:
+            return response
 
     resource = Resource.query.filter_by(file_name=safe_name).order_by(Resource.id.desc()).first()
     if resource:
-        return redirect(url_for("view_resource", resource_id=resource.id))
+        return redirect(url_for(".view_resource", resource_id=resource.id))
 
     return "File not found", 404
 
 
-@app.route("/logout")
+# ---------------------------------------------------------------------------
+# JSON API for student/parent apps
+# ---------------------------------------------------------------------------
+
+API_SYNC_PAGE_SIZE = 500
+
+
+def _parse_sync_cursor(raw):
+    """"v1.<attendance id>.<announcement id>.<resource id>" -> tuple (None for a full sync)."""
+    if not raw:
+        return None
+    version, *ids = raw.split(".")
+    if version != "v1" or len(ids) != 3:
+        raise ValueError(raw)
+    return tuple(max(int(i), 0) for i in ids)
+
+
+def _format_sync_cursor(cursor):
+    return "v1." + ".".join(str(i) for i in cursor)
+
+
+def _sync_head(sid):
+    """Newest attendance/announcement/resource IDs visible to the student.
+
+    Never cached: another worker may have committed rows a moment ago, and a
+    stale head would answer 304 for them. It is one query of three index lookups.
+    """
+    head = db.session.query(
+        select(func.max(Attendance.id)).where(Attendance.student_id == sid).scalar_subquery(),
+        select(func.max(Announcement.id)).scalar_subquery(),
+        select(func.max(Resource.id)).scalar_subquery(),
+    ).one()
+    return tuple(value or 0 for value in head)
+
+
+def _rows_after(query, column, after):
+    rows = query.filter(column > after).order_by(column).limit(API_SYNC_PAGE_SIZE + 1).all()
+    return rows[:API_SYNC_PAGE_SIZE], len(rows) > API_SYNC_PAGE_SIZE
+
+
+@bp.route("/api/v1/sync")
+@require_api_roles("student", "parent")
+def api_sync():
+    """Attendance marks, announcements and resources added after the `since` cursor.
+
+    Clients keep the returned cursor and ETag and send them back as `since`
+    and If-None-Match; when nothing was added the answer is a bodiless 304.
+    """
+    try:
+        since = _parse_sync_cursor(request.args.get("since", "").strip())
+    except ValueError:
+        return jsonify({"ok": False, "message": "Invalid since cursor; start over without one."}), 400
+    sid = _selected_student_id(request.args.get("student_id"))
+    if not sid:
+        return jsonify({"ok": False, "message": "No student linked to this login."}), 404
+
+    start = since or (0, 0, 0)
+    head = tuple(max(pair) for pair in zip(_sync_head(sid), start))
+    head_etag = f"{sid}.{_format_sync_cursor(head)}"
+    if request.if_none_match.contains(head_etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(head_etag)
+    else:
+        marks, more_marks = _rows_after(Attendance.query.filter_by(student_id=sid), Attendance.id, start[0])
+        notices, more_notices = _rows_after(Announcement.query, Announcement.id, start[1])
+        resources, more_resources = _rows_after(Resource.query, Resource.id, start[2])
+        cursor = (
+            marks[-1].id if marks else start[0],
+            notices[-1].id if notices else start[1],
+            resources[-1].id if resources else start[2],
+        )
+        payload = {
+            "ok": True,
+            "cursor": _format_sync_cursor(cursor),
+            "more": more_marks or more_notices or more_resources,
+            "student_id": sid,
+            "attendance": [{"id": m.id, "date": m.date, "time": m.time} for m in marks],
+            "announcements": [
+                {"id": a.id, "title": a.title, "description": a.description, "date": a.date} for a in notices
+            ],
+            "resources": [
+                {
+                    "id": r.id,
+                    "kind": r.kind,
+                    "subject": r.subject,
+                    "topic": r.topic,
+                    "file_name": r.file_name,
+                    "url": resource_url(r.id, r.content_hash),
+                    "uploaded_at": r.uploaded_at.isoformat(timespec="seconds") if r.uploaded_at else None,
+                }
+                for r in resources
+            ],
+        }
+        if since is None:
+            # Closed academic years are only counted; their marks live in the archive.
+            student = db.session.get(Student, sid)
+            payload["student"] = (
+                {"student_id": sid, "name": student.name, "branch": student.branch, "year": student.year}
+                if student
+                else None
+            )
+            payload["archived_attendance"] = attendance_archive.archived_count(sid)
+        response = jsonify(payload)
+        response.set_etag(f"{sid}.{_format_sync_cursor(cursor)}")
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@bp.route("/logout")
 def logout():
     session.clear()
     return redirect("/login")
 
 
-@app.route("/healthz")
+@bp.app_errorhandler(db_breaker.DatabaseUnavailable)
+def database_unavailable(exc):
+    db.session.rollback()
+    headers = {"Retry-After": str(int(DB_BREAKER.probe_interval))}
+    if request.path.startswith("/api/") or request.is_json:
+        return jsonify({"ok": False, "offline": True, "message": "Database unavailable."}), 503, headers
+    return "Database temporarily unavailable. Please try again shortly.", 503, headers
+
+
+@bp.route("/healthz")
 def healthz():
     return "ok", 200
 
 
+@bp.route("/metrics")
+def metrics_endpoint():
+    token = os.environ.get("METRICS_TOKEN", "").strip()
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return "unauthorized", 401
+    return metrics.render_latest(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+
+def create_app():
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SECRET_KEY", "college_secret_key")
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = _database_url()
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_pre_ping": True,
+        "pool_recycle": 280,
+    }
+    # Let werkzeug reject oversized bodies before parsing; one extra chunk covers multipart overhead.
+    app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + UPLOAD_CHUNK_BYTES
+    app.config["USE_X_SENDFILE"] = FILE_SENDFILE_MODE == "x-sendfile"
+
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    os.makedirs(NOTES_DIR, exist_ok=True)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    db.init_app(app)
+    query_profiler.init_app(app)
+    app.register_blueprint(bp)
+    return app
+
+
+# gunicorn app:app / flask --app app
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(debug=False, use_reloader=False)
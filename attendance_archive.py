@@ -0,0 +1,519 @@
+"""
+Monthly partitions and cold archive for the attendance table.
+
+Postgres: `attendance` is range-partitioned by month on its YYYY-MM-DD `date`
+column (attendance_pYYYY_MM, plus attendance_pdefault for dates outside every
+created month). Date filters only touch the months they cover, and archiving a
+month drops its partition instead of deleting rows. A plain table from an older
+deploy is converted once, at startup.
+
+SQLite has no partitioning; there the live table is kept small by the archiver.
+
+Closed academic years move out of the database into ATTENDANCE_ARCHIVE_DIR, one
+compressed columnar file per year: a zip with a deflated member per column,
+rows sorted by date, a students/<id> member per student (that student's dates
+and times, so one student's history is read without scanning the year) and a
+meta.json holding row/month/student counts. The read helpers below union those
+files with the live table, so totals, history, the monthly graph and exports
+still cover every year.
+
+Archiving deletes the rows from the database, so it refuses to run until
+ATTENDANCE_ARCHIVE_DIR is set to persistent storage. The file is synced and
+renamed into place before the delete commits; if the commit fails, the
+previous file is put back. If the process dies between the two, the year is
+briefly both archived and live; running archive-attendance again finishes the
+move without duplicating rows.
+"""
+
+import datetime
+import heapq
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import zipfile
+import zlib
+
+from sqlalchemy import delete, func, select, text
+
+from models import Attendance
+
+ARCHIVE_DIR_CONFIGURED = bool(os.environ.get("ATTENDANCE_ARCHIVE_DIR"))
+ARCHIVE_DIR = os.environ.get("ATTENDANCE_ARCHIVE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "archive", "attendance"
+)
+ACADEMIC_YEAR_START_MONTH = int(os.environ.get("ACADEMIC_YEAR_START_MONTH", "7"))
+PARTITION_MONTHS_AHEAD = 3
+READ_BATCH_ROWS = 1000
+
+COLUMNS = ("date", "time", "student_id")
+ARCHIVE_FORMAT = "campusnexus-attendance-archive/2"
+STUDENT_MEMBER_PREFIX = "students/"
+# Scratch files the per-student members are grouped through while writing.
+_STUDENT_BUCKETS = 64
+
+_PARTITION_NAME = re.compile(r"^attendance_p(\d{4})_(\d{2})$")
+_ARCHIVE_NAME = re.compile(r"^attendance_(\d{4})(?:-\d{2})?\.zip$")
+_MONTH_KEY = re.compile(r"^(\d{4})-(\d{2})$")
+# Any constant works; it only has to be the same in every worker.
+_PARTITION_LOCK_KEY = 7_340_040
+
+_META_CACHE = {"entries": {}, "lock": threading.Lock()}
+
+
+# ---------------------------------------------------------------------------
+# Academic years
+# ---------------------------------------------------------------------------
+
+
+def academic_year_of(day):
+    """Starting calendar year of the academic year containing `day` (date or YYYY-MM-DD)."""
+    if isinstance(day, str):
+        year, month = int(day[:4]), int(day[5:7])
+    else:
+        year, month = day.year, day.month
+    return year if month >= ACADEMIC_YEAR_START_MONTH else year - 1
+
+
+def academic_year_label(year):
+    if ACADEMIC_YEAR_START_MONTH == 1:
+        return str(year)
+    return f"{year}-{(year + 1) % 100:02d}"
+
+
+def academic_year_bounds(year):
+    """Half-open [start, end) date strings for an academic year."""
+    return _month_start(year, ACADEMIC_YEAR_START_MONTH), _month_start(year + 1, ACADEMIC_YEAR_START_MONTH)
+
+
+def _month_start(year, month):
+    return f"{year:04d}-{month:02d}-01"
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+# ---------------------------------------------------------------------------
+# Postgres partitions
+# ---------------------------------------------------------------------------
+
+
+def _partition_name(year, month):
+    return f"attendance_p{year:04d}_{month:02d}"
+
+
+def _is_partitioned(conn):
+    return conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('attendance')")).scalar() == "p"
+
+
+def _existing_partitions(conn):
+    names = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'attendance'::regclass"
+        )
+    ).scalars()
+    months = {}
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months[(int(match.group(1)), int(match.group(2)))] = name
+    return months
+
+
+def _convert_to_partitioned(conn):
+    seq = conn.execute(text("SELECT pg_get_serial_sequence('attendance', 'id')")).scalar()
+    conn.execute(text("ALTER TABLE attendance RENAME TO attendance_unpartitioned"))
+    # LIKE keeps the columns, NOT NULLs and the id default (nextval of the existing sequence).
+    conn.execute(
+        text('CREATE TABLE attendance (LIKE attendance_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE ("date")')
+    )
+    conn.execute(text("CREATE TABLE attendance_pdefault PARTITION OF attendance DEFAULT"))
+    for (key,) in conn.execute(text("SELECT DISTINCT substr(date, 1, 7) FROM attendance_unpartitioned")).all():
+        match = _MONTH_KEY.match(key or "")
+        if match and 1 <= int(match.group(2)) <= 12:
+            _create_month_partition(conn, int(match.group(1)), int(match.group(2)))
+    if seq:
+        conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY attendance.id"))
+    conn.execute(text("INSERT INTO attendance SELECT * FROM attendance_unpartitioned"))
+    conn.execute(text("DROP TABLE attendance_unpartitioned"))
+    # The partition key has to be part of the primary key.
+    conn.execute(text("ALTER TABLE attendance ADD PRIMARY KEY (id, date)"))
+    conn.execute(text("ALTER TABLE attendance ADD FOREIGN KEY (student_id) REFERENCES students (student_id)"))
+    conn.execute(text("CREATE INDEX ix_attendance_date ON attendance (date)"))
+    conn.execute(text("CREATE INDEX ix_attendance_student_id ON attendance (student_id)"))
+
+
+def _create_month_partition(conn, year, month):
+    name = _partition_name(year, month)
+    lo = _month_start(year, month)
+    hi = _month_start(*_next_month(year, month))
+    # Build it detached and move any rows the default partition caught for this
+    # month; attaching a range the default partition still has rows for fails.
+    conn.execute(text(f"CREATE TABLE {name} (LIKE attendance INCLUDING DEFAULTS)"))
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM attendance_pdefault WHERE date >= :lo AND date < :hi RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"lo": lo, "hi": hi},
+    )
+    conn.execute(text(f"ALTER TABLE attendance ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+    return name
+
+
+def ensure_partitions(engine, today=None, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Partition attendance by month on Postgres and create upcoming months. Returns new partition names."""
+    if engine.dialect.name != "postgresql":
+        return []
+    today = today or datetime.date.today()
+    with engine.begin() as conn:
+        # Every worker runs this at startup; the first one does the work.
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PARTITION_LOCK_KEY})
+        if not _is_partitioned(conn):
+            _convert_to_partitioned(conn)
+
+        wanted = set()
+        year, month = today.year, today.month
+        for _ in range(months_ahead + 1):
+            wanted.add((year, month))
+            year, month = _next_month(year, month)
+        # Marks that fell into the default partition get their own month too.
+        for (key,) in conn.execute(text("SELECT DISTINCT substr(date, 1, 7) FROM attendance_pdefault")).all():
+            match = _MONTH_KEY.match(key or "")
+            if match and 1 <= int(match.group(2)) <= 12:
+                wanted.add((int(match.group(1)), int(match.group(2))))
+
+        existing = _existing_partitions(conn)
+        return [_create_month_partition(conn, y, m) for y, m in sorted(wanted) if (y, m) not in existing]
+
+
+# ---------------------------------------------------------------------------
+# Archive files
+# ---------------------------------------------------------------------------
+
+
+def archive_path(year, archive_dir=None):
+    return os.path.join(archive_dir or ARCHIVE_DIR, f"attendance_{academic_year_label(year)}.zip")
+
+
+def _archive_files(archive_dir=None):
+    try:
+        entries = list(os.scandir(archive_dir or ARCHIVE_DIR))
+    except FileNotFoundError:
+        return []
+    files = []
+    for entry in entries:
+        match = _ARCHIVE_NAME.match(entry.name)
+        if match and entry.is_file():
+            files.append((int(match.group(1)), entry.path))
+    return sorted(files)
+
+
+def archive_meta(path):
+    """meta.json of an archive file, cached until the file changes."""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _META_CACHE["lock"]:
+        cached = _META_CACHE["entries"].get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+    with zipfile.ZipFile(path) as zf:
+        meta = json.loads(zf.read("meta.json"))
+    with _META_CACHE["lock"]:
+        _META_CACHE["entries"][path] = (key, meta)
+    return meta
+
+
+def _overlaps(meta, start, end):
+    if not meta["rows"]:
+        return False
+    if start and meta["max_date"] < start:
+        return False
+    if end and meta["min_date"] > end:
+        return False
+    return True
+
+
+def _iter_file(path, start=None, end=None, student_id=None):
+    with zipfile.ZipFile(path) as zf:
+        streams = [io.TextIOWrapper(zf.open(column), encoding="utf-8", newline="\n") for column in COLUMNS]
+        try:
+            for date_line, time_line, sid_line in zip(*streams):
+                date = date_line[:-1]
+                if start and date < start:
+                    continue
+                if end and date > end:
+                    break  # rows are sorted by date
+                sid = sid_line[:-1]
+                if student_id and sid != student_id:
+                    continue
+                yield date, time_line[:-1], sid
+        finally:
+            for stream in streams:
+                stream.close()
+
+
+def _iter_student(path, student_id, start=None, end=None):
+    """One student's rows from the students/<id> member (format 2 files)."""
+    with zipfile.ZipFile(path) as zf:
+        try:
+            data = zf.read(STUDENT_MEMBER_PREFIX + student_id).decode("utf-8")
+        except KeyError:
+            return
+    for line in data.splitlines():
+        date, time_text = line.split("\t")
+        if start and date < start:
+            continue
+        if end and date > end:
+            break
+        yield date, time_text, student_id
+
+
+def _write_archive(path, year, rows):
+    """Write sorted (date, time, student_id) rows as a columnar zip at `path`. Returns the row count."""
+    meta = {
+        "format": ARCHIVE_FORMAT,
+        "academic_year": year,
+        "label": academic_year_label(year),
+        "columns": list(COLUMNS),
+        "rows": 0,
+        "min_date": None,
+        "max_date": None,
+        "month_counts": {},
+        "student_counts": {},
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "student_index": True,
+    }
+    month_counts = meta["month_counts"]
+    student_counts = meta["student_counts"]
+    # One pass over the rows: each column goes to its own scratch file, which
+    # is then deflated into the zip, so memory stays flat for any year size.
+    # Rows are also spread over bucket files by student, and each bucket is
+    # grouped in memory afterwards to write the per-student members.
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(path)) as scratch:
+        handles = [open(os.path.join(scratch, column), "w", encoding="utf-8", newline="\n") for column in COLUMNS]
+        buckets = [
+            open(os.path.join(scratch, f"bucket{i}"), "w", encoding="utf-8", newline="\n")
+            for i in range(_STUDENT_BUCKETS)
+        ]
+        try:
+            for row in rows:
+                values = [str(value) for value in row]
+                for handle, value in zip(handles, values):
+                    if "\n" in value or "\t" in value:
+                        raise ValueError(f"newline or tab in attendance value {value!r}")
+                    handle.write(value + "\n")
+                date, time_text, sid = values
+                buckets[zlib.crc32(sid.encode("utf-8")) % _STUDENT_BUCKETS].write(f"{sid}\t{date}\t{time_text}\n")
+                if meta["min_date"] is None:
+                    meta["min_date"] = date
+                meta["max_date"] = date
+                meta["rows"] += 1
+                month_counts[date[:7]] = month_counts.get(date[:7], 0) + 1
+                student_counts[sid] = student_counts.get(sid, 0) + 1
+        finally:
+            for handle in handles + buckets:
+                handle.close()
+
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+            for column in COLUMNS:
+                zf.write(os.path.join(scratch, column), column)
+            for i in range(_STUDENT_BUCKETS):
+                by_student = {}
+                with open(os.path.join(scratch, f"bucket{i}"), "r", encoding="utf-8", newline="\n") as bucket:
+                    for line in bucket:
+                        sid, _, rest = line.partition("\t")
+                        by_student.setdefault(sid, []).append(rest)
+                for sid, lines in by_student.items():
+                    zf.writestr(STUDENT_MEMBER_PREFIX + sid, "".join(lines))
+            zf.writestr("meta.json", json.dumps(meta, separators=(",", ":")))
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+    return meta["rows"]
+
+
+# ---------------------------------------------------------------------------
+# Reads over archived years
+# ---------------------------------------------------------------------------
+
+
+def archived_count(student_id=None, archive_dir=None):
+    total = 0
+    for _, path in _archive_files(archive_dir):
+        meta = archive_meta(path)
+        total += meta["student_counts"].get(student_id, 0) if student_id else meta["rows"]
+    return total
+
+
+def archived_month_counts(archive_dir=None):
+    counts = {}
+    for _, path in _archive_files(archive_dir):
+        for month, count in archive_meta(path)["month_counts"].items():
+            counts[month] = counts.get(month, 0) + count
+    return counts
+
+
+def has_archived(start=None, end=None, archive_dir=None):
+    return any(_overlaps(archive_meta(path), start, end) for _, path in _archive_files(archive_dir))
+
+
+def iter_archived(start=None, end=None, student_id=None, archive_dir=None):
+    """Archived (date, time, student_id) rows in date order, filtered like the live queries."""
+    for _, path in _archive_files(archive_dir):
+        meta = archive_meta(path)
+        if not _overlaps(meta, start, end):
+            continue
+        if student_id and not meta["student_counts"].get(student_id):
+            continue
+        if student_id and meta.get("student_index"):
+            yield from _iter_student(path, student_id, start, end)
+        else:
+            yield from _iter_file(path, start, end, student_id)
+
+
+# ---------------------------------------------------------------------------
+# Archiving
+# ---------------------------------------------------------------------------
+
+
+def _merge_rows(previous, live):
+    """Merge live rows into an archive file's rows.
+
+    A live row the file already holds is skipped: that only happens when an
+    earlier run published the file but died before its delete committed.
+    """
+    held, held_count = None, 0
+    for row, source in heapq.merge(((row, 0) for row in previous), ((row, 1) for row in live)):
+        if source == 0:
+            if row != held:
+                held, held_count = row, 0
+            held_count += 1
+            yield row
+        elif row == held and held_count:
+            held_count -= 1
+        else:
+            yield row
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform (Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def closed_academic_years(session, today=None):
+    """Academic years that ended before the current one and still have live rows."""
+    current = academic_year_of(today or datetime.date.today())
+    first = session.execute(select(func.min(Attendance.date)).where(Attendance.date >= "1900")).scalar()
+    if not first:
+        return []
+    years = []
+    for year in range(academic_year_of(first), current):
+        lo, hi = academic_year_bounds(year)
+        if session.execute(select(Attendance.id).where(Attendance.date >= lo, Attendance.date < hi).limit(1)).first():
+            years.append(year)
+    return years
+
+
+def archive_academic_year(session, year, archive_dir=None, dry_run=False, today=None):
+    """Move one closed academic year from the live table into its archive file."""
+    if year >= academic_year_of(today or datetime.date.today()):
+        raise ValueError(f"academic year {academic_year_label(year)} is not closed yet")
+    if archive_dir is None and not ARCHIVE_DIR_CONFIGURED and not dry_run:
+        raise ValueError(
+            "ATTENDANCE_ARCHIVE_DIR is not set; point it at persistent storage before archiving "
+            "(archived rows are deleted from the database)"
+        )
+    archive_dir = archive_dir or ARCHIVE_DIR
+    lo, hi = academic_year_bounds(year)
+    conn = session.connection()
+    partitioned = conn.dialect.name == "postgresql" and _is_partitioned(conn)
+
+    partitions = []
+    if partitioned:
+        partitions = [
+            name for (y, m), name in sorted(_existing_partitions(conn).items()) if lo <= _month_start(y, m) < hi
+        ]
+        # SHARE blocks writes to the year being archived (nothing else) until commit.
+        conn.execute(text(f"LOCK TABLE {', '.join(partitions + ['attendance_pdefault'])} IN SHARE MODE"))
+
+    in_year = (Attendance.date >= lo, Attendance.date < hi)
+    live_rows = session.execute(
+        select(Attendance.date, Attendance.time, Attendance.student_id)
+        .where(*in_year)
+        .order_by(Attendance.date, Attendance.time, Attendance.student_id)
+        .execution_options(yield_per=READ_BATCH_ROWS)
+    )
+    summary = {
+        "year": year,
+        "label": academic_year_label(year),
+        "path": archive_path(year, archive_dir),
+        "live_rows": 0,
+        "rows": None,
+        "partitions_dropped": partitions,
+        "dry_run": dry_run,
+    }
+
+    def counted(rows):
+        for row in rows:
+            summary["live_rows"] += 1
+            yield tuple(row)
+
+    if dry_run:
+        for _ in counted(live_rows):
+            pass
+        session.rollback()
+        return summary
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = summary["path"]
+    previous = _iter_file(path) if os.path.exists(path) else iter(())
+    fd, tmp_path = tempfile.mkstemp(dir=archive_dir, prefix=".attendance_", suffix=".zip.tmp")
+    os.close(fd)
+    backup_path = None
+    published = False
+    try:
+        # Late marks for an already archived year are merged into its file.
+        summary["rows"] = _write_archive(tmp_path, year, _merge_rows(previous, counted(live_rows)))
+        if partitioned:
+            removed = session.execute(
+                text("DELETE FROM attendance_pdefault WHERE date >= :lo AND date < :hi"), {"lo": lo, "hi": hi}
+            ).rowcount
+            for name in partitions:
+                removed += session.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+                session.execute(text(f"DROP TABLE {name}"))
+        else:
+            removed = session.execute(delete(Attendance).where(*in_year)).rowcount
+        if removed != summary["live_rows"]:
+            raise RuntimeError(
+                f"archived {summary['live_rows']} rows but {removed} were removed; rolled back, nothing changed"
+            )
+        # Publish the file before the rows are gone for good.
+        if os.path.exists(path):
+            backup_path = path + ".bak"
+            os.replace(path, backup_path)
+        os.replace(tmp_path, path)
+        published = True
+        _fsync_dir(archive_dir)
+        session.commit()
+    except Exception:
+        session.rollback()
+        if backup_path:
+            os.replace(backup_path, path)
+        elif published:
+            os.unlink(path)
+        if not published:
+            os.unlink(tmp_path)
+        raise
+    if backup_path:
+        os.unlink(backup_path)
+    return summary
@@ -0,0 +1,229 @@
+"""
+Per-student attendance counters (student_attendance_stats).
+
+The student and parent dashboards read one row per student instead of counting
+the attendance table: all-time total (archived years included), marks in the
+current month, the latest mark and the current streak of school days.
+Saturdays and Sundays neither break nor extend a streak.
+
+record_marks() runs inside the transaction that inserts the marks, so the
+counters commit or roll back with them. A student's first marks create the row
+directly. Only a mark older than the student's latest one (a late offline
+sync), a missing row for a student who does have history, or a first mark that
+raced another transaction's first mark for the same student falls back to
+rebuilding that student from history, reading just that student's entries in
+the archive files. rebuild() with no IDs recomputes every student from the
+live table and the archive files in one date-ordered pass.
+"""
+
+import datetime
+import heapq
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+import attendance_archive
+from models import Attendance, StudentAttendanceStats
+
+REBUILD_BATCH_ROWS = 5000
+# Up to this many students, archived marks are read per student (the archive's
+# per-student entries); larger rebuilds filter one pass over the archive.
+PER_STUDENT_ARCHIVE_READS = 50
+_COUNTERS = ("total_marks", "month_key", "month_marks", "last_date", "last_time", "streak")
+
+
+def _continues(previous_date, date):
+    """True when `date` is the next school day after `previous_date` (YYYY-MM-DD strings)."""
+    prev = datetime.date.fromisoformat(previous_date)
+    cur = datetime.date.fromisoformat(date)
+    gap = (cur - prev).days
+    if gap == 1:
+        return True
+    # Friday -> Monday (or Saturday -> Monday) only skips weekend days.
+    return 1 < gap <= 3 and all((prev + datetime.timedelta(days=d)).weekday() >= 5 for d in range(1, gap))
+
+
+def _apply(stats, date, time_text):
+    """Advance counters for a mark newer than stats' latest one."""
+    month = date[:7]
+    if month == stats["month_key"]:
+        stats["month_marks"] += 1
+    elif month > stats["month_key"]:
+        stats["month_key"], stats["month_marks"] = month, 1
+    stats["streak"] = stats["streak"] + 1 if _continues(stats["last_date"], date) else 1
+    stats["total_marks"] += 1
+    stats["last_date"], stats["last_time"] = date, time_text
+
+
+def _new_stats(student_id, date, time_text):
+    return {
+        "student_id": student_id,
+        "total_marks": 1,
+        "month_key": date[:7],
+        "month_marks": 1,
+        "last_date": date,
+        "last_time": time_text,
+        "streak": 1,
+    }
+
+
+def _by_date(row):
+    return row[0], row[1]
+
+
+def _iter_marks(session, student_ids=None):
+    """(date, time, student_id) of live and archived marks, in date order."""
+    live = select(Attendance.date, Attendance.time, Attendance.student_id).order_by(
+        Attendance.date, Attendance.time, Attendance.id
+    )
+    if student_ids is not None:
+        live = live.where(Attendance.student_id.in_(student_ids))
+    live_rows = (tuple(row) for row in session.execute(live.execution_options(yield_per=REBUILD_BATCH_ROWS)))
+
+    if student_ids is None:
+        archived = attendance_archive.iter_archived()
+    elif len(student_ids) <= PER_STUDENT_ARCHIVE_READS:
+        archived = heapq.merge(
+            *(attendance_archive.iter_archived(student_id=sid) for sid in student_ids), key=_by_date
+        )
+    else:
+        wanted = set(student_ids)
+        archived = (row for row in attendance_archive.iter_archived() if row[2] in wanted)
+    return heapq.merge(archived, live_rows, key=_by_date)
+
+
+def rebuild(session, student_ids=None):
+    """Recompute counters from history for the given students (all when None). Returns rows written."""
+    if student_ids is not None:
+        student_ids = set(student_ids)
+        if not student_ids:
+            return 0
+    stats = {}
+    for date, time_text, student_id in _iter_marks(session, student_ids):
+        current = stats.get(student_id)
+        if current is None:
+            stats[student_id] = _new_stats(student_id, date, time_text)
+        elif date != current["last_date"]:
+            _apply(current, date, time_text)
+        else:
+            # Same day twice (only possible in old data): counts, no streak change.
+            current["total_marks"] += 1
+            current["last_time"] = max(current["last_time"], time_text)
+            if date[:7] == current["month_key"]:
+                current["month_marks"] += 1
+
+    clear = delete(StudentAttendanceStats)
+    if student_ids is not None:
+        clear = clear.where(StudentAttendanceStats.student_id.in_(student_ids))
+    session.execute(clear)
+    if stats:
+        session.execute(insert(StudentAttendanceStats), list(stats.values()))
+    return len(stats)
+
+
+def record_marks(session, marks):
+    """Update counters for newly inserted marks ({"student_id", "date", "time"}) before the commit."""
+    by_student = {}
+    for mark in sorted(marks, key=lambda m: (m["date"], m["time"])):
+        by_student.setdefault(mark["student_id"], []).append((mark["date"], mark["time"]))
+    if not by_student:
+        return
+
+    rows = {
+        row.student_id: row
+        for row in session.query(StudentAttendanceStats)
+        .filter(StudentAttendanceStats.student_id.in_(by_student))
+        .with_for_update()
+    }
+    needs_rebuild = []
+    first_marks = _without_history(session, [sid for sid in by_student if sid not in rows], by_student)
+    for student_id, new_marks in by_student.items():
+        row = rows.get(student_id)
+        if row is None and student_id in first_marks:
+            stats = _new_stats(student_id, *new_marks[0])
+            for date, time_text in new_marks[1:]:
+                _apply(stats, date, time_text)
+            if not _insert_first(session, stats):
+                # Another transaction recorded this student's first mark meanwhile.
+                needs_rebuild.append(student_id)
+            continue
+        if row is None or new_marks[0][0] <= row.last_date:
+            needs_rebuild.append(student_id)
+            continue
+        stats = {column: getattr(row, column) for column in _COUNTERS}
+        for date, time_text in new_marks:
+            _apply(stats, date, time_text)
+        for column, value in stats.items():
+            setattr(row, column, value)
+
+    if needs_rebuild:
+        session.flush()  # the rebuild must see the marks being inserted
+        rebuild(session, needs_rebuild)
+
+
+def _insert_first(session, stats):
+    """Insert a new student's counters; False when the row already exists (a concurrent first mark).
+
+    No row exists to lock yet, so two first marks can race: Postgres and SQLite
+    skip the duplicate with ON CONFLICT DO NOTHING, other databases roll back a
+    savepoint on the IntegrityError.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(StudentAttendanceStats).values(**stats).on_conflict_do_nothing(
+            index_elements=[StudentAttendanceStats.student_id]
+        )
+        return session.execute(stmt).rowcount == 1
+    try:
+        with session.begin_nested():
+            session.add(StudentAttendanceStats(**stats))
+    except IntegrityError:
+        return False
+    return True
+
+
+def _without_history(session, student_ids, by_student):
+    """Students among `student_ids` whose only marks are the new ones (flushed, not yet committed)."""
+    if not student_ids:
+        return set()
+    live = dict(
+        session.execute(
+            select(Attendance.student_id, func.count())
+            .where(Attendance.student_id.in_(student_ids))
+            .group_by(Attendance.student_id)
+        ).all()
+    )
+    return {
+        sid
+        for sid in student_ids
+        if live.get(sid, 0) == len(by_student[sid]) and not attendance_archive.archived_count(sid)
+    }
+
+
+def ensure_populated(session):
+    """Build every student's counters once, when the table is new but attendance history exists."""
+    if session.execute(select(StudentAttendanceStats.student_id).limit(1)).first():
+        return 0
+    if not session.execute(select(Attendance.id).limit(1)).first() and not attendance_archive.archived_count():
+        return 0
+    written = rebuild(session)
+    session.commit()
+    return written
+
+
+def dashboard_view(row, today):
+    """Dashboard figures from a stats row (None = no marks yet) as of `today` (YYYY-MM-DD)."""
+    if row is None:
+        return {"present_today": False, "total": 0, "this_month": 0, "latest_mark": None, "streak": 0}
+    current = row.last_date == today or _continues(row.last_date, today)
+    return {
+        "present_today": row.last_date == today,
+        "total": row.total_marks,
+        "this_month": row.month_marks if row.month_key == today[:7] else 0,
+        "latest_mark": (row.last_date, row.last_time),
+        "streak": row.streak if current else 0,
+    }
@@ -0,0 +1,344 @@
+"""
+Attendance ingestion for fixed classroom cameras, run next to (not inside) the
+web app.
+
+Each source (a device index, an RTSP/HTTP stream URL or a video file) is read
+by its own thread and sampled at --fps. Sampled frames go through a bounded
+queue to a pool of recognition threads; every face that matches a student for
+--min-hits samples within --hit-window seconds becomes a mark. Marks are
+posted in batches to /teacher/attendance/sync with the
+ATTENDANCE_INGEST_TOKEN bearer token, so no gunicorn worker ever waits on a
+camera. The endpoint is idempotent: a batch that failed is simply re-sent.
+
+Live sources never queue stale frames: when recognition falls behind, new
+samples are dropped and the source keeps being drained. Video files are read
+at full speed and nothing is dropped, which makes them usable for tests.
+
+    ATTENDANCE_INGEST_TOKEN=... python camera_ingest.py \\
+        --source room101=rtsp://cam101/stream --source 0 --server http://127.0.0.1:5000
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+
+import cv2
+import requests
+
+import face
+import face_dataset
+import face_detectors
+
+log = logging.getLogger("camera_ingest")
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "face_model.xml")
+SYNC_PATH = "/teacher/attendance/sync"
+SYNC_BATCH_SIZE = 100
+RECONNECT_MAX_SECONDS = 30.0
+MODEL_CHECK_SECONDS = 30.0
+
+
+def parse_source(spec):
+    """"name=spec" or "spec" -> (name, spec); a numeric spec is a local device index."""
+    name, sep, value = spec.partition("=")
+    if not sep or "://" in name:
+        name, value = "", spec
+    value = value.strip()
+    target = int(value) if value.isdigit() else value
+    return (name.strip() or f"camera-{value}")[:64], target
+
+
+class Recognizer:
+    """One LBPH model + face detector per recognition thread, reloaded when training replaces the model."""
+
+    def __init__(self, model_path, detector_name=None):
+        self.model_path = model_path
+        self.detector = face_detectors.create_detector(detector_name)
+        self.recognizer = None
+        self.mtime = None
+        self.checked_at = 0.0
+
+    def _refresh(self):
+        if self.recognizer is not None and time.monotonic() - self.checked_at < MODEL_CHECK_SECONDS:
+            return
+        self.checked_at = time.monotonic()
+        mtime = os.path.getmtime(self.model_path)
+        if mtime != self.mtime:
+            recognizer = cv2.face.LBPHFaceRecognizer_create()
+            recognizer.read(self.model_path)
+            self.recognizer, self.mtime = recognizer, mtime
+
+    def __call__(self, frame):
+        self._refresh()
+        return face.recognize_faces(frame, self.recognizer, self.detector, face.load_thresholds(self.model_path))
+
+
+class MarkSender(threading.Thread):
+    """Batches marks and posts them to the sync endpoint, retrying until the server answers."""
+
+    def __init__(self, server, token, flush_seconds, stop_event):
+        super().__init__(name="mark-sender", daemon=True)
+        self.url = server.rstrip("/") + SYNC_PATH
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.flush_seconds = flush_seconds
+        self.stop_event = stop_event
+        self.pending = []
+        self.lock = threading.Lock()
+        self.sent = 0
+
+    def submit(self, student_id, captured_at, kiosk_id):
+        with self.lock:
+            self.pending.append(
+                {
+                    "event_id": uuid.uuid4().hex,
+                    "student_id": student_id,
+                    "captured_at": int(captured_at * 1000),
+                    "kiosk_id": kiosk_id,
+                }
+            )
+
+    def _flush(self):
+        with self.lock:
+            batch = self.pending[:SYNC_BATCH_SIZE]
+        if not batch:
+            return True
+        try:
+            resp = requests.post(
+                self.url, json={"events": batch}, headers=self.headers, timeout=15, allow_redirects=False
+            )
+        except requests.RequestException as exc:
+            log.warning("Attendance API unreachable (%s); %d mark(s) pending", exc, len(self.pending))
+            return False
+        if resp.status_code in (301, 302, 401, 403):
+            log.error("Attendance API refused the batch (HTTP %s); check ATTENDANCE_INGEST_TOKEN", resp.status_code)
+            return False
+        if resp.status_code != 200:
+            log.warning("Attendance API answered HTTP %s; %d mark(s) pending", resp.status_code, len(self.pending))
+            return False
+        for result in resp.json().get("results", []):
+            if result.get("status") in ("invalid", "unknown_student"):
+                log.warning("Mark %s rejected: %s", result.get("event_id"), result.get("message"))
+        done = {event["event_id"] for event in batch}
+        with self.lock:
+            self.pending = [event for event in self.pending if event["event_id"] not in done]
+        self.sent += len(batch)
+        return True
+
+    def run(self):
+        backoff = self.flush_seconds
+        while not self.stop_event.wait(backoff):
+            while self._flush() and self.pending:
+                pass
+            backoff = self.flush_seconds if not self.pending else min(backoff * 2, RECONNECT_MAX_SECONDS)
+
+    def drain(self, timeout_seconds):
+        deadline = time.monotonic() + timeout_seconds
+        while self.pending and time.monotonic() < deadline:
+            if not self._flush():
+                time.sleep(1.0)
+        if self.pending:
+            log.error("Exiting with %d unsent mark(s)", len(self.pending))
+
+
+class MarkFilter:
+    """Turns sightings into marks: min_hits within hit_window seconds, once per student per day."""
+
+    def __init__(self, min_hits, hit_window):
+        self.min_hits = min_hits
+        self.hit_window = hit_window
+        self.day = None
+        self.marked = set()
+        self.hits = {}
+        self.lock = threading.Lock()
+
+    def sighting(self, student_id, seen_at):
+        """True the first time today a student has been seen often enough to mark."""
+        with self.lock:
+            day = datetime.date.fromtimestamp(seen_at)
+            if day != self.day:
+                self.day, self.marked, self.hits = day, set(), {}
+            if student_id in self.marked:
+                return False
+            recent = [t for t in self.hits.get(student_id, ()) if seen_at - t <= self.hit_window] + [seen_at]
+            if len(recent) < self.min_hits:
+                self.hits[student_id] = recent
+                return False
+            self.hits.pop(student_id, None)
+            self.marked.add(student_id)
+            return True
+
+
+class IngestStats:
+    """Counters shared by the reader and recognition threads, for the periodic report."""
+
+    FIELDS = ("sampled", "dropped", "faces", "marks")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self.lock = threading.Lock()
+
+    def add(self, **counts):
+        with self.lock:
+            for field, count in counts.items():
+                self.counts[field] += count
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+def read_source(name, target, fps, frames, stop_event, stats):
+    """Sample one source into the frame queue until it ends (files) or the daemon stops."""
+    is_file = isinstance(target, str) and os.path.isfile(target)
+    interval = 1.0 / fps
+    backoff = 1.0
+    while not stop_event.is_set():
+        cam = cv2.VideoCapture(target)
+        if not cam.isOpened():
+            log.warning("%s: cannot open %s; retrying in %.0fs", name, target, backoff)
+            stop_event.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+            continue
+        log.info("%s: reading %s", name, target)
+        backoff = 1.0
+        last_sample = None
+        while not stop_event.is_set():
+            ok, frame = cam.read()
+            if not ok or frame is None:
+                break
+            # Files are sampled on their own timeline, live sources on the wall clock.
+            position = cam.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if is_file else time.monotonic()
+            if last_sample is not None and position - last_sample < interval:
+                continue
+            last_sample = position
+            item = (name, frame, time.time())
+            if is_file:
+                frames.put(item)
+            else:
+                try:
+                    frames.put_nowait(item)
+                except queue.Full:
+                    stats.add(dropped=1)
+                    continue
+            stats.add(sampled=1)
+        cam.release()
+        if is_file:
+            log.info("%s: end of file", name)
+            return
+        if not stop_event.is_set():
+            log.warning("%s: stream lost; reconnecting", name)
+
+
+def recognize_frames(model_path, detector_name, frames, mark_filter, sender, stats):
+    recognize = Recognizer(model_path, detector_name)
+    while True:
+        item = frames.get()
+        if item is None:
+            return
+        name, frame, seen_at = item
+        try:
+            matches = recognize(frame)
+        except cv2.error:
+            log.exception("%s: recognition failed", name)
+            continue
+        stats.add(faces=len(matches))
+        for student_id, distance in matches:
+            if mark_filter.sighting(student_id, seen_at):
+                log.info("%s: %s recognized (distance %.1f)", name, student_id, distance)
+                sender.submit(student_id, seen_at, name)
+                stats.add(marks=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--source",
+        action="append",
+        default=None,
+        help="[name=]device index, stream URL or video file; repeatable (env CAMERA_SOURCES, comma-separated)",
+    )
+    parser.add_argument("--server", default=os.environ.get("ATTENDANCE_API_URL", "http://127.0.0.1:5000"))
+    parser.add_argument("--fps", type=float, default=2.0, help="frames sampled per second per source")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)))
+    parser.add_argument("--queue-size", type=int, default=16, help="sampled frames waiting for recognition")
+    parser.add_argument("--section", help="only match this section's students (see model/shards/index.json)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument(
+        "--detector",
+        choices=sorted(face_detectors.BACKENDS),
+        default=face_detectors.DEFAULT_BACKEND,
+        help="face detector backend (env FACE_DETECTOR)",
+    )
+    parser.add_argument("--min-hits", type=int, default=2, help="sightings needed before a student is marked")
+    parser.add_argument("--hit-window", type=float, default=10.0, help="seconds within which --min-hits count")
+    parser.add_argument("--flush-seconds", type=float, default=2.0, help="how often marks are posted")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.source:
+        args.source = [s.strip() for s in os.environ.get("CAMERA_SOURCES", "").split(",") if s.strip()]
+    if not args.source:
+        parser.error("no --source given (or set CAMERA_SOURCES)")
+    model_path = face_dataset.shard_model_path(args.model, args.section) if args.section else args.model
+    if not os.path.exists(model_path):
+        parser.error(f"face model not found: {model_path} (run train_model.py)")
+    try:
+        face_detectors.create_detector(args.detector)
+    except (OSError, ValueError, cv2.error) as exc:
+        parser.error(f"face detector {args.detector!r} unavailable: {exc}")
+    token = os.environ.get("ATTENDANCE_INGEST_TOKEN", "").strip()
+    if not token:
+        log.warning("ATTENDANCE_INGEST_TOKEN is not set; the attendance API will refuse the marks")
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_event.set())
+
+    stats = IngestStats()
+    frames = queue.Queue(maxsize=max(1, args.queue_size))
+    sender = MarkSender(args.server, token, args.flush_seconds, stop_event)
+    mark_filter = MarkFilter(max(1, args.min_hits), args.hit_window)
+    sender.start()
+
+    workers = [
+        threading.Thread(
+            target=recognize_frames,
+            args=(model_path, args.detector, frames, mark_filter, sender, stats),
+            name=f"recognize-{i}",
+        )
+        for i in range(max(1, args.workers))
+    ]
+    readers = [
+        threading.Thread(target=read_source, args=(*parse_source(spec), args.fps, frames, stop_event, stats))
+        for spec in args.source
+    ]
+    for thread in workers + readers:
+        thread.start()
+
+    last_report = time.monotonic()
+    while any(reader.is_alive() for reader in readers):
+        for reader in readers:
+            reader.join(timeout=1.0)
+        if time.monotonic() - last_report >= 60:
+            last_report = time.monotonic()
+            log.info("sampled=%(sampled)d dropped=%(dropped)d faces=%(faces)d marks=%(marks)d", stats.snapshot())
+
+    for _ in workers:
+        frames.put(None)
+    for worker in workers:
+        worker.join()
+    stop_event.set()
+    sender.join()
+    sender.drain(timeout_seconds=30)
+    log.info("Stopped: sampled=%(sampled)d dropped=%(dropped)d faces=%(faces)d marks=%(marks)d", stats.snapshot())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+"""
+Circuit breaker for the database connection.
+
+While the database is reachable the breaker is closed and does nothing. After
+`failure_threshold` connection failures in a row (no successful statement in
+between) it opens: new connections fail at once with DatabaseUnavailable
+instead of each request waiting on connect timeouts and retry sleeps. A
+background thread probes the database every `probe_interval` seconds and
+closes the breaker on the first success. Requests never probe themselves.
+
+DatabaseUnavailable is a SQLAlchemyError, so code that already handles database
+errors (login "server busy", kiosk offline queue) handles an open breaker the
+same way.
+"""
+
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class DatabaseUnavailable(SQLAlchemyError):
+    """Raised instead of connecting while the breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, probe_interval=10.0, on_change=None):
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.on_change = on_change  # called with "open" / "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probing = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        """True when a connection may be attempted (always for the probe thread)."""
+        return self.opened_at is None or getattr(self._probing, "active", False)
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self, probe):
+        """Count a connection failure; `probe()` must raise while the database is still down."""
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures < self.failure_threshold:
+                return
+            self.opened_at = time.time()
+        if self.on_change:
+            self.on_change("open")
+        threading.Thread(target=self._probe_until_closed, args=(probe,), name="db-breaker-probe", daemon=True).start()
+
+    def _probe_until_closed(self, probe):
+        self._probing.active = True
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                probe()
+            except Exception:
+                continue
+            with self._lock:
+                self.failures = 0
+                self.opened_at = None
+            if self.on_change:
+                self.on_change("closed")
+            return
@@ -0,0 +1,218 @@
+"""
+Face detection/recognition for attendance (OpenCV LBPH + the FACE_DETECTOR backend).
+
+This, face_dataset.py (shared preprocessing) and face_detectors.py are the
+only modules that import cv2 and numpy. app.py imports face lazily from the attendance routes, so
+web workers serving dashboards, notes and announcements boot without OpenCV.
+"""
+
+import base64
+import datetime
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import face_detectors
+import metrics
+from face_dataset import DEFAULT_MAX_DISTANCE, detect_faces, frame_to_gray, normalize_face_roi, thresholds_path
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+RECOGNITION_STAGE_SECONDS = metrics.Histogram(
+    "campusnexus_recognition_stage_seconds", "Face recognition pipeline stage latency.", ("stage",)
+)
+
+# LBPH distance above which a prediction is rejected (lower is a closer match),
+# unless training calibrated a threshold for the predicted student.
+MAX_CONFIDENCE_DISTANCE = DEFAULT_MAX_DISTANCE
+
+# Loaded models (the college-wide one and section shards), least recently used first.
+MAX_LOADED_MODELS = int(os.environ.get("FACE_MODEL_CACHE_SIZE", "8"))
+
+_FACE_TOOLS_CACHE = {"recognizers": OrderedDict(), "detector": None, "lock": threading.Lock()}
+_THRESHOLDS_CACHE = {"thresholds": {}, "mtime": None, "lock": threading.Lock()}
+
+
+def load_face_tools(model_path):
+    # Cache face tools so we don't reload model/detector every request (faster + more stable).
+    if cv2 is None:
+        return None, None, "OpenCV is not available on server."
+    if not hasattr(cv2, "face"):
+        return None, None, "OpenCV face module is not available."
+    if not os.path.exists(model_path):
+        return None, None, "Face model not found. Train model locally first."
+
+    try:
+        mtime = os.path.getmtime(model_path)
+    except Exception:
+        mtime = None
+
+    recognizers = _FACE_TOOLS_CACHE["recognizers"]
+    with _FACE_TOOLS_CACHE["lock"]:
+        if _FACE_TOOLS_CACHE["detector"] is None:
+            try:
+                _FACE_TOOLS_CACHE["detector"] = face_detectors.create_detector()
+            except (OSError, ValueError, cv2.error) as exc:
+                return None, None, f"Face detector could not be loaded: {exc}"
+
+        cached = recognizers.get(model_path)
+        if cached is not None and cached[1] == mtime:
+            recognizers.move_to_end(model_path)
+            return cached[0], _FACE_TOOLS_CACHE["detector"], None
+
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(model_path)
+        recognizers[model_path] = (recognizer, mtime)
+        recognizers.move_to_end(model_path)
+        while len(recognizers) > max(1, MAX_LOADED_MODELS):
+            recognizers.popitem(last=False)
+        return recognizer, _FACE_TOOLS_CACHE["detector"], None
+
+
+def load_thresholds(model_path):
+    """Per-student distance thresholds written by train_model.py ({} if there are none)."""
+    path = thresholds_path(model_path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _THRESHOLDS_CACHE["lock"]:
+        if _THRESHOLDS_CACHE["mtime"] != (path, mtime):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    thresholds = json.load(f).get("thresholds", {})
+            except (OSError, ValueError):
+                thresholds = {}
+            _THRESHOLDS_CACHE["thresholds"] = {str(sid): float(limit) for sid, limit in thresholds.items()}
+            _THRESHOLDS_CACHE["mtime"] = (path, mtime)
+        return _THRESHOLDS_CACHE["thresholds"]
+
+
+def decode_data_url_frame(image_data):
+    """Decode a `data:image/...;base64,` payload into a BGR frame (None if it is not an image)."""
+    encoded = image_data.split(",", 1)[1]
+    frame_array = np.frombuffer(base64.b64decode(encoded), dtype=np.uint8)
+    return cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
+
+
+def recognize_student_from_frame(frame, recognizer, face_detector, is_known_student, thresholds=None):
+    with RECOGNITION_STAGE_SECONDS.time(stage="detect"):
+        gray = frame_to_gray(frame)
+        faces = detect_faces(frame, gray, face_detector)
+    if len(faces) == 0:
+        return None, None, "No face detected. Keep face centered and closer to camera."
+    if len(faces) > 1:
+        return None, None, "Multiple faces detected. Keep only one face in frame."
+
+    x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+    with RECOGNITION_STAGE_SECONDS.time(stage="predict"):
+        normalized_roi = normalize_face_roi(gray[y: y + h, x: x + w])
+        sid_label, confidence = recognizer.predict(normalized_roi)
+    sid = str(sid_label)
+
+    if confidence > (thresholds or {}).get(sid, MAX_CONFIDENCE_DISTANCE):
+        return None, float(confidence), "Face not recognized. Move closer and face the camera directly."
+    with RECOGNITION_STAGE_SECONDS.time(stage="student_lookup"):
+        known = is_known_student(sid)
+    if not known:
+        return None, float(confidence), "Recognized face does not match a valid student."
+    return sid, float(confidence), None
+
+
+def recognize_student_with_lighting_fallback(frame, recognizer, face_detector, is_known_student, thresholds=None):
+    # Baseline + a few brightness shifts to handle poor lighting quickly.
+    sid, conf, err = recognize_student_from_frame(frame, recognizer, face_detector, is_known_student, thresholds)
+    if sid:
+        return sid, conf, None
+
+    for beta in (-25, 25, 45):
+        with RECOGNITION_STAGE_SECONDS.time(stage="fallback_pass"):
+            adjusted = cv2.convertScaleAbs(frame, alpha=1.0, beta=beta)
+            sid2, conf2, err2 = recognize_student_from_frame(
+                adjusted, recognizer, face_detector, is_known_student, thresholds
+            )
+        if sid2:
+            return sid2, conf2, None
+        if conf is None and conf2 is not None:
+            conf = conf2
+        if not err and err2:
+            err = err2
+
+    return None, conf, err or "Face not recognized. Try better lighting/angle."
+
+
+def recognize_faces(frame, recognizer, face_detector, thresholds=None):
+    """Every face in the frame that matches a student: [(student_id, distance), ...] (fixed cameras)."""
+    with RECOGNITION_STAGE_SECONDS.time(stage="detect"):
+        gray = frame_to_gray(frame)
+        faces = detect_faces(frame, gray, face_detector)
+    matches = []
+    for (x, y, w, h) in faces:
+        with RECOGNITION_STAGE_SECONDS.time(stage="predict"):
+            sid_label, confidence = recognizer.predict(normalize_face_roi(gray[y: y + h, x: x + w]))
+        sid = str(sid_label)
+        if confidence <= (thresholds or {}).get(sid, MAX_CONFIDENCE_DISTANCE):
+            matches.append((sid, float(confidence)))
+    return matches
+
+
+def _close_camera(cam):
+    cam.release()
+    try:
+        cv2.destroyAllWindows()
+    except cv2.error:
+        pass
+
+
+def scan_local_camera(model_path, timeout_seconds=20, show_preview=True):
+    """
+    Watch the server's own webcam until a face is seen (local installs only).
+
+    Returns (student_id, error): student_id is None when the scan timed out or
+    was cancelled from the preview window.
+    """
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(model_path)
+    try:
+        face_detector = face_detectors.create_detector()
+    except (OSError, ValueError, cv2.error) as exc:
+        return None, f"Face detector could not be loaded: {exc}"
+
+    cam = cv2.VideoCapture(0)
+    if not cam.isOpened():
+        return None, "Camera not available. Check local camera permissions."
+
+    start_time = datetime.datetime.now()
+    while True:
+        if (datetime.datetime.now() - start_time).total_seconds() > timeout_seconds:
+            break
+
+        ret, frame = cam.read()
+        if not ret or frame is None:
+            continue
+
+        gray = frame_to_gray(frame)
+        faces = detect_faces(frame, gray, face_detector)
+
+        for (x, y, w, h) in faces:
+            label, _ = recognizer.predict(normalize_face_roi(gray[y: y + h, x: x + w]))
+            _close_camera(cam)
+            return str(label), None
+
+        if show_preview:
+            try:
+                cv2.imshow("Face Attendance", frame)
+                key = cv2.waitKey(1) & 0xFF
+                if key in (13, 27):
+                    break
+            except cv2.error:
+                show_preview = False
+
+    _close_camera(cam)
+    return None, None
@@ -0,0 +1,245 @@
+"""
+Face preprocessing shared by capture, training and recognition, plus the
+packed face dataset.
+
+Every face goes through the same steps everywhere: the frame is converted to
+grayscale and histogram-equalized, faces are found with the configured
+detector (face_detectors.py; the Haar cascade by default), and each crop is
+resized to 200x200 with CLAHE and a light blur. The dataset keeps crops
+already normalized, so training decodes nothing:
+
+  dataset/faces.u8           N x 200 x 200 uint8 pixels, memory-mapped by training
+  dataset/faces_index.json   {"size": 200, "count": N, "labels": [student_id, ...]}
+
+Appends write the pixels first and the index last (atomically), so an
+interrupted capture leaves at most unreferenced bytes at the end of faces.u8,
+which the next append overwrites.
+
+Training also calibrates a distance threshold per student from held-out crops
+and stores it next to the model (model/face_thresholds.json), and writes one
+model shard per section (branch + year) so a kiosk set to a section only
+compares against that section's students:
+
+  model/shards/<section>.xml   LBPH model of the section's students
+  model/shards/index.json      {"sections": {<section>: {"branch", "year", "students", "samples"}}}
+"""
+
+import datetime
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+FACE_SIZE = 200
+PACK_FILE = "faces.u8"
+INDEX_FILE = "faces_index.json"
+_LEGACY_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# LBPH distance above which a prediction is rejected (lower is a closer match),
+# used for students without a calibrated threshold.
+DEFAULT_MAX_DISTANCE = 68.0
+# Calibrated thresholds never go outside these bounds.
+CALIBRATED_MIN_DISTANCE = 45.0
+CALIBRATED_MAX_DISTANCE = 90.0
+THRESHOLDS_FILE = "face_thresholds.json"
+SHARDS_DIR = "shards"
+SHARD_INDEX_FILE = "index.json"
+
+
+def frame_to_gray(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.equalizeHist(gray)
+
+
+def detect_faces(frame, gray, detector):
+    """(x, y, w, h) face boxes; cascades search `gray`, CNN detectors the original `frame`."""
+    return detector.detect(frame, gray)
+
+
+def normalize_face_roi(face_roi):
+    resized = cv2.resize(face_roi, (FACE_SIZE, FACE_SIZE))
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    enhanced = clahe.apply(resized)
+    return cv2.GaussianBlur(enhanced, (3, 3), 0)
+
+
+def _read_index(dataset_dir):
+    try:
+        with open(os.path.join(dataset_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {"size": FACE_SIZE, "count": 0, "labels": []}
+    if index.get("size") != FACE_SIZE or len(index.get("labels", ())) != index.get("count"):
+        raise ValueError(f"{INDEX_FILE} does not match this version ({FACE_SIZE}x{FACE_SIZE} crops)")
+    return index
+
+
+def _write_index(dataset_dir, index):
+    fd, tmp_path = tempfile.mkstemp(dir=dataset_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, os.path.join(dataset_dir, INDEX_FILE))
+
+
+def append_faces(dataset_dir, student_id, crops):
+    """Normalize grayscale face crops and append them for student_id. Returns the dataset size."""
+    os.makedirs(dataset_dir, exist_ok=True)
+    index = _read_index(dataset_dir)
+    normalized = [normalize_face_roi(crop) for crop in crops]
+    if not normalized:
+        return index["count"]
+
+    pack_path = os.path.join(dataset_dir, PACK_FILE)
+    with open(pack_path, "r+b" if os.path.exists(pack_path) else "w+b") as f:
+        f.truncate(index["count"] * FACE_SIZE * FACE_SIZE)
+        f.seek(0, os.SEEK_END)
+        for face in normalized:
+            f.write(np.ascontiguousarray(face, dtype=np.uint8).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    index["count"] += len(normalized)
+    index["labels"].extend([str(student_id)] * len(normalized))
+    _write_index(dataset_dir, index)
+    return index["count"]
+
+
+def load_faces(dataset_dir):
+    """Return (faces, labels): a read-only N x 200 x 200 memmap and the student ID of each row."""
+    index = _read_index(dataset_dir)
+    if not index["count"]:
+        return np.empty((0, FACE_SIZE, FACE_SIZE), dtype=np.uint8), []
+    faces = np.memmap(
+        os.path.join(dataset_dir, PACK_FILE), dtype=np.uint8, mode="r", shape=(index["count"], FACE_SIZE, FACE_SIZE)
+    )
+    return faces, index["labels"]
+
+
+def pack_legacy_folders(dataset_dir):
+    """Append dataset/<student_id>/*.jpg crops of students not packed yet. Returns the IDs packed."""
+    if not os.path.isdir(dataset_dir):
+        return []
+    already = set(_read_index(dataset_dir)["labels"])
+    packed = []
+    for student_id in sorted(os.listdir(dataset_dir)):
+        folder = os.path.join(dataset_dir, student_id)
+        if student_id in already or not os.path.isdir(folder):
+            continue
+        crops = []
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(_LEGACY_IMAGE_EXTENSIONS):
+                crop = cv2.imread(os.path.join(folder, name), cv2.IMREAD_GRAYSCALE)
+                if crop is not None:
+                    crops.append(crop)
+        if crops:
+            append_faces(dataset_dir, student_id, crops)
+            packed.append(student_id)
+    return packed
+
+
+def holdout_mask(labels, every=5):
+    """Mark every `every`-th crop of each student with at least `every` crops as held out."""
+    labels = np.asarray(labels)
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse, kind="stable")
+    rank = np.empty(len(labels), dtype=np.int64)
+    rank[order] = np.arange(len(labels)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return (rank % every == every - 1) & (counts[inverse] >= every)
+
+
+def calibrate_thresholds(recognizer, faces, labels, holdout, quantile=0.95, margin=1.1, min_samples=2):
+    """Per-student distance thresholds from held-out crops.
+
+    `recognizer` must be trained without the held-out crops. A student's
+    threshold is the `quantile` of their genuine held-out distances times
+    `margin`, kept below the closest held-out crop of another student that the
+    model matched to them, and clamped to the calibrated bounds. Returns
+    ({student_id: threshold}, stats).
+    """
+    held = np.flatnonzero(holdout)
+    if not held.size:
+        return {}, {"holdout": 0, "genuine_rate": None}
+    predictions = np.array([recognizer.predict(np.asarray(faces[i])) for i in held], dtype=np.float64)
+    predicted = predictions[:, 0].astype(np.int64)
+    distance = predictions[:, 1]
+    truth = np.array([int(labels[i]) for i in held], dtype=np.int64)
+    genuine = predicted == truth
+
+    # Quantile per student in one pass: sort by (student, distance), pick by offset.
+    g_label, g_dist = truth[genuine], distance[genuine]
+    order = np.lexsort((g_dist, g_label))
+    g_label, g_dist = g_label[order], g_dist[order]
+    students, start, count = np.unique(g_label, return_index=True, return_counts=True)
+    thresholds = g_dist[start + np.floor(quantile * (count - 1)).astype(np.int64)] * margin
+
+    # Closest impostor per student: held-out crops of others the model assigned to them.
+    closest_impostor = np.full(students.shape, np.inf)
+    i_label, i_dist = predicted[~genuine], distance[~genuine]
+    slot = np.searchsorted(students, i_label)
+    matched = (slot < students.size) & (students[np.minimum(slot, students.size - 1)] == i_label)
+    np.minimum.at(closest_impostor, slot[matched], i_dist[matched])
+    thresholds = np.minimum(thresholds, closest_impostor * 0.98)
+    thresholds = np.clip(thresholds, CALIBRATED_MIN_DISTANCE, CALIBRATED_MAX_DISTANCE)
+
+    keep = count >= min_samples
+    per_student = {str(int(sid)): round(float(t), 2) for sid, t in zip(students[keep], thresholds[keep])}
+    stats = {"holdout": int(held.size), "genuine_rate": round(float(genuine.mean()), 4)}
+    return per_student, stats
+
+
+def thresholds_path(model_path):
+    """The one calibrated thresholds file, also for section shards (model/shards/<section>.xml).
+
+    A shard holds the same crops of its students as the college-wide model, so
+    their genuine distances are the same; the college-wide calibration also
+    saw more impostors, which only makes its thresholds stricter.
+    """
+    model_dir = os.path.dirname(model_path)
+    if os.path.basename(model_dir) == SHARDS_DIR:
+        model_dir = os.path.dirname(model_dir)
+    return os.path.join(model_dir, THRESHOLDS_FILE)
+
+
+def save_thresholds(model_path, thresholds, stats):
+    payload = {
+        "default": DEFAULT_MAX_DISTANCE,
+        "thresholds": thresholds,
+        "stats": stats,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+    target = thresholds_path(model_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, target)
+
+
+def section_key(branch, year):
+    """File-safe section name, e.g. ("CSE", "3rd Year") -> "cse-3rd-year". None without both parts."""
+    if not (branch or "").strip() or not (year or "").strip():
+        return None
+    return re.sub(r"[^a-z0-9]+", "-", f"{branch}-{year}".lower()).strip("-") or None
+
+
+def shard_model_path(model_path, section):
+    return os.path.join(os.path.dirname(model_path), SHARDS_DIR, f"{section}.xml")
+
+
+def save_shard_index(model_path, sections):
+    """Write the shard index and delete shard models of sections that are gone."""
+    shards_dir = os.path.join(os.path.dirname(model_path), SHARDS_DIR)
+    os.makedirs(shards_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=shards_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"sections": sections}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(shards_dir, SHARD_INDEX_FILE))
+    for name in os.listdir(shards_dir):
+        if name.endswith(".xml") and name[: -len(".xml")] not in sections:
+            os.remove(os.path.join(shards_dir, name))
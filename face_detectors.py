@@ -0,0 +1,176 @@
+"""
+Interchangeable face detectors, chosen with FACE_DETECTOR.
+
+- "haar"       haarcascade_frontalface_default.xml (ships with OpenCV; the default)
+- "haar_alt2"  haarcascade_frontalface_alt2.xml (ships with OpenCV)
+- "lbp"        lbpcascade_frontalface_improved.xml (committed in model/detectors/)
+- "yunet"      face_detection_yunet_2023mar.onnx (OpenCV DNN; handles turned and
+               tilted faces best; fetched with tools/fetch_face_detectors.py)
+
+LBP and YuNet model files are read from FACE_DETECTOR_MODEL_DIR (default
+model/detectors/, where SHA256SUMS pins them). Every detector returns
+(x, y, w, h) boxes in frame coordinates, so recognition crops the equalized
+grayscale frame the same way whichever backend found the face. YuNet boxes
+are squared around their center to match the cascade crops the model was
+trained on; still, recapture faces after switching detectors for best results.
+
+benchmark() times a detector on a labeled frame set and reports recall;
+tools/bench_face_detectors.py runs it for every available backend.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from face_dataset import frame_to_gray
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+DEFAULT_BACKEND = os.environ.get("FACE_DETECTOR", "haar").strip().lower() or "haar"
+MODEL_DIR = os.environ.get("FACE_DETECTOR_MODEL_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "model", "detectors"
+)
+MIN_FACE_SIZE = 80
+
+LBP_MODEL_FILE = "lbpcascade_frontalface_improved.xml"
+YUNET_MODEL_FILE = "face_detection_yunet_2023mar.onnx"
+
+
+class CascadeDetector:
+    """Haar or LBP cascade on the equalized grayscale frame."""
+
+    def __init__(self, path, scale_factor=1.15, min_neighbors=6, min_size=MIN_FACE_SIZE):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Face detector model not found: {path}")
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise ValueError(f"Face detector model could not be loaded: {path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def detect(self, frame, gray=None):
+        gray = frame_to_gray(frame) if gray is None else gray
+        faces = self.cascade.detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=(self.min_size, self.min_size)
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+class YuNetDetector:
+    """OpenCV's YuNet CNN (cv2.FaceDetectorYN), one instance per thread."""
+
+    def __init__(self, path, score_threshold=0.8, min_size=MIN_FACE_SIZE):
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Face detector model not found: {path} (fetch it with tools/fetch_face_detectors.py yunet)"
+            )
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise ValueError("This OpenCV build has no FaceDetectorYN (needs 4.5.4+).")
+        self.path = path
+        self.score_threshold = score_threshold
+        self.min_size = min_size
+        self._local = threading.local()
+        self._instance((320, 320))  # fail at startup, not on the first frame
+
+    def _instance(self, size):
+        net = getattr(self._local, "net", None)
+        if net is None:
+            net = cv2.FaceDetectorYN.create(self.path, "", size, self.score_threshold, 0.3, 50)
+            self._local.net = net
+        if getattr(self._local, "size", None) != size:
+            net.setInputSize(size)
+            self._local.size = size
+        return net
+
+    def detect(self, frame, gray=None):
+        color = frame if frame.ndim == 3 else cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        height, width = color.shape[:2]
+        _, found = self._instance((width, height)).detect(color)
+        boxes = []
+        for x, y, w, h in (found[:, :4] if found is not None else ()):
+            side = max(w, h)
+            left = int(max(0, x + w / 2 - side / 2))
+            top = int(max(0, y + h / 2 - side / 2))
+            side = int(min(side, width - left, height - top))
+            if side >= self.min_size:
+                boxes.append((left, top, side, side))
+        return boxes
+
+
+def _haar(name):
+    return lambda: CascadeDetector(cv2.data.haarcascades + name)
+
+
+BACKENDS = {
+    "haar": _haar("haarcascade_frontalface_default.xml"),
+    "haar_alt2": _haar("haarcascade_frontalface_alt2.xml"),
+    "lbp": lambda: CascadeDetector(os.path.join(MODEL_DIR, LBP_MODEL_FILE), scale_factor=1.1, min_neighbors=4),
+    "yunet": lambda: YuNetDetector(os.path.join(MODEL_DIR, YUNET_MODEL_FILE)),
+}
+
+
+def create_detector(name=None):
+    """Build the configured detector. Raises ValueError/FileNotFoundError with a readable message."""
+    name = (name or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown face detector {name!r}; choose one of {', '.join(BACKENDS)}.")
+    return BACKENDS[name]()
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = inter_w * inter_h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def benchmark(detector, samples, iou_threshold=0.3, warmup=3, repeat=1):
+    """Time `detector` on [(frame, labeled boxes)] and score it.
+
+    A labeled face counts as found when a detection overlaps it by at least
+    `iou_threshold` (cascade and CNN boxes frame a face differently, so the
+    bar is lower than the usual 0.5). Each frame is timed `repeat` times.
+    Returns latency percentiles in ms, recall, and detections that matched no
+    labeled face.
+    """
+    for frame, _ in samples[:warmup]:
+        detector.detect(frame)
+    latencies = []
+    labeled = found = false_positives = 0
+    for frame, truth in samples:
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            boxes = detector.detect(frame)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+        unmatched = list(boxes)
+        for face in truth:
+            labeled += 1
+            best = max(unmatched, key=lambda box: _iou(box, face), default=None)
+            if best is not None and _iou(best, face) >= iou_threshold:
+                found += 1
+                unmatched.remove(best)
+        false_positives += len(unmatched)
+    latencies = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        "frames": len(samples),
+        "faces": labeled,
+        "recall": found / labeled if labeled else None,
+        "false_positives": false_positives,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "mean_ms": float(latencies.mean()),
+    }
@@ -0,0 +1,132 @@
+"""
+Server-sent events fan-out for the live teacher dashboard.
+
+EventHub keeps one bounded queue per open stream, up to a per-worker limit:
+every stream holds a worker thread, so streams over the limit are refused
+instead of starving normal requests. With gunicorn running several workers, a mark
+committed in one worker must reach streams held by the others; set
+LIVE_EVENTS_BACKEND to a redis:// URL to relay events through Redis pub/sub.
+Without a backend, events stay in the worker that produced them.
+"""
+
+import json
+import queue
+import threading
+
+
+def format_sse(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in json.dumps(data, separators=(",", ":")).splitlines())
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next (event_id, event, data), or None on timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class RedisBroker:
+    def __init__(self, url, channel="campusnexus:live-events"):
+        try:
+            import redis
+        except Exception:
+            raise RuntimeError("LIVE_EVENTS_BACKEND uses redis but the redis package is not installed.")
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def publish(self, event, data):
+        self.client.publish(self.channel, json.dumps({"event": event, "data": data}))
+
+    def listen(self, deliver):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            try:
+                payload = json.loads(message["data"])
+                deliver(payload["event"], payload["data"])
+            except (ValueError, KeyError, TypeError):
+                continue
+
+
+def broker_from_url(url):
+    url = (url or "").strip()
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported live events backend: {url}")
+
+
+class EventHub:
+    def __init__(self, broker=None, max_queue=100):
+        self.broker = broker
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, limit=None):
+        """A new Subscription, or None when `limit` streams are already open in this worker."""
+        sub = Subscription(self.max_queue)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(sub)
+        self._ensure_listener()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event, data):
+        if self.broker is not None:
+            # Delivered back to this worker by the listener, like every other worker.
+            self.broker.publish(event, data)
+        else:
+            self._deliver(event, data)
+
+    def _deliver(self, event, data):
+        with self._lock:
+            self._next_id += 1
+            item = (self._next_id, event, data)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(item)
+            except queue.Full:
+                # A stalled tab; its stream closes and the browser reconnects with fresh counts.
+                sub.overflowed = True
+
+    def _ensure_listener(self):
+        # Started lazily so each gunicorn worker gets its own thread after fork.
+        if self.broker is None:
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen_forever, name="live-events", daemon=True)
+            self._listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self.broker.listen(self._deliver)
+            except Exception:
+                threading.Event().wait(2.0)
@@ -0,0 +1,78 @@
+import datetime
+
+from flask_sqlalchemy import SQLAlchemy
+
+# Bound to the Flask app in app.create_app() via db.init_app(app).
+db = SQLAlchemy()
+
+
+class Student(db.Model):
+    __tablename__ = "students"
+    student_id = db.Column(db.String(40), primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    branch = db.Column(db.String(80), nullable=True)
+    year = db.Column(db.String(50), nullable=True)
+    email = db.Column(db.String(200), nullable=True)
+    phone = db.Column(db.String(40), nullable=True)
+    parent_email = db.Column(db.String(200), nullable=True)
+    parent_phone = db.Column(db.String(40), nullable=True)
+
+
+class User(db.Model):
+    __tablename__ = "users"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    username = db.Column(db.String(100), nullable=False, index=True)
+    password = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(20), nullable=False, index=True)
+    name = db.Column(db.String(120), nullable=True)
+    linked_student_id = db.Column(db.String(40), db.ForeignKey("students.student_id"), nullable=True)
+
+
+class Attendance(db.Model):
+    __tablename__ = "attendance"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    student_id = db.Column(db.String(40), db.ForeignKey("students.student_id"), nullable=False, index=True)
+    date = db.Column(db.String(10), nullable=False, index=True)
+    time = db.Column(db.String(8), nullable=False)
+    kiosk_id = db.Column(db.String(64), nullable=True)  # browser kiosk that captured the mark, if any
+
+
+class StudentAttendanceStats(db.Model):
+    """Per-student attendance counters kept in step with attendance writes (see attendance_stats.py)."""
+
+    __tablename__ = "student_attendance_stats"
+    student_id = db.Column(db.String(40), db.ForeignKey("students.student_id"), primary_key=True)
+    total_marks = db.Column(db.Integer, nullable=False, default=0)  # archived years included
+    month_key = db.Column(db.String(7), nullable=False)  # YYYY-MM that month_marks counts
+    month_marks = db.Column(db.Integer, nullable=False, default=0)
+    last_date = db.Column(db.String(10), nullable=False)
+    last_time = db.Column(db.String(8), nullable=False)
+    streak = db.Column(db.Integer, nullable=False, default=1)  # school days in a row ending at last_date
+
+
+class Announcement(db.Model):
+    __tablename__ = "announcements"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    date = db.Column(db.String(10), nullable=False)
+
+    __table_args__ = (db.Index("ix_announcements_date_id", "date", "id"),)
+
+
+class Resource(db.Model):
+    __tablename__ = "resources"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(30), nullable=False, index=True)  # notes or syllabus
+    subject = db.Column(db.String(200), nullable=True)
+    topic = db.Column(db.String(200), nullable=True)
+    file_name = db.Column(db.String(300), nullable=False)
+    storage_path = db.Column(db.String(500), nullable=False)
+    file_url = db.Column(db.String(1000), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # sha256 of the stored blob
+    uploaded_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_resources_kind_uploaded_at", "kind", "uploaded_at"),
+        db.Index("ix_resources_file_name", "file_name"),
+    )
@@ -0,0 +1,102 @@
+"""
+Email (SMTP) and SMS (Twilio) delivery for attendance notifications.
+
+Imported lazily by app.py so web workers that never send a notification do
+not pay for smtplib/email/requests at boot.
+"""
+
+import os
+
+import metrics
+
+NOTIFICATIONS_TOTAL = metrics.Counter(
+    "campusnexus_notifications_total", "Attendance notification sends by channel and outcome.", ("channel", "outcome")
+)
+
+
+def _is_truthy(value):
+    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+
+
+def send_email(to_email, subject, message):
+    smtp_host = os.environ.get("SMTP_HOST", "").strip()
+    smtp_port = int(os.environ.get("SMTP_PORT", "587"))
+    smtp_user = os.environ.get("SMTP_USER", "").strip()
+    smtp_pass = os.environ.get("SMTP_PASS", "").strip()
+    smtp_from = os.environ.get("SMTP_FROM", smtp_user).strip()
+    use_tls = _is_truthy(os.environ.get("SMTP_USE_TLS", "true"))
+
+    if not (smtp_host and smtp_user and smtp_pass and smtp_from):
+        return False, "SMTP not configured"
+
+    import smtplib
+    from email.message import EmailMessage
+
+    try:
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = smtp_from
+        msg["To"] = to_email
+        msg.set_content(message)
+
+        with smtplib.SMTP(smtp_host, smtp_port, timeout=20) as server:
+            if use_tls:
+                server.starttls()
+            server.login(smtp_user, smtp_pass)
+            server.send_message(msg)
+        return True, "sent"
+    except Exception as exc:
+        return False, f"email error: {exc}"
+
+
+def send_sms(to_phone, message):
+    account_sid = os.environ.get("TWILIO_ACCOUNT_SID", "").strip()
+    auth_token = os.environ.get("TWILIO_AUTH_TOKEN", "").strip()
+    from_phone = os.environ.get("TWILIO_FROM_PHONE", "").strip()
+
+    if not (account_sid and auth_token and from_phone):
+        return False, "Twilio not configured"
+
+    # Overridable so benchmarks/tests can point at a local stand-in endpoint.
+    api_base = os.environ.get("TWILIO_API_BASE", "https://api.twilio.com").strip().rstrip("/")
+
+    import requests
+
+    try:
+        url = f"{api_base}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        payload = {"From": from_phone, "To": to_phone, "Body": message}
+        resp = requests.post(url, data=payload, auth=(account_sid, auth_token), timeout=20)
+        if resp.status_code in (200, 201):
+            return True, "sent"
+        return False, f"sms error: {resp.status_code}"
+    except Exception as exc:
+        return False, f"sms error: {exc}"
+
+
+def _outcome(ok, reason):
+    if ok:
+        return "sent"
+    return "not_configured" if "not configured" in reason else "failed"
+
+
+def deliver(emails, phones, subject, message):
+    result = {
+        "emails_sent": 0,
+        "sms_sent": 0,
+        "emails_total": len(emails),
+        "sms_total": len(phones),
+    }
+
+    for email in emails:
+        ok, reason = send_email(email, subject, message)
+        NOTIFICATIONS_TOTAL.inc(channel="email", outcome=_outcome(ok, reason))
+        if ok:
+            result["emails_sent"] += 1
+
+    for phone in phones:
+        ok, reason = send_sms(phone, message)
+        NOTIFICATIONS_TOTAL.inc(channel="sms", outcome=_outcome(ok, reason))
+        if ok:
+            result["sms_sent"] += 1
+
+    return result
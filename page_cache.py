@@ -0,0 +1,174 @@
+"""
+Rendered-page cache for role-wide student/parent views.
+
+PageCache is an in-process LRU with a TTL and per-key single-flight, so a burst
+of misses for the same page (e.g. right after an announcement) renders once.
+An optional shared backend lets gunicorn workers share rendered pages and the
+data version:
+
+- "dir:/path"      files in a local directory (works across workers on one host)
+- "redis://..."    Redis, if the `redis` package is installed
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class DirectoryBackend:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".html")
+
+    def _write_atomic(self, target, payload):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, target)
+
+    def get(self, key):
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                expires_at, _, value = f.read().partition("\n")
+        except OSError:
+            return None
+        if float(expires_at or 0) < time.time():
+            return None
+        return value
+
+    def set(self, key, value, ttl_seconds):
+        self._write_atomic(self._file(key), f"{time.time() + ttl_seconds}\n{value}")
+
+    def get_version(self):
+        try:
+            with open(os.path.join(self.path, "version"), "r", encoding="utf-8") as f:
+                return f.read().strip() or "0"
+        except OSError:
+            return "0"
+
+    def bump_version(self):
+        # A timestamp instead of a counter avoids read-modify-write races between workers.
+        self._write_atomic(os.path.join(self.path, "version"), str(time.time_ns()))
+
+
+class RedisBackend:
+    def __init__(self, url, prefix="page-cache:"):
+        try:
+            import redis
+        except Exception:
+            raise RuntimeError("PAGE_CACHE_BACKEND uses redis but the redis package is not installed.")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key, value, ttl_seconds):
+        self.client.setex(self.prefix + key, max(int(ttl_seconds), 1), value.encode("utf-8"))
+
+    def get_version(self):
+        value = self.client.get(self.prefix + "version")
+        return value.decode("ascii") if value is not None else "0"
+
+    def bump_version(self):
+        self.client.incr(self.prefix + "version")
+
+
+def backend_from_url(url):
+    url = (url or "").strip()
+    if not url:
+        return None
+    if url.startswith("dir:"):
+        return DirectoryBackend(url[len("dir:"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported page cache backend: {url}")
+
+
+class PageCache:
+    def __init__(self, max_entries=256, ttl_seconds=300.0, backend=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._local_version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def version(self):
+        if self.backend is not None:
+            return self.backend.get_version()
+        return str(self._local_version)
+
+    def bump_version(self):
+        with self._lock:
+            self._local_version += 1
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.bump_version()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._entries.move_to_end(key)
+                    return hit[1]
+                del self._entries[key]
+
+        if self.backend is None:
+            return None
+        value = self.backend.get(key)
+        if value is not None:
+            self._store_local(key, value)
+        return value
+
+    def set(self, key, value):
+        self._store_local(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl_seconds)
+
+    def _store_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_render(self, key, render):
+        """Return the cached value for key, rendering it at most once per process on a miss.
+
+        render() may return None to mark the result as uncacheable; None is then returned.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have rendered it while we waited.
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+            try:
+                value = render()
+                if value is not None:
+                    self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
@@ -0,0 +1,185 @@
+"""
+Per-day "present today" set for the attendance mark path.
+
+During the kiosk rush the same face is recognized many times in a row. The set
+answers "already marked today?" and "is this a known student?" without a
+database round trip. Both are positive-only caches: a miss falls through to
+the database, so a cold or stale set only costs the query it would have cost
+anyway and can never mark someone present who is not.
+
+Known student IDs are kept per worker and reloaded every few minutes. Present
+IDs are keyed by day and can be shared across gunicorn workers:
+
+- default          per worker, in memory
+- "dir:/path"      one marker file per student per day (on one host; use a
+                   /dev/shm path to keep it in shared memory)
+- "redis://..."    a Redis set per day, if the `redis` package is installed
+
+The first lookup of each day (startup, or the first mark after midnight) warms
+the day from the database once and drops older days.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._days = {}
+        self._warm = set()
+        self._lock = threading.Lock()
+
+    def is_warm(self, day):
+        return day in self._warm
+
+    def set_warm(self, day):
+        self._warm.add(day)
+
+    def add(self, day, student_ids):
+        with self._lock:
+            self._days.setdefault(day, set()).update(student_ids)
+
+    def contains(self, day, student_id):
+        return student_id in self._days.get(day, ())
+
+    def drop_other_days(self, day):
+        with self._lock:
+            for other in [d for d in self._days if d != day]:
+                del self._days[other]
+            self._warm &= {day}
+
+
+class DirectoryBackend:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _day_dir(self, day):
+        return os.path.join(self.path, day)
+
+    def _marker(self, day, student_id):
+        # Hex keeps any student ID a plain file name ("..", slashes).
+        return os.path.join(self._day_dir(day), student_id.encode("utf-8").hex())
+
+    def is_warm(self, day):
+        return os.path.exists(os.path.join(self._day_dir(day), ".warm"))
+
+    def set_warm(self, day):
+        open(os.path.join(self._day_dir(day), ".warm"), "a").close()
+
+    def add(self, day, student_ids):
+        os.makedirs(self._day_dir(day), exist_ok=True)
+        for student_id in student_ids:
+            open(self._marker(day, student_id), "a").close()
+
+    def contains(self, day, student_id):
+        return os.path.exists(self._marker(day, student_id))
+
+    def drop_other_days(self, day):
+        for name in os.listdir(self.path):
+            if name != day:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+
+class RedisBackend:
+    def __init__(self, url, prefix="presence:", ttl_seconds=2 * 86400):
+        try:
+            import redis
+        except Exception:
+            raise RuntimeError("PRESENCE_BACKEND uses redis but the redis package is not installed.")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def is_warm(self, day):
+        return bool(self.client.exists(f"{self.prefix}{day}:warm"))
+
+    def set_warm(self, day):
+        self.client.setex(f"{self.prefix}{day}:warm", self.ttl_seconds, b"1")
+
+    def add(self, day, student_ids):
+        student_ids = list(student_ids)
+        if not student_ids:
+            return
+        key = self.prefix + day
+        pipe = self.client.pipeline()
+        pipe.sadd(key, *student_ids)
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def contains(self, day, student_id):
+        return bool(self.client.sismember(self.prefix + day, student_id))
+
+    def drop_other_days(self, day):
+        pass  # keys expire on their own
+
+
+def backend_from_url(url):
+    url = (url or "").strip()
+    if not url:
+        return None
+    if url.startswith("dir:"):
+        return DirectoryBackend(url[len("dir:"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported presence backend: {url}")
+
+
+class PresenceSet:
+    def __init__(self, load_present, load_known, backend=None, known_ttl_seconds=300.0):
+        """load_present(day) and load_known() return iterables of student IDs from the database."""
+        self.load_present = load_present
+        self.load_known = load_known
+        self.backend = backend or MemoryBackend()
+        self.known_ttl_seconds = known_ttl_seconds
+        self._known = frozenset()
+        self._known_expires_at = 0.0
+        self._day = None
+        self._lock = threading.Lock()
+
+    def warm(self, day):
+        self._ensure_day(day)
+        self._ensure_known()
+
+    def _ensure_day(self, day):
+        if self._day == day:
+            return
+        with self._lock:
+            if self._day == day:
+                return
+            # A mark committed while this runs is added by its own request too.
+            if not self.backend.is_warm(day):
+                self.backend.add(day, self.load_present(day))
+                self.backend.set_warm(day)
+            self.backend.drop_other_days(day)
+            self._day = day
+
+    def _ensure_known(self):
+        if time.time() < self._known_expires_at:
+            return
+        with self._lock:
+            if time.time() < self._known_expires_at:
+                return
+            self._known = frozenset(self.load_known())
+            self._known_expires_at = time.time() + self.known_ttl_seconds
+
+    def is_present(self, day, student_id):
+        self._ensure_day(day)
+        return self.backend.contains(day, student_id)
+
+    def mark_present(self, day, student_id):
+        self._ensure_day(day)
+        self.backend.add(day, (student_id,))
+
+    def is_known(self, student_id):
+        self._ensure_known()
+        return student_id in self._known
+
+    def add_known(self, student_id):
+        with self._lock:
+            self._known = self._known | {student_id}
+
+    def invalidate_known(self):
+        self._known_expires_at = 0.0
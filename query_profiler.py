@@ -0,0 +1,176 @@
+"""
+Opt-in SQL profiler for spotting N+1 loops and slow queries.
+
+Statements executed while a profile is active (per thread) are grouped by
+normalized SQL text, so the same query with different parameters counts as a
+repeat. Each group keeps the app call sites that issued it.
+
+Flask: set QUERY_PROFILER=1 and call init_app(app); every request logs repeated
+statements (>= QUERY_PROFILER_REPEATS, default 5) and statements slower than
+QUERY_PROFILER_SLOW_MS (default 100).
+
+pytest: the query_budget fixture in tests/conftest.py wraps profile_queries();
+per-route budgets live in tests/test_query_budgets.py:
+
+    def test_parent_dashboard_budget(parent_client, query_budget):
+        with query_budget(max_queries=1, max_repeats=1):
+            parent_client.get("/parent/dashboard")
+"""
+
+import os
+import re
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_local = threading.local()
+_listeners_lock = threading.Lock()
+_listeners_installed = False
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"(%\(\w+\)s|:\w+|\$\d+|%s|\?)")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Collapse literals, bind params and IN lists so parameter-only differences group together."""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _call_site():
+    # Innermost frame in this repo that is not the profiler itself.
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if frame.filename.startswith("<"):
+            continue
+        path = os.path.abspath(frame.filename)
+        if not path.startswith(BASE_DIR) or path == os.path.abspath(__file__):
+            continue
+        if f"{os.sep}site-packages{os.sep}" in path or f"{os.sep}.venv{os.sep}" in path:
+            continue
+        return f"{os.path.relpath(path, BASE_DIR)}:{frame.lineno} in {frame.name}"
+    return "<unknown>"
+
+
+class QueryProfile:
+    def __init__(self):
+        self.groups = OrderedDict()
+        self.total_queries = 0
+        self.total_seconds = 0.0
+
+    def record(self, statement, seconds, call_site):
+        key = normalize_sql(statement)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {"sql": key, "count": 0, "seconds": 0.0, "max_seconds": 0.0, "call_sites": {}}
+        group["count"] += 1
+        group["seconds"] += seconds
+        group["max_seconds"] = max(group["max_seconds"], seconds)
+        group["call_sites"][call_site] = group["call_sites"].get(call_site, 0) + 1
+        self.total_queries += 1
+        self.total_seconds += seconds
+
+    def repeated(self, threshold):
+        return [g for g in self.groups.values() if g["count"] >= threshold]
+
+    def slow(self, slow_ms):
+        return [g for g in self.groups.values() if g["max_seconds"] * 1000.0 >= slow_ms]
+
+    def report(self, repeat_threshold=5, slow_ms=100.0):
+        lines = [f"{self.total_queries} queries in {self.total_seconds * 1000.0:.1f} ms"]
+        for group in self.repeated(repeat_threshold):
+            lines.append(f"  REPEATED x{group['count']}: {group['sql'][:300]}")
+            lines.extend(f"    at {site} (x{n})" for site, n in group["call_sites"].items())
+        for group in self.slow(slow_ms):
+            lines.append(f"  SLOW {group['max_seconds'] * 1000.0:.1f} ms: {group['sql'][:300]}")
+            lines.extend(f"    at {site}" for site in group["call_sites"])
+        return "\n".join(lines)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, "profile", None) is not None:
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_local, "profile", None)
+    started = conn.info.get("profiler_started")
+    if profile is None or not started:
+        return
+    profile.record(statement, time.perf_counter() - started.pop(), _call_site())
+
+
+def _on_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("profiler_started"):
+        conn.info["profiler_started"].pop()
+
+
+def _install_listeners():
+    global _listeners_installed
+    with _listeners_lock:
+        if _listeners_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_execute)
+        event.listen(Engine, "after_cursor_execute", _after_execute)
+        event.listen(Engine, "handle_error", _on_error)
+        _listeners_installed = True
+
+
+def start_profile():
+    _install_listeners()
+    _local.profile = QueryProfile()
+    return _local.profile
+
+
+def stop_profile():
+    profile = getattr(_local, "profile", None)
+    _local.profile = None
+    return profile
+
+
+@contextmanager
+def profile_queries():
+    profile = start_profile()
+    try:
+        yield profile
+    finally:
+        stop_profile()
+
+
+def init_app(app):
+    if os.environ.get("QUERY_PROFILER", "").strip().lower() not in {"1", "true", "yes", "on"}:
+        return
+    repeat_threshold = int(os.environ.get("QUERY_PROFILER_REPEATS", "5"))
+    slow_ms = float(os.environ.get("QUERY_PROFILER_SLOW_MS", "100"))
+
+    @app.before_request
+    def _start_query_profile():
+        start_profile()
+
+    @app.after_request
+    def _report_query_profile(response):
+        from flask import request
+
+        profile = stop_profile()
+        if profile is not None and (profile.repeated(repeat_threshold) or profile.slow(slow_ms)):
+            app.logger.warning(
+                "Query profile for %s %s\n%s",
+                request.method,
+                request.path,
+                profile.report(repeat_threshold, slow_ms),
+            )
+        return response
+
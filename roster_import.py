@@ -0,0 +1,309 @@
+"""
+Bulk roster import from CSV: students, their contacts, and student/parent logins.
+
+The CSV is validated in one streaming pass; valid rows are upserted in batches
+and invalid rows are reported with their line number instead of aborting the
+whole file. The import runs in a single transaction. A dry run looks up the
+existing students and logins batch by batch and reports the same counts, but
+writes nothing.
+
+Columns (header row required, order free):
+  student_id, name                          required
+  branch, year                              optional; blank keeps the stored value
+  email, phone, parent_email, parent_phone  optional; blank keeps the stored value
+  password                                  student login; new students default to the last 4 digits
+  parent_username, parent_password          optional parent login linked to this student
+
+Students go through COPY into a temp staging table + INSERT ... ON CONFLICT on
+Postgres, and batched executemany upserts on SQLite.
+"""
+
+import csv
+import io
+import re
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from models import Student, User
+
+BATCH_ROWS = 1000
+MAX_REPORTED_ERRORS = 500
+
+STUDENT_FIELDS = ("student_id", "name", "branch", "year", "email", "phone", "parent_email", "parent_phone")
+ACCOUNT_FIELDS = ("password", "parent_username", "parent_password")
+ROSTER_COLUMNS = STUDENT_FIELDS + ACCOUNT_FIELDS
+REQUIRED_COLUMNS = ("student_id", "name")
+
+_MAX_LENGTHS = {
+    "student_id": 40,
+    "name": 120,
+    "branch": 80,
+    "year": 50,
+    "email": 200,
+    "phone": 40,
+    "parent_email": 200,
+    "parent_phone": 40,
+    "password": 200,
+    "parent_username": 100,
+    "parent_password": 200,
+}
+_STUDENT_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_PHONE = re.compile(r"^\+?[0-9][0-9 ()-]{5,19}$")
+# Blank optional fields must not overwrite stored values.
+_KEEP_IF_BLANK = ("branch", "year", "email", "phone", "parent_email", "parent_phone")
+
+
+def validate_row(row):
+    """Return (record, errors) for one CSV row; record holds stripped values with blanks as None."""
+    record = {key: ((row.get(key) or "").strip() or None) for key in ROSTER_COLUMNS}
+    errors = []
+    for key in REQUIRED_COLUMNS:
+        if not record[key]:
+            errors.append(f"{key} is required")
+    for key, limit in _MAX_LENGTHS.items():
+        if record[key] and len(record[key]) > limit:
+            errors.append(f"{key} longer than {limit} characters")
+    if record["student_id"] and not _STUDENT_ID.match(record["student_id"]):
+        errors.append("student_id may only contain letters, digits, '-' and '_'")
+    for key in ("email", "parent_email"):
+        if record[key] and not _EMAIL.match(record[key]):
+            errors.append(f"{key} is not a valid email address")
+    for key in ("phone", "parent_phone"):
+        if record[key] and not _PHONE.match(record[key]):
+            errors.append(f"{key} is not a valid phone number")
+    if record["parent_username"] and not record["parent_password"]:
+        errors.append("parent_password is required with parent_username")
+    if record["parent_password"] and not record["parent_username"]:
+        errors.append("parent_username is required with parent_password")
+    return record, errors
+
+
+def _upsert_students_postgres(session, records):
+    conn = session.connection()
+    columns = ", ".join(STUDENT_FIELDS)
+    conn.exec_driver_sql(
+        "CREATE TEMP TABLE IF NOT EXISTS roster_staging (LIKE students INCLUDING DEFAULTS) ON COMMIT DROP"
+    )
+    conn.exec_driver_sql("TRUNCATE roster_staging")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        # Unquoted empty fields are NULL in COPY's csv format.
+        writer.writerow(["" if record[key] is None else record[key] for key in STUDENT_FIELDS])
+    buffer.seek(0)
+
+    copy_sql = f"COPY roster_staging ({columns}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(copy_sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+    keep = ", ".join(f"{key} = COALESCE(EXCLUDED.{key}, students.{key})" for key in _KEEP_IF_BLANK)
+    conn.exec_driver_sql(
+        f"INSERT INTO students ({columns}) SELECT {columns} FROM roster_staging "
+        f"ON CONFLICT (student_id) DO UPDATE SET name = EXCLUDED.name, {keep}"
+    )
+
+
+def _upsert_students_sqlite(session, records):
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    stmt = sqlite_insert(Student)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Student.student_id],
+        set_={
+            "name": stmt.excluded.name,
+            **{key: func.coalesce(getattr(stmt.excluded, key), getattr(Student, key)) for key in _KEEP_IF_BLANK},
+        },
+    )
+    # A list of parameter sets runs as one executemany.
+    session.execute(stmt, [{key: record[key] for key in STUDENT_FIELDS} for record in records])
+
+
+def _upsert_students_generic(session, records, existing_ids):
+    new_rows = [{key: r[key] for key in STUDENT_FIELDS} for r in records if r["student_id"] not in existing_ids]
+    if new_rows:
+        session.execute(insert(Student), new_rows)
+    for record in records:
+        if record["student_id"] in existing_ids:
+            values = {"name": record["name"]}
+            values.update({key: record[key] for key in _KEEP_IF_BLANK if record[key] is not None})
+            session.execute(update(Student).where(Student.student_id == record["student_id"]).values(**values))
+
+
+def _upsert_accounts(session, records, report, planned=None):
+    """Create/update logins for a batch. `planned` (dry runs) collects parent links earlier batches would add."""
+    ids = [r["student_id"] for r in records]
+    student_users = {
+        username: user_id
+        for user_id, username in session.execute(
+            select(User.id, User.username).where(User.role == "student", User.username.in_(ids))
+        )
+    }
+    parent_names = sorted({r["parent_username"] for r in records if r["parent_username"]})
+    parent_links = {}
+    if parent_names:
+        parent_links = {
+            (username, linked): user_id
+            for user_id, username, linked in session.execute(
+                select(User.id, User.username, User.linked_student_id).where(
+                    User.role == "parent", User.username.in_(parent_names)
+                )
+            )
+        }
+    if planned is not None:
+        # A dry run wrote nothing, so count links from earlier batches as existing, like the real import does.
+        parent_links.update({key: "planned" for key in planned if key[0] in parent_names})
+
+    new_users = []
+    name_updates = []
+    password_updates = []
+    parent_passwords = {}
+    for record in records:
+        sid = record["student_id"]
+        user_id = student_users.get(sid)
+        if user_id is None:
+            password = record["password"] or (sid[-4:] if len(sid) >= 4 else sid)
+            new_users.append(
+                {"username": sid, "role": "student", "password": password, "name": record["name"], "linked_student_id": sid}
+            )
+        else:
+            name_updates.append({"user_id": user_id, "new_name": record["name"]})
+            if record["password"]:
+                password_updates.append({"user_id": user_id, "new_password": record["password"]})
+
+        username = record["parent_username"]
+        if username:
+            # Parent login checks one row per username, so every linked row shares the password.
+            parent_passwords[username] = record["parent_password"]
+            if (username, sid) not in parent_links:
+                new_users.append(
+                    {
+                        "username": username,
+                        "role": "parent",
+                        "password": record["parent_password"],
+                        "name": username,
+                        "linked_student_id": sid,
+                    }
+                )
+                parent_links[(username, sid)] = None
+
+    report["accounts_created"] += len(new_users)
+    report["accounts_updated"] += len({u["user_id"] for u in name_updates + password_updates}) + sum(
+        1 for key, user_id in parent_links.items() if user_id is not None and key[0] in parent_passwords
+    )
+    if planned is not None:
+        planned.update(key for key, user_id in parent_links.items() if user_id is None)
+        return
+    if new_users:
+        session.execute(insert(User), new_users)
+    # Core executemany on the table: ORM bulk-update-by-PK would not accept our WHERE clause.
+    users = User.__table__
+    if name_updates:
+        session.connection().execute(
+            update(users).where(users.c.id == bindparam("user_id")).values(name=bindparam("new_name")),
+            name_updates,
+        )
+    if password_updates:
+        session.connection().execute(
+            update(users).where(users.c.id == bindparam("user_id")).values(password=bindparam("new_password")),
+            password_updates,
+        )
+    if parent_passwords:
+        session.connection().execute(
+            update(users)
+            .where(users.c.role == "parent", users.c.username == bindparam("parent_username"))
+            .values(password=bindparam("new_password")),
+            [{"parent_username": u, "new_password": p} for u, p in parent_passwords.items()],
+        )
+
+
+def _flush_batch(session, records, report, planned=None):
+    """Upsert one batch of students and their accounts; a dry run (`planned` set) only counts."""
+    ids = [r["student_id"] for r in records]
+    existing_ids = set(session.execute(select(Student.student_id).where(Student.student_id.in_(ids))).scalars())
+    report["students_inserted"] += len(ids) - len(existing_ids)
+    report["students_updated"] += len(existing_ids)
+    if planned is not None:
+        _upsert_accounts(session, records, report, planned)
+        return
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        _upsert_students_postgres(session, records)
+    elif dialect == "sqlite":
+        _upsert_students_sqlite(session, records)
+    else:
+        _upsert_students_generic(session, records, existing_ids)
+    _upsert_accounts(session, records, report)
+
+
+def _add_error(report, line, student_id, message):
+    report["error_count"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "student_id": student_id, "message": message})
+
+
+def import_roster(session, text_stream, dry_run=False, batch_rows=BATCH_ROWS):
+    """Validate and upsert a roster CSV. Returns a report dict with counts and row-level errors."""
+    report = {
+        "rows": 0,
+        "valid_rows": 0,
+        "students_inserted": 0,
+        "students_updated": 0,
+        "accounts_created": 0,
+        "accounts_updated": 0,
+        "error_count": 0,
+        "errors": [],
+        "warnings": [],
+        "dry_run": dry_run,
+    }
+    reader = csv.DictReader(text_stream)
+    header = [(name or "").strip().lower() for name in (reader.fieldnames or [])]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        _add_error(report, 1, None, f"missing required column(s): {', '.join(missing)}")
+        return report
+    unknown = [name for name in header if name and name not in ROSTER_COLUMNS]
+    if unknown:
+        report["warnings"].append(f"unknown column(s) ignored: {', '.join(unknown)}")
+    reader.fieldnames = header
+
+    seen = set()
+    batch = []
+    planned = set() if dry_run else None
+    try:
+        for row in reader:
+            report["rows"] += 1
+            line = reader.line_num
+            record, errors = validate_row(row)
+            sid = record["student_id"]
+            if sid and sid in seen:
+                errors.append("duplicate student_id in this file")
+            if errors:
+                _add_error(report, line, sid, "; ".join(errors))
+                continue
+            seen.add(sid)
+            report["valid_rows"] += 1
+            batch.append(record)
+            if len(batch) >= batch_rows:
+                _flush_batch(session, batch, report, planned)
+                batch = []
+        if batch:
+            _flush_batch(session, batch, report, planned)
+
+        if dry_run:
+            session.rollback()
+        else:
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return report
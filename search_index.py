@@ -0,0 +1,148 @@
+"""
+Full-text search over uploaded notes/syllabus PDFs.
+
+- SQLite: FTS5 virtual table `resource_fts` (rowid = resources.id), ranked with bm25()
+- Postgres: `resource_search` table with a weighted tsvector + GIN index, ranked with ts_rank()
+
+Indexing is incremental (one resource per call) and is driven from a background
+worker in app.py so uploads never wait on PDF text extraction.
+"""
+
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+MAX_INDEXED_CHARS = 2_000_000
+
+# Control characters survive both snippet() and ts_headline() untouched and never
+# occur in extracted text, so we can escape the snippet first and add <mark> after.
+_HL_START = "\x02"
+_HL_STOP = "\x03"
+
+
+def extract_pdf_text(path, max_chars=MAX_INDEXED_CHARS):
+    # pypdf is imported here, not at module level, so workers only load it when indexing.
+    try:
+        from pypdf import PdfReader
+    except Exception:
+        return ""
+    try:
+        reader = PdfReader(path)
+    except Exception:
+        return ""
+
+    parts = []
+    total = 0
+    for page in reader.pages:
+        try:
+            page_text = page.extract_text() or ""
+        except Exception:
+            continue
+        page_text = page_text.replace(_HL_START, " ").replace(_HL_STOP, " ")
+        parts.append(page_text)
+        total += len(page_text)
+        if total >= max_chars:
+            break
+    return "\n".join(parts)[:max_chars]
+
+
+def ensure_search_schema(engine):
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS resource_search ("
+                    " resource_id INTEGER PRIMARY KEY REFERENCES resources(id) ON DELETE CASCADE,"
+                    " kind VARCHAR(30) NOT NULL,"
+                    " body TEXT NOT NULL,"
+                    " tsv TSVECTOR NOT NULL)"
+                )
+            )
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_resource_search_tsv ON resource_search USING GIN (tsv)"))
+        else:
+            conn.execute(
+                text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS resource_fts USING fts5("
+                    "subject, topic, body, kind UNINDEXED, tokenize='porter unicode61')"
+                )
+            )
+
+
+def index_document(engine, resource_id, kind, subject, topic, body):
+    params = {
+        "rid": resource_id,
+        "kind": kind,
+        "subject": subject or "",
+        "topic": topic or "",
+        "body": body or "",
+    }
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(
+                text(
+                    "INSERT INTO resource_search (resource_id, kind, body, tsv) VALUES ("
+                    " :rid, :kind, :body,"
+                    " setweight(to_tsvector('english', :subject), 'A') ||"
+                    " setweight(to_tsvector('english', :topic), 'B') ||"
+                    " setweight(to_tsvector('english', :body), 'C'))"
+                    " ON CONFLICT (resource_id) DO UPDATE SET"
+                    " kind = EXCLUDED.kind, body = EXCLUDED.body, tsv = EXCLUDED.tsv"
+                ),
+                params,
+            )
+        else:
+            conn.execute(text("DELETE FROM resource_fts WHERE rowid = :rid"), params)
+            conn.execute(
+                text(
+                    "INSERT INTO resource_fts (rowid, subject, topic, body, kind)"
+                    " VALUES (:rid, :subject, :topic, :body, :kind)"
+                ),
+                params,
+            )
+
+
+def _fts5_query(query):
+    # Quote each word so user input can never hit FTS5 operator syntax; prefix-match the words.
+    tokens = re.findall(r"\w+", query, flags=re.UNICODE)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _highlight(snippet):
+    escaped = str(escape(snippet or ""))
+    return Markup(escaped.replace(_HL_START, "<mark>").replace(_HL_STOP, "</mark>"))
+
+
+def search(engine, query, kind=None, limit=20, offset=0):
+    """Return [{"resource_id", "rank", "snippet"}] best match first; snippet is safe HTML."""
+    query = (query or "").strip()
+    if not query:
+        return []
+
+    params = {"kind": kind, "limit": limit, "offset": offset, "hs": _HL_START, "he": _HL_STOP}
+    kind_filter = " AND kind = :kind" if kind else ""
+
+    if engine.dialect.name == "postgresql":
+        params["q"] = query
+        params["hl_opts"] = f"StartSel={_HL_START}, StopSel={_HL_STOP}, MaxFragments=2"
+        sql = (
+            "SELECT resource_id, ts_rank(tsv, q) AS rank,"
+            " ts_headline('english', body, q, :hl_opts)"
+            " FROM resource_search, websearch_to_tsquery('english', :q) AS q"
+            f" WHERE tsv @@ q{kind_filter}"
+            " ORDER BY rank DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["q"] = _fts5_query(query)
+        if not params["q"]:
+            return []
+        sql = (
+            "SELECT rowid, bm25(resource_fts, 10.0, 5.0, 1.0) AS rank,"
+            " snippet(resource_fts, -1, :hs, :he, '…', 16)"
+            f" FROM resource_fts WHERE resource_fts MATCH :q{kind_filter}"
+            " ORDER BY rank LIMIT :limit OFFSET :offset"
+        )
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), params).fetchall()
+    return [{"resource_id": int(row[0]), "rank": float(row[1]), "snippet": _highlight(row[2])} for row in rows]
@@ -0,0 +1,171 @@
+"""
+File storage helpers for notes/syllabus uploads: chunked spooling with a size
+limit, content-addressed blob paths, and the Supabase Storage REST calls.
+
+Imported lazily by app.py; `requests` is only imported when the bucket is used.
+"""
+
+import datetime
+import hashlib
+import os
+import tempfile
+
+CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def stream_upload_to_temp(file_obj, target_dir, max_bytes):
+    """Copy an upload into a temp file in chunks, hashing as we go and enforcing max_bytes."""
+    os.makedirs(target_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=target_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file_obj.stream.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit.")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        remove_quietly(tmp_path)
+        raise
+    return tmp_path, size, digest.hexdigest()
+
+
+def blob_relpath(sha256):
+    # Content-addressed layout, sharded so no directory grows past a few hundred entries.
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def store_local_blob(tmp_path, target_dir, sha256):
+    """Move a spooled upload into its blob path (or drop it if that blob already exists)."""
+    rel_path = blob_relpath(sha256)
+    local_path = os.path.join(target_dir, rel_path)
+    if os.path.exists(local_path):
+        remove_quietly(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        os.replace(tmp_path, local_path)
+    return rel_path
+
+
+def supabase_config():
+    supabase_url = os.environ.get("SUPABASE_URL")
+    service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    bucket = os.environ.get("SUPABASE_STORAGE_BUCKET")
+    if supabase_url and service_key and bucket:
+        return supabase_url, service_key, bucket
+    return None
+
+
+def _auth_headers(service_key):
+    return {"apikey": service_key, "Authorization": f"Bearer {service_key}"}
+
+
+def public_url(config, storage_path):
+    supabase_url, _, bucket = config
+    return f"{supabase_url}/storage/v1/object/public/{bucket}/{storage_path}"
+
+
+def upload_to_bucket(config, storage_path, local_path, size, content_type):
+    """Stream a local file to the bucket. Returns (ok, error_message)."""
+    import requests
+
+    supabase_url, service_key, bucket = config
+    headers = dict(_auth_headers(service_key))
+    headers.update({"x-upsert": "true", "Content-Type": content_type, "Content-Length": str(size)})
+    try:
+        # requests streams file objects in blocks instead of loading them.
+        with open(local_path, "rb") as f:
+            response = requests.post(
+                f"{supabase_url}/storage/v1/object/{bucket}/{storage_path}", headers=headers, data=f, timeout=40
+            )
+    except requests.RequestException as exc:
+        return False, str(exc)
+    if response.status_code in (200, 201):
+        return True, None
+    return False, f"HTTP {response.status_code}"
+
+
+LIST_PAGE_SIZE = 1000
+
+
+def _bucket_timestamp(item):
+    """Epoch seconds of an object's last change (None if the listing has no usable date)."""
+    value = item.get("updated_at") or item.get("created_at")
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def list_bucket_objects(config, prefix):
+    """[(path, modified epoch seconds or None), ...] under `prefix`, following folders and pages."""
+    import requests
+
+    supabase_url, service_key, bucket = config
+    objects = []
+    offset = 0
+    while True:
+        resp = requests.post(
+            f"{supabase_url}/storage/v1/object/list/{bucket}",
+            headers=_auth_headers(service_key),
+            json={"prefix": prefix, "limit": LIST_PAGE_SIZE, "offset": offset, "sortBy": {"column": "name"}},
+            timeout=40,
+        )
+        resp.raise_for_status()
+        items = resp.json()
+        for item in items:
+            child = f"{prefix}/{item['name']}"
+            if item.get("id") is None:  # folder placeholder
+                objects.extend(list_bucket_objects(config, child))
+            else:
+                objects.append((child, _bucket_timestamp(item)))
+        if len(items) < LIST_PAGE_SIZE:
+            return objects
+        offset += len(items)
+
+
+def delete_bucket_objects(config, paths):
+    import requests
+
+    supabase_url, service_key, bucket = config
+    requests.delete(
+        f"{supabase_url}/storage/v1/object/{bucket}",
+        headers=_auth_headers(service_key),
+        json={"prefixes": list(paths)},
+        timeout=40,
+    ).raise_for_status()
+
+
+def download_to_temp(url, suffix=".pdf"):
+    import requests
+
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out, requests.get(url, stream=True, timeout=40) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(CHUNK_BYTES):
+                out.write(chunk)
+    except BaseException:
+        remove_quietly(tmp_path)
+        raise
+    return tmp_path
+
@@ -0,0 +1,159 @@
+"""
+Shared fixtures: the portal on a throwaway SQLite database with a small roster.
+
+The database URL has to be set before app.py is imported (the engine is built
+at import time), so it is set here, at collection. Notification credentials
+are cleared so alert routes never reach SMTP or Twilio, and shared cache/event
+backends fall back to in-process ones.
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+_DB_DIR = tempfile.mkdtemp(prefix="portal-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'attendance.db')}"
+os.environ["ATTENDANCE_ARCHIVE_DIR"] = os.path.join(_DB_DIR, "archive")
+for _name in (
+    "SMTP_HOST", "SMTP_USER", "SMTP_PASS", "TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_FROM_PHONE",
+    "PAGE_CACHE_BACKEND", "LIVE_EVENTS_BACKEND", "PRESENCE_BACKEND", "QUERY_PROFILER",
+):
+    os.environ.pop(_name, None)
+
+from query_profiler import profile_queries  # noqa: E402
+
+STUDENTS = 30
+PARENT_CHILDREN = 3
+
+
+@pytest.fixture(scope="session")
+def portal():
+    import app as portal_module
+
+    with portal_module.app.app_context():
+        portal_module.ensure_db_initialized()
+        _seed_roster()
+    return portal_module
+
+
+@pytest.fixture(scope="session")
+def roster(portal):
+    return [f"T{i:05d}" for i in range(STUDENTS)]
+
+
+@pytest.fixture
+def app(portal):
+    return portal.app
+
+
+@pytest.fixture
+def session(app):
+    """The app's database session; whatever a test leaves uncommitted is rolled back."""
+    from models import db
+
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+
+
+@pytest.fixture
+def make_student(app):
+    """Commit a new student with a unique ID (prefixed with `prefix`) and return the ID."""
+    from models import Student, db
+
+    def make(prefix="S", name="Test Student"):
+        sid = f"{prefix}-{uuid.uuid4().hex[:12]}"
+        with app.app_context():
+            db.session.add(Student(student_id=sid, name=name, branch="CSE", year="2nd Year"))
+            db.session.commit()
+        return sid
+
+    return make
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def teacher_client(client):
+    with client.session_transaction() as sess:
+        sess["role"] = "teacher"
+        sess["teacher"] = "t_teacher"
+        sess["display_name"] = "Test Teacher"
+    return client
+
+
+@pytest.fixture
+def parent_client(client, roster):
+    with client.session_transaction() as sess:
+        sess["role"] = "parent"
+        sess["parent"] = "t_parent"
+        sess["display_name"] = "Test Parent"
+        sess["parent_students"] = roster[:PARENT_CHILDREN]
+    return client
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager asserting a block stays within a query count and repeat budget."""
+
+    @contextmanager
+    def budget(max_queries, max_repeats=None):
+        with profile_queries() as profile:
+            yield profile
+        problems = []
+        if profile.total_queries > max_queries:
+            problems.append(f"{profile.total_queries} queries > budget of {max_queries}")
+        if max_repeats is not None and profile.repeated(max_repeats + 1):
+            problems.append(f"a statement repeated more than {max_repeats} times")
+        if problems:
+            raise AssertionError("; ".join(problems) + "\n" + profile.report(repeat_threshold=(max_repeats or 0) + 1))
+
+    return budget
+
+
+def _seed_roster():
+    """Students with contacts, a parent of the first few, five days of marks (half the class absent today)."""
+    import attendance_stats
+    from models import Attendance, Student, User, db
+
+    if db.session.get(Student, "T00000") is not None:
+        return
+    today = datetime.date.today()
+    student_ids = [f"T{i:05d}" for i in range(STUDENTS)]
+    for i, sid in enumerate(student_ids):
+        db.session.add(
+            Student(
+                student_id=sid,
+                name=f"Test Student {i}",
+                branch="CSE",
+                year="2nd Year",
+                email=f"{sid.lower()}@example.edu",
+                parent_phone=f"+1555000{i:04d}",
+            )
+        )
+    db.session.add(User(username="t_teacher", role="teacher", password="teach", name="Test Teacher"))
+    for sid in student_ids[:PARENT_CHILDREN]:
+        db.session.add(
+            User(username="t_parent", role="parent", password="parent", name="Test Parent", linked_student_id=sid)
+        )
+    db.session.flush()
+
+    for days_ago in range(5):
+        date_text = (today - datetime.timedelta(days=days_ago)).strftime("%Y-%m-%d")
+        for sid in student_ids[::2] if days_ago == 0 else student_ids:
+            db.session.add(Attendance(student_id=sid, date=date_text, time="09:00:00"))
+    db.session.flush()
+    attendance_stats.rebuild(db.session)
+    db.session.commit()
+
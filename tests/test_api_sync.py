@@ -0,0 +1,77 @@
+"""Delta sync API: cursors, paging and the 304 path."""
+
+import pytest
+
+from models import Announcement, Attendance, db
+
+SYNC_URL = "/api/v1/sync"
+
+
+@pytest.fixture
+def student(app, make_student):
+    sid = make_student("A", "Api Student")
+    with app.app_context():
+        db.session.add_all(Attendance(student_id=sid, date=f"2026-03-0{day}", time="09:00:00") for day in range(1, 6))
+        db.session.commit()
+    return sid
+
+
+@pytest.fixture
+def student_client(client, student):
+    with client.session_transaction() as sess:
+        sess["role"] = "student"
+        sess["student"] = student
+    return client
+
+
+def test_cursor_round_trip(portal):
+    assert portal._parse_sync_cursor(portal._format_sync_cursor((12, 0, 7))) == (12, 0, 7)
+    assert portal._parse_sync_cursor("") is None
+    assert portal._parse_sync_cursor("v1.-5.3.4") == (0, 3, 4)
+
+
+@pytest.mark.parametrize("since", ["garbage", "v2.1.2.3", "v1.1.2", "v1.a.b.c", "v1.1.2.3.4"])
+def test_malformed_cursor_is_rejected(student_client, since):
+    response = student_client.get(SYNC_URL, query_string={"since": since})
+    assert response.status_code == 400
+    assert response.get_json()["ok"] is False
+
+
+def test_requires_a_session(client):
+    assert client.get(SYNC_URL).status_code == 401
+
+
+def test_pages_through_every_mark(portal, student_client, monkeypatch):
+    monkeypatch.setattr(portal, "API_SYNC_PAGE_SIZE", 2)
+    first = student_client.get(SYNC_URL).get_json()
+    assert first["student"]["name"] == "Api Student"
+    assert first["more"] is True
+
+    dates, body, calls = [m["date"] for m in first["attendance"]], first, 1
+    while body["more"]:
+        body = student_client.get(SYNC_URL, query_string={"since": body["cursor"]}).get_json()
+        assert "student" not in body
+        dates += [m["date"] for m in body["attendance"]]
+        calls += 1
+        assert calls < 20
+    assert dates == [f"2026-03-0{day}" for day in range(1, 6)]
+
+
+def test_not_modified_until_another_worker_commits(app, student_client):
+    body = student_client.get(SYNC_URL).get_json()
+    while body["more"]:
+        body = student_client.get(SYNC_URL, query_string={"since": body["cursor"]}).get_json()
+    query = {"since": body["cursor"]}
+    etag = student_client.get(SYNC_URL, query_string=query).headers["ETag"]
+
+    response = student_client.get(SYNC_URL, query_string=query, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    # Written straight to the database, as another gunicorn worker would: nothing here is invalidated.
+    with app.app_context():
+        db.session.add(Announcement(title="Exam moved", description="Now on Friday.", date="2026-03-06"))
+        db.session.commit()
+    response = student_client.get(SYNC_URL, query_string=query, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [a["title"] for a in response.get_json()["announcements"]] == ["Exam moved"]
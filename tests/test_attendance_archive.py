@@ -0,0 +1,105 @@
+"""Archiving a closed academic year: file, delete and the read-side union must agree row for row."""
+
+import csv
+import datetime
+import io
+
+import pytest
+from sqlalchemy import insert
+
+import attendance_archive
+from models import Attendance, db
+
+# Academic year 2019-20 (July to June); far enough back that no other test writes into it.
+YEAR = 2019
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(attendance_archive, "ARCHIVE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def history(app, make_student):
+    """Weekday marks for two students across 2019-20, plus marks in 2020-21 that must stay live."""
+    sids = [make_student("R"), make_student("R")]
+    closed, kept = [], []
+    day = datetime.date(2019, 8, 1)
+    while day < datetime.date(2020, 9, 30):
+        if day.weekday() < 5:
+            for n, sid in enumerate(sids):
+                if (day.toordinal() + n) % 3:
+                    row = (day.isoformat(), f"09:{(day.day + n) % 60:02d}:00", sid)
+                    (closed if day < datetime.date(2020, 7, 1) else kept).append(row)
+        day += datetime.timedelta(days=1)
+    with app.app_context():
+        db.session.execute(insert(Attendance), [dict(zip(("date", "time", "student_id"), r)) for r in closed + kept])
+        db.session.commit()
+    yield sids, sorted(closed), sorted(kept)
+    with app.app_context():
+        db.session.query(Attendance).filter(Attendance.student_id.in_(sids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def _live(sids):
+    rows = db.session.query(Attendance.date, Attendance.time, Attendance.student_id)
+    return sorted(tuple(r) for r in rows.filter(Attendance.student_id.in_(sids)))
+
+
+def test_round_trip(app, archive_dir, history):
+    sids, closed, kept = history
+    with app.app_context():
+        summary = attendance_archive.archive_academic_year(db.session, YEAR)
+        assert summary["live_rows"] == summary["rows"] == len(closed)
+        assert _live(sids) == kept
+
+    assert attendance_archive.archived_count() == len(closed)
+    assert sorted(attendance_archive.iter_archived()) == closed
+    for sid in sids:
+        own = [row for row in closed if row[2] == sid]
+        assert attendance_archive.archived_count(sid) == len(own)
+        assert list(attendance_archive.iter_archived(student_id=sid)) == own
+    spring = [row for row in closed if "2020-03-01" <= row[0] <= "2020-03-31"]
+    assert list(attendance_archive.iter_archived(start="2020-03-01", end="2020-03-31")) == spring
+
+
+def test_export_still_includes_archived_rows(app, archive_dir, history, teacher_client):
+    sids, closed, kept = history
+    with app.app_context():
+        attendance_archive.archive_academic_year(db.session, YEAR)
+
+    response = teacher_client.get("/teacher/export", query_string={"format": "csv", "start": "2019-07-01"})
+    assert response.status_code == 200
+    exported = [
+        (row[0], row[1], row[2]) for row in csv.reader(io.StringIO(response.get_data(as_text=True))) if row[2] in sids
+    ]
+    assert exported == sorted(closed + kept, key=lambda row: (row[0], row[1]))
+
+
+def test_rerun_after_crash_between_publish_and_delete(app, archive_dir, history):
+    """The file was published but the delete never committed: the year is both archived and live."""
+    sids, closed, kept = history
+    with app.app_context():
+        attendance_archive.archive_academic_year(db.session, YEAR)
+        db.session.execute(insert(Attendance), [dict(zip(("date", "time", "student_id"), r)) for r in closed])
+        late = ("2020-06-30", "15:00:00", sids[0])  # a mark that only reached the database afterwards
+        db.session.add(Attendance(date=late[0], time=late[1], student_id=late[2]))
+        db.session.commit()
+
+        summary = attendance_archive.archive_academic_year(db.session, YEAR)
+        assert summary["rows"] == len(closed) + 1
+        assert _live(sids) == kept
+    assert sorted(attendance_archive.iter_archived()) == sorted(closed + [late])
+    assert attendance_archive.archived_count() == len(closed) + 1
+
+
+def test_failed_commit_keeps_rows_live_and_file_unchanged(app, archive_dir, history, monkeypatch):
+    sids, closed, kept = history
+    with app.app_context():
+        with monkeypatch.context() as patch:
+            patch.setattr(db.session, "commit", lambda: (_ for _ in ()).throw(RuntimeError("commit failed")))
+            with pytest.raises(RuntimeError):
+                attendance_archive.archive_academic_year(db.session, YEAR)
+        assert _live(sids) == sorted(closed + kept)
+    assert list(archive_dir.iterdir()) == []
@@ -0,0 +1,124 @@
+"""Incremental attendance counters must always equal a recount from history."""
+
+import datetime
+import uuid
+
+import pytest
+
+import attendance_stats
+from models import Attendance, Student, StudentAttendanceStats
+
+# A Monday, so the streaks below cross a weekend on purpose.
+MONDAY = datetime.date(2026, 3, 2)
+
+
+def _day(offset):
+    return (MONDAY + datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+@pytest.fixture
+def student(session):
+    sid = f"S-{uuid.uuid4().hex[:12]}"
+    session.add(Student(student_id=sid, name="Stats Student", branch="CSE", year="2nd Year"))
+    session.flush()
+    return sid
+
+
+def _mark(session, sid, date, time_text="09:00:00"):
+    mark = {"student_id": sid, "date": date, "time": time_text}
+    session.add(Attendance(**mark))
+    session.flush()
+    attendance_stats.record_marks(session, [mark])
+    session.flush()
+
+
+def _counters(session, sid):
+    row = session.get(StudentAttendanceStats, sid)
+    session.refresh(row)
+    return {column: getattr(row, column) for column in attendance_stats._COUNTERS}
+
+
+def _recount(session, sid):
+    attendance_stats.rebuild(session, [sid])
+    session.expire_all()
+    return _counters(session, sid)
+
+
+@pytest.fixture
+def no_rebuild(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("rebuild() was called")
+
+    monkeypatch.setattr(attendance_stats, "rebuild", fail)
+
+
+def test_first_mark_creates_the_row_without_rebuild(session, student, no_rebuild):
+    _mark(session, student, _day(0))
+    assert _counters(session, student) == {
+        "total_marks": 1,
+        "month_key": _day(0)[:7],
+        "month_marks": 1,
+        "last_date": _day(0),
+        "last_time": "09:00:00",
+        "streak": 1,
+    }
+
+
+def test_incremental_marks_match_a_recount(session, student):
+    # Mon-Fri, then the next Monday: the weekend does not break the streak.
+    for offset in (0, 1, 2, 3, 4, 7):
+        _mark(session, student, _day(offset))
+    incremental = _counters(session, student)
+    assert incremental["streak"] == 6
+    assert incremental["total_marks"] == 6
+    assert _recount(session, student) == incremental
+
+
+def test_out_of_order_mark_rebuilds_only_that_student(session, student, monkeypatch):
+    _mark(session, student, _day(0))
+    _mark(session, student, _day(2))
+    rebuilt = []
+    original = attendance_stats.rebuild
+    monkeypatch.setattr(attendance_stats, "rebuild", lambda s, ids=None: rebuilt.append(set(ids)) or original(s, ids))
+
+    _mark(session, student, _day(1))  # a late offline sync for Tuesday
+    assert rebuilt == [{student}]
+    counters = _counters(session, student)
+    assert counters["total_marks"] == 3
+    assert counters["streak"] == 3
+    assert counters["last_date"] == _day(2)
+
+
+def test_racing_first_mark_falls_back_to_rebuild(session, student, monkeypatch):
+    """Another transaction commits this student's first mark after we checked for history."""
+    original = attendance_stats._without_history
+
+    def concurrent_first_mark(s, student_ids, by_student):
+        first = original(s, student_ids, by_student)
+        s.add(Attendance(student_id=student, date=_day(0), time="08:00:00"))
+        s.add(StudentAttendanceStats(**attendance_stats._new_stats(student, _day(0), "08:00:00")))
+        s.flush()
+        return first
+
+    monkeypatch.setattr(attendance_stats, "_without_history", concurrent_first_mark)
+    _mark(session, student, _day(1))
+    counters = _counters(session, student)
+    assert counters["total_marks"] == 2
+    assert counters["streak"] == 2
+    assert counters["last_date"] == _day(1)
+
+
+def test_dashboard_view_matches_a_full_recount(session, student):
+    for offset in (0, 1, 7, 8, 9, 28):
+        _mark(session, student, _day(offset))
+    today = _day(29)
+    view = attendance_stats.dashboard_view(session.get(StudentAttendanceStats, student), today)
+
+    dates = [row.date for row in session.query(Attendance.date).filter_by(student_id=student)]
+    assert view["total"] == len(dates)
+    assert view["this_month"] == sum(1 for d in dates if d[:7] == today[:7])
+    assert view["latest_mark"] == (max(dates), "09:00:00")
+    assert view["present_today"] is False
+    assert view["streak"] == 1
+    _recount(session, student)
+    assert attendance_stats.dashboard_view(session.get(StudentAttendanceStats, student), today) == view
@@ -0,0 +1,142 @@
+"""Content-addressed uploads and blob GC: nothing referenced or recent may be lost."""
+
+import datetime
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+import storage
+from models import Resource, db
+
+OLD = time.time() - 2 * 3600
+
+
+@pytest.fixture
+def blob_dirs(portal, tmp_path, monkeypatch):
+    monkeypatch.setattr(portal, "UPLOADS_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(portal, "NOTES_DIR", str(tmp_path / "notes"))
+    monkeypatch.setattr(portal, "queue_resource_indexing", lambda resource_id: None)
+    return tmp_path
+
+
+def _upload(client, name, body):
+    response = client.post(
+        "/teacher/upload-notes",
+        data={"subject": "Physics", "topic": "Optics", "file": (io.BytesIO(body), name)},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 302
+    with client.application.app_context():
+        return db.session.query(Resource.id, Resource.storage_path).order_by(Resource.id.desc()).first()
+
+
+def _blobs(root):
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, files in os.walk(root) for f in files)
+
+
+def test_same_name_different_bytes_both_survive(blob_dirs, teacher_client):
+    first = _upload(teacher_client, "unit1.pdf", b"%PDF-1.4 first version")
+    second = _upload(teacher_client, "unit1.pdf", b"%PDF-1.4 second version")
+    assert first.storage_path != second.storage_path
+    assert teacher_client.get(f"/resource/{first.id}").data == b"%PDF-1.4 first version"
+    assert teacher_client.get(f"/resource/{second.id}").data == b"%PDF-1.4 second version"
+
+
+def test_identical_bytes_reuse_the_blob(blob_dirs, teacher_client):
+    first = _upload(teacher_client, "week1.pdf", b"%PDF-1.4 same bytes")
+    before = _blobs(blob_dirs / "notes")
+    second = _upload(teacher_client, "week1-copy.pdf", b"%PDF-1.4 same bytes")
+    assert second.storage_path == first.storage_path
+    assert _blobs(blob_dirs / "notes") == before
+    assert not [name for name in os.listdir(blob_dirs / "notes") if name.startswith(".upload-")]
+
+
+def _local_blob(root, body, mtime):
+    sha256 = hashlib.sha256(body).hexdigest()
+    path = os.path.join(root, storage.blob_relpath(sha256))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+    os.utime(path, (mtime, mtime))
+    return sha256, path
+
+
+def test_gc_keeps_referenced_and_recent_blobs(app, portal, blob_dirs):
+    notes = str(blob_dirs / "notes")
+    referenced, referenced_path = _local_blob(notes, b"referenced", OLD)
+    _, orphan_path = _local_blob(notes, b"orphan", OLD)
+    _, recent_path = _local_blob(notes, b"uploaded a moment ago", time.time())
+    with app.app_context():
+        db.session.add(Resource(kind="notes", file_name="r.pdf", storage_path="x", content_hash=referenced))
+        db.session.commit()
+
+        assert portal.gc_unreferenced_blobs(dry_run=True) == [orphan_path]
+        assert os.path.exists(orphan_path)
+        assert portal.gc_unreferenced_blobs() == [orphan_path]
+    assert not os.path.exists(orphan_path)
+    assert os.path.exists(referenced_path) and os.path.exists(recent_path)
+
+
+class _StubBucket:
+    """Answers the Supabase Storage list/delete calls from an in-memory folder tree."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.list_calls = []
+        self.deleted = []
+
+    def post(self, url, json=None, **kwargs):
+        self.list_calls.append((json["prefix"], json["offset"], json["limit"]))
+        items = self.tree.get(json["prefix"], [])
+        return _Response(items[json["offset"]: json["offset"] + json["limit"]])
+
+    def delete(self, url, json=None, **kwargs):
+        self.deleted.extend(json["prefixes"])
+        return _Response(None)
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        pass
+
+
+def _iso(epoch):
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    import requests
+
+    files = [{"name": f"h{i:02d}", "id": i, "updated_at": _iso(OLD if i % 2 else time.time())} for i in range(7)]
+    files.append({"name": "undated", "id": 99})
+    stub = _StubBucket({"notes/blobs": [{"name": "ab", "id": None}], "notes/blobs/ab": files})
+    monkeypatch.setattr(storage, "LIST_PAGE_SIZE", 3)
+    monkeypatch.setattr(storage, "supabase_config", lambda: ("https://bucket.test", "key", "files"))
+    monkeypatch.setattr(requests, "post", stub.post)
+    monkeypatch.setattr(requests, "delete", stub.delete)
+    return stub
+
+
+def test_bucket_listing_follows_pages_and_folders(bucket):
+    objects = storage.list_bucket_objects(storage.supabase_config(), "notes/blobs")
+    assert [path for path, _ in objects] == [f"notes/blobs/ab/h{i:02d}" for i in range(7)] + ["notes/blobs/ab/undated"]
+    assert objects[-1][1] is None
+    assert [offset for prefix, offset, _ in bucket.list_calls if prefix == "notes/blobs/ab"] == [0, 3, 6]
+
+
+def test_bucket_gc_keeps_referenced_recent_and_undated(app, portal, blob_dirs, bucket):
+    with app.app_context():
+        db.session.add(Resource(kind="notes", file_name="h.pdf", storage_path="notes/blobs/ab/h03", content_hash="h03"))
+        db.session.commit()
+        removed = portal.gc_unreferenced_blobs()
+    assert removed == bucket.deleted == ["notes/blobs/ab/h01", "notes/blobs/ab/h05"]
@@ -0,0 +1,67 @@
+"""camera_ingest counters add up exactly across reader and recognition threads."""
+
+import queue
+import threading
+
+import pytest
+
+camera_ingest = pytest.importorskip("camera_ingest")
+
+WORKERS = 8
+FRAMES = 4000
+
+
+class _FakeRecognizer:
+    def __init__(self, model_path, detector_name=None):
+        pass
+
+    def __call__(self, frame):
+        return [(f"S{frame % 50}", 40.0), (f"S{(frame + 1) % 50}", 45.0)]
+
+
+class _Sender:
+    def __init__(self):
+        self.marks = []
+        self.lock = threading.Lock()
+
+    def submit(self, student_id, captured_at, kiosk_id):
+        with self.lock:
+            self.marks.append(student_id)
+
+
+def test_stats_add_is_exact_under_contention():
+    stats = camera_ingest.IngestStats()
+
+    def hammer():
+        for _ in range(20000):
+            stats.add(sampled=1, faces=2)
+
+    threads = [threading.Thread(target=hammer) for _ in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats.snapshot() == {"sampled": WORKERS * 20000, "dropped": 0, "faces": WORKERS * 40000, "marks": 0}
+
+
+def test_recognition_workers_report_every_face_and_mark(monkeypatch):
+    monkeypatch.setattr(camera_ingest, "Recognizer", _FakeRecognizer)
+    stats = camera_ingest.IngestStats()
+    frames = queue.Queue()
+    sender = _Sender()
+    mark_filter = camera_ingest.MarkFilter(min_hits=1, hit_window=10.0)
+    for i in range(FRAMES):
+        frames.put(("room101", i, 1_700_000_000.0))
+    for _ in range(WORKERS):
+        frames.put(None)
+
+    args = ("face_model.xml", None, frames, mark_filter, sender, stats)
+    workers = [threading.Thread(target=camera_ingest.recognize_frames, args=args) for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    counts = stats.snapshot()
+    assert counts["faces"] == 2 * FRAMES
+    assert counts["marks"] == len(sender.marks) == 50
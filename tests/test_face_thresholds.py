@@ -0,0 +1,48 @@
+"""Section shard runs must use the calibrated thresholds, not the default distance."""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+if not hasattr(cv2, "face"):
+    pytest.skip("OpenCV contrib face module is not installed", allow_module_level=True)
+
+import camera_ingest  # noqa: E402
+import face  # noqa: E402
+import face_dataset  # noqa: E402
+
+
+@pytest.fixture
+def trained(tmp_path):
+    """A college-wide model with calibrated thresholds and one section shard."""
+    rng = np.random.default_rng(7)
+    faces = [rng.integers(0, 255, (64, 64), dtype=np.uint8) for _ in range(4)]
+    labels = np.array([1, 1, 2, 2], dtype=np.int32)
+    model_path = str(tmp_path / "face_model.xml")
+    shard_path = face_dataset.shard_model_path(model_path, "cse-2nd-year")
+    (tmp_path / face_dataset.SHARDS_DIR).mkdir()
+    for path in (model_path, shard_path):
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.train(faces, labels)
+        recognizer.save(path)
+    face_dataset.save_thresholds(model_path, {"1": 52.5, "2": 81.0}, {"holdout": 4, "genuine_rate": 1.0})
+    return model_path, shard_path
+
+
+def test_shard_resolves_to_the_calibrated_file(trained):
+    model_path, shard_path = trained
+    assert face_dataset.thresholds_path(shard_path) == face_dataset.thresholds_path(model_path)
+    assert face.load_thresholds(shard_path) == {"1": 52.5, "2": 81.0}
+
+
+def test_section_ingest_uses_calibrated_thresholds(trained, monkeypatch):
+    _, shard_path = trained
+    seen = {}
+
+    def fake_recognize(frame, recognizer, detector, thresholds=None):
+        seen["thresholds"] = thresholds
+        return []
+
+    monkeypatch.setattr(face, "recognize_faces", fake_recognize)
+    camera_ingest.Recognizer(shard_path, "haar")(np.zeros((120, 160, 3), dtype=np.uint8))
+    assert seen["thresholds"] == {"1": 52.5, "2": 81.0}
@@ -0,0 +1,27 @@
+"""Web worker cold start: `import app` stays within budget and loads no heavy module eagerly."""
+
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECK_SCRIPT = os.path.join(REPO_ROOT, "tools", "check_import_time.py")
+
+
+def test_import_time_budget():
+    proc = subprocess.run([sys.executable, CHECK_SCRIPT], cwd=REPO_ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+
+
+def test_no_heavy_module_in_sys_modules(tmp_path):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "tools"))
+    try:
+        from check_import_time import LAZY_MODULES
+    finally:
+        sys.path.pop(0)
+    code = f"import json, sys, app; print(json.dumps([m for m in {list(LAZY_MODULES)!r} if m in sys.modules]))"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'boot.db'}")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,105 @@
+"""The kiosk/camera sync endpoint: idempotent batches, validation and ingest-token auth."""
+
+import datetime
+import time
+
+import pytest
+
+import notifications
+from models import Attendance
+
+TOKEN = "test-ingest-token"
+SYNC_URL = "/teacher/attendance/sync"
+
+
+@pytest.fixture
+def ingest_client(portal, client, monkeypatch):
+    monkeypatch.setattr(portal, "ATTENDANCE_INGEST_TOKEN", TOKEN)
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {TOKEN}"
+    return client
+
+
+@pytest.fixture
+def notified(portal, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        portal, "send_attendance_notifications", lambda sid, status, *args, **kwargs: calls.append((sid, kwargs))
+    )
+    return calls
+
+
+@pytest.fixture
+def student(make_student):
+    return make_student("K", "Sync Student")
+
+
+def _event(sid, minutes_ago=0, event_id="e1"):
+    return {"event_id": event_id, "student_id": sid, "captured_at": int((time.time() - minutes_ago * 60) * 1000)}
+
+
+def _rows(app, sid):
+    with app.app_context():
+        return Attendance.query.filter_by(student_id=sid).count()
+
+
+def test_replayed_batch_is_reported_as_duplicate(app, ingest_client, student, notified):
+    batch = {"events": [_event(student, event_id="a"), _event(student, minutes_ago=1, event_id="b")]}
+    first = ingest_client.post(SYNC_URL, json=batch).get_json()
+    assert (first["marked"], first["duplicate"]) == (1, 1)
+
+    replay = ingest_client.post(SYNC_URL, json=batch).get_json()
+    assert [r["status"] for r in replay["results"]] == ["duplicate", "duplicate"]
+    assert replay["marked"] == 0
+    assert _rows(app, student) == 1
+    assert len(notified) == 1
+
+
+def test_unknown_student(ingest_client, notified):
+    body = ingest_client.post(SYNC_URL, json={"events": [_event("NO-SUCH-STUDENT")]}).get_json()
+    assert body["results"][0]["status"] == "unknown_student"
+    assert not notified
+
+
+@pytest.mark.parametrize("minutes_ago", [8 * 24 * 60, -60], ids=["too-old", "future"])
+def test_capture_time_out_of_range(app, ingest_client, student, minutes_ago):
+    body = ingest_client.post(SYNC_URL, json={"events": [_event(student, minutes_ago=minutes_ago)]}).get_json()
+    assert body["results"][0]["status"] == "invalid"
+    assert _rows(app, student) == 0
+
+
+def test_oversized_batch(portal, ingest_client, student):
+    events = [_event(student, event_id=str(i)) for i in range(portal.OFFLINE_SYNC_MAX_EVENTS + 1)]
+    assert ingest_client.post(SYNC_URL, json={"events": events}).status_code == 413
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong-token", TOKEN], ids=["missing", "bad", "no-bearer"])
+def test_token_required(app, portal, client, student, monkeypatch, authorization):
+    monkeypatch.setattr(portal, "ATTENDANCE_INGEST_TOKEN", TOKEN)
+    headers = {"Authorization": authorization} if authorization else {}
+    response = client.post(SYNC_URL, json={"events": [_event(student)]}, headers=headers)
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/login")
+    assert _rows(app, student) == 0
+
+
+def test_backdated_marks_are_notified_as_late_sync(portal, ingest_client, student, notified):
+    late = portal.OFFLINE_SYNC_LATE_NOTICE_MINUTES + 5
+    ingest_client.post(SYNC_URL, json={"events": [_event(student, minutes_ago=late)]})
+    assert notified[0][1]["synced_at"] is not None
+
+
+def test_live_marks_are_notified_as_present(ingest_client, student, notified):
+    ingest_client.post(SYNC_URL, json={"events": [_event(student)]})
+    assert notified[0][1]["synced_at"] is None
+
+
+def test_late_sync_wording(app, portal, student, monkeypatch):
+    sent = []
+    monkeypatch.setattr(notifications, "deliver", lambda emails, phones, subject, body: sent.append((subject, body)))
+    with app.app_context():
+        portal.send_attendance_notifications(
+            student, "present", "2026-03-02", "08:10:00", synced_at=datetime.datetime(2026, 3, 2, 14, 30)
+        )
+    subject, message = sent[0]
+    assert "(late sync)" in subject
+    assert "received 2026-03-02 14:30" in message
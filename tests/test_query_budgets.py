@@ -0,0 +1,27 @@
+"""
+Query budgets for the routes that used to issue one query per row.
+
+Budgets are the measured counts on the seeded roster (tests/conftest.py). A
+route that loops over students must not cost more with more students, so
+max_repeats stays small while the roster has dozens of rows.
+"""
+
+
+def test_parent_dashboard_budget(parent_client, query_budget):
+    with query_budget(max_queries=1, max_repeats=1):
+        response = parent_client.get("/parent/dashboard")
+    assert response.status_code == 200
+    assert b"Test Student 0" in response.data
+
+
+def test_send_absent_alerts_budget(teacher_client, query_budget):
+    with query_budget(max_queries=2, max_repeats=1):
+        response = teacher_client.post("/teacher/send-absent-alerts")
+    assert response.status_code == 302
+    assert "Absent%20alerts%20sent" in response.headers["Location"]
+
+
+def test_teacher_dashboard_budget(teacher_client, query_budget):
+    with query_budget(max_queries=4, max_repeats=1):
+        response = teacher_client.get("/teacher/dashboard")
+    assert response.status_code == 200
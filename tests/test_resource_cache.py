@@ -0,0 +1,58 @@
+"""Stored PDF caching: immutable only for the exact ?v= prefix, no full-file reads for unhashed files."""
+
+import hashlib
+
+import pytest
+
+IMMUTABLE = "private, max-age=31536000, immutable"
+BODY = b"%PDF-1.4 test body"
+
+
+@pytest.fixture
+def stored_pdf(tmp_path):
+    (tmp_path / "notes.pdf").write_bytes(BODY)
+    return tmp_path, "notes.pdf", hashlib.sha256(BODY).hexdigest()
+
+
+def _send(portal, stored_pdf, query="", content_hash=None, headers=None):
+    folder, name, _ = stored_pdf
+    with portal.app.test_request_context(f"/resource/1{query}", headers=headers or {}):
+        return portal._send_stored_file(str(folder), name, name, content_hash)
+
+
+def test_versioned_link_is_immutable(portal, stored_pdf):
+    content_hash = stored_pdf[2]
+    link = portal.resource_url(1, content_hash)
+    response = _send(portal, stored_pdf, link[len("/resource/1"):], content_hash)
+    assert response.headers["Cache-Control"] == IMMUTABLE
+    assert response.get_etag() == (content_hash, False)
+
+
+@pytest.mark.parametrize("version", ["", "0", "short", "full"])
+def test_other_versions_revalidate(portal, stored_pdf, version):
+    content_hash = stored_pdf[2]
+    value = {"short": content_hash[:4], "full": content_hash}.get(version, version)
+    query = f"?v={value}" if value else ""
+    assert _send(portal, stored_pdf, query, content_hash).headers["Cache-Control"] == "private, no-cache"
+
+
+def test_unhashed_file_gets_a_weak_etag_without_reading_it(portal, stored_pdf, monkeypatch):
+    def no_reads(*args, **kwargs):
+        raise AssertionError("the file was read to build its ETag")
+
+    monkeypatch.setattr(hashlib, "sha256", no_reads)
+    content_hash = stored_pdf[2]
+    response = _send(portal, stored_pdf, f"?v={content_hash[:16]}")
+    etag, weak = response.get_etag()
+    assert weak
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    revalidated = _send(portal, stored_pdf, headers={"If-None-Match": f'W/"{etag}"'})
+    assert revalidated.status_code == 304
+
+
+def test_range_requests_still_work(portal, stored_pdf):
+    response = _send(portal, stored_pdf, content_hash=stored_pdf[2], headers={"Range": "bytes=0-3"})
+    assert response.status_code == 206
+    response.direct_passthrough = False
+    assert response.get_data() == BODY[:4]
@@ -0,0 +1,49 @@
+"""Roster import: a dry run reports exactly what the real import then does, and writes nothing."""
+
+import io
+import uuid
+
+import pytest
+
+import roster_import
+from models import Student, User
+
+
+@pytest.fixture
+def roster_csv(make_student):
+    existing = make_student("RI", "Old Name")
+    new_ids = [f"RI-{uuid.uuid4().hex[:12]}" for _ in range(5)]
+    parent = f"p-{uuid.uuid4().hex[:8]}"
+    lines = ["student_id,name,branch,year,parent_username,parent_password", f"{existing},Renamed,CSE,3rd Year,,"]
+    for i, sid in enumerate(new_ids):
+        lines.append(f"{sid},New {i},ECE,1st Year,{parent if i < 2 else ''},{'pw' if i < 2 else ''}")
+    lines.append(",missing id,,,,")
+    return "\n".join(lines) + "\n", [existing] + new_ids
+
+
+COUNTS = ("valid_rows", "error_count", "students_inserted", "students_updated", "accounts_created", "accounts_updated")
+
+
+def _counts(report):
+    return {key: report[key] for key in COUNTS}
+
+
+def test_dry_run_reports_the_import_counts(session, roster_csv):
+    text, ids = roster_csv
+    dry = roster_import.import_roster(session, io.StringIO(text), dry_run=True, batch_rows=2)
+    assert session.query(Student).filter(Student.student_id.in_(ids[1:])).count() == 0
+    assert session.query(User).filter(User.username.in_(ids[1:])).count() == 0
+    assert session.get(Student, ids[0]).name == "Old Name"
+
+    real = roster_import.import_roster(session, io.StringIO(text), batch_rows=2)
+    assert _counts(dry) == _counts(real)
+    assert _counts(real) == {
+        "valid_rows": 6,
+        "error_count": 1,
+        "students_inserted": 5,
+        "students_updated": 1,
+        # Six student logins (the existing student had none) and two parent links; the second
+        # batch refreshes the password of the parent link the first batch created.
+        "accounts_created": 8,
+        "accounts_updated": 1,
+    }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Compare face detector backends (FACE_DETECTOR) on a labeled frame set.
+
+The frame set is a directory of images plus labels.json, mapping each image
+to the faces a person marked in it, as [x, y, w, h] boxes in image pixels:
+
+  {"room101_0800.jpg": [[412, 120, 96, 96], [130, 140, 88, 88]], "empty_hall.jpg": []}
+
+Use frames from the real cameras and kiosks (turned heads, backlight, students
+at the back of the room), since that is where the backends differ. Images with
+an empty list count toward false positives only.
+
+Each backend runs single-threaded by default (--threads), so latency is the
+CPU cost per frame a kiosk or ingest worker pays. Output per backend: p50/p95/
+mean latency in ms, recall (labeled faces found with IoU >= --iou) and false
+positives. Backends whose model file is missing are listed as unavailable.
+
+Usage:
+  python tools/bench_face_detectors.py --frames datasets/detector_bench
+  python tools/bench_face_detectors.py --frames datasets/detector_bench --backends haar,yunet --min-recall 0.9 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--frames", required=True, help="directory with the images and labels.json")
+    parser.add_argument("--labels", help="labels file (default: <frames>/labels.json)")
+    parser.add_argument("--backends", help="comma-separated backends (default: all)")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads per detector call (0 = OpenCV default)")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per frame (more stable latency)")
+    parser.add_argument("--iou", type=float, default=0.3, help="overlap needed for a detection to count as a face")
+    parser.add_argument("--min-recall", type=float, default=0.0, help="recommend the fastest backend at this recall")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    return parser.parse_args(argv)
+
+
+def load_frames(frames_dir: str, labels_path: str) -> List[tuple]:
+    import cv2
+
+    with open(labels_path, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    samples = []
+    for name, boxes in sorted(labels.items()):
+        frame = cv2.imread(os.path.join(frames_dir, name), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise SystemExit(f"cannot read {name} listed in {labels_path}")
+        samples.append((frame, [tuple(int(v) for v in box) for box in boxes]))
+    if not samples:
+        raise SystemExit(f"{labels_path} lists no images")
+    return samples
+
+
+def run(args: argparse.Namespace) -> Dict[str, dict]:
+    sys.path.insert(0, REPO_ROOT)
+    import cv2
+
+    import face_detectors
+
+    if args.threads > 0:
+        cv2.setNumThreads(args.threads)
+    names = [n.strip() for n in args.backends.split(",")] if args.backends else list(face_detectors.BACKENDS)
+    samples = load_frames(args.frames, args.labels or os.path.join(args.frames, "labels.json"))
+
+    results = {}
+    for name in names:
+        try:
+            detector = face_detectors.create_detector(name)
+        except (OSError, ValueError, cv2.error) as exc:
+            results[name] = {"available": False, "reason": str(exc)}
+            continue
+        result = face_detectors.benchmark(detector, samples, iou_threshold=args.iou, repeat=args.repeat)
+        results[name] = {"available": True, **result}
+    return results
+
+
+def recommend(results: Dict[str, dict], min_recall: float) -> Optional[str]:
+    eligible = [
+        (r["p95_ms"], name)
+        for name, r in results.items()
+        if r["available"] and (r["recall"] is None or r["recall"] >= min_recall)
+    ]
+    return min(eligible)[1] if eligible else None
+
+
+def print_report(results: Dict[str, dict], min_recall: float) -> None:
+    print(f"{'backend':<11} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'recall':>7} {'false +':>8}")
+    for name, r in results.items():
+        if not r["available"]:
+            print(f"{name:<11} unavailable: {r['reason']}")
+            continue
+        recall = "n/a" if r["recall"] is None else f"{r['recall']:.3f}"
+        print(
+            f"{name:<11} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['mean_ms']:>8.1f} "
+            f"{recall:>7} {r['false_positives']:>8}"
+        )
+    first = next((r for r in results.values() if r["available"]), None)
+    if first:
+        print(f"\n{first['frames']} frames, {first['faces']} labeled faces")
+    best = recommend(results, min_recall)
+    if best:
+        print(f"Fastest backend with recall >= {min_recall:.2f}: {best} (FACE_DETECTOR={best})")
+    else:
+        print(f"No backend reached recall {min_recall:.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = run(args)
+    if args.json:
+        print(json.dumps({"backends": results, "recommended": recommend(results, args.min_recall)}, indent=2))
+    else:
+        print_report(results, args.min_recall)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Benchmark attendance notification throughput against local provider stand-ins.
+
+Two stand-ins are started on 127.0.0.1 before the app is imported:
+- an SMTP sink (EHLO/AUTH PLAIN/MAIL/RCPT/DATA/QUIT, no TLS)
+- a fake Twilio Messages endpoint (POST .../Messages.json)
+
+Both accept a latency and an error rate so we can see how provider-side
+slowness and failures change delivery rate. A synthetic roster is written to a
+temp student_data.json and pushed through:
+- attendance: send_attendance_notifications(sid, "present", ...) per student
+- absent:     POST /teacher/send-absent-alerts with nobody marked present
+
+Output: messages/sec, messages/min, p50/p95/max latency per channel and the
+failure reasons as the app reported them.
+
+Usage:
+  python tools/bench_notifications.py --students 100 --smtp-latency-ms 30 --sms-error-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------------------------------------------------------------------------
+# Provider stand-ins
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class FaultProfile:
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 7
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+
+    def apply(self) -> bool:
+        """Sleep for the configured latency and return True if this call should fail."""
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        server: "SMTPSink" = self.server  # type: ignore[assignment]
+        self._reply("220 bench-smtp ready")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            verb = raw.decode("utf-8", "replace").strip().split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.wfile.write(b"250-bench-smtp\r\n250 AUTH PLAIN\r\n")
+                self.wfile.flush()
+            elif verb == "AUTH":
+                self._reply("235 2.7.0 Authentication successful")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "STARTTLS":
+                self._reply("454 TLS not available")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                if server.faults.apply():
+                    server.count("failed")
+                    self._reply("451 4.3.0 Injected failure")
+                else:
+                    server.count("accepted")
+                    self._reply("250 2.0.0 Queued")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, faults: FaultProfile):
+        super().__init__(("127.0.0.1", 0), _SMTPSinkHandler)
+        self.faults = faults
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+
+class _FakeTwilioHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        server: "FakeTwilio" = self.server  # type: ignore[assignment]
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        if not self.path.endswith("/Messages.json"):
+            self._send_json(404, {"message": "not found"})
+            return
+
+        if server.faults.apply():
+            server.count("failed")
+            self._send_json(500, {"message": "Injected failure"})
+            return
+
+        server.count("accepted")
+        self._send_json(201, {"sid": f"SM{random.getrandbits(64):016x}", "status": "queued"})
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+class FakeTwilio(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, faults: FaultProfile):
+        super().__init__(("127.0.0.1", 0), _FakeTwilioHandler)
+        self.faults = faults
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+
+def _serve_in_background(server) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, name=type(server).__name__, daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class SendRecord:
+    channel: str
+    ok: bool
+    reason: str
+    seconds: float
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    students: int
+    wall_seconds: float
+    records: List[SendRecord]
+
+    def summary(self) -> Dict[str, object]:
+        total = len(self.records)
+        delivered = sum(1 for r in self.records if r.ok)
+        rate = total / self.wall_seconds if self.wall_seconds > 0 else 0.0
+        channels = {}
+        for channel in ("email", "sms"):
+            rows = [r for r in self.records if r.channel == channel]
+            latencies = sorted(r.seconds * 1000.0 for r in rows)
+            channels[channel] = {
+                "attempted": len(rows),
+                "delivered": sum(1 for r in rows if r.ok),
+                "p50_ms": round(_percentile(latencies, 50), 2),
+                "p95_ms": round(_percentile(latencies, 95), 2),
+                "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            }
+        failures = Counter(r.reason for r in self.records if not r.ok)
+        return {
+            "scenario": self.name,
+            "students": self.students,
+            "messages": total,
+            "delivered": delivered,
+            "failed": total - delivered,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "messages_per_sec": round(rate, 2),
+            "messages_per_min": round(rate * 60.0, 1),
+            "channels": channels,
+            "failure_reasons": dict(failures.most_common(5)),
+        }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def _short_reason(reason: str) -> str:
+    # Provider errors embed the full server reply; keep the leading part for grouping.
+    return reason.split("\n", 1)[0][:80]
+
+
+class SendRecorder:
+    """Wraps the per-message send helpers in notifications.py to time each call."""
+
+    def __init__(self, notifications_module):
+        self.notifications = notifications_module
+        self.records: List[SendRecord] = []
+        self._lock = threading.Lock()
+        self._orig_email = notifications_module.send_email
+        self._orig_sms = notifications_module.send_sms
+
+    def _record(self, channel: str, fn, *args):
+        started = time.perf_counter()
+        ok, reason = fn(*args)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.records.append(SendRecord(channel, ok, _short_reason(reason), elapsed))
+        return ok, reason
+
+    def install(self) -> None:
+        self.notifications.send_email = lambda *a: self._record("email", self._orig_email, *a)
+        self.notifications.send_sms = lambda *a: self._record("sms", self._orig_sms, *a)
+
+    def take(self) -> List[SendRecord]:
+        with self._lock:
+            records, self.records = self.records, []
+        return records
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+
+def _synthetic_roster(count: int) -> Dict[str, dict]:
+    roster = {}
+    for i in range(count):
+        sid = str(90000000 + i)
+        roster[sid] = {
+            "name": f"Bench Student {i}",
+            "branch": "CSE",
+            "year": "3rd Year",
+            "email": f"student{i}@bench.local",
+            "parent_email": f"parent{i}@bench.local",
+            "phone": f"+1555{i:07d}",
+            "parent_phone": f"+1666{i:07d}",
+        }
+    return roster
+
+
+def run_attendance_scenario(app_module, recorder: SendRecorder, roster: Dict[str, dict]) -> ScenarioResult:
+    now = datetime.datetime.now()
+    date_text = now.strftime("%Y-%m-%d")
+    time_text = now.strftime("%H:%M:%S")
+    # Contacts live on the students table; the first init seeds them from the roster file.
+    with app_module.app.app_context():
+        app_module.ensure_db_initialized()
+        recorder.take()
+        started = time.perf_counter()
+        for sid in roster:
+            app_module.send_attendance_notifications(sid, "present", date_text, time_text)
+        wall = time.perf_counter() - started
+    return ScenarioResult("attendance", len(roster), wall, recorder.take())
+
+
+def run_absent_scenario(app_module, recorder: SendRecorder, roster: Dict[str, dict]) -> ScenarioResult:
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["role"] = "teacher"
+        sess["teacher"] = "bench"
+
+    # Warm lazy DB init (creates tables and seeds the roster) outside the timed window.
+    client.get("/healthz")
+    with app_module.app.app_context():
+        app_module.ensure_db_initialized()
+    recorder.take()
+
+    started = time.perf_counter()
+    resp = client.post("/teacher/send-absent-alerts")
+    wall = time.perf_counter() - started
+    if resp.status_code not in (200, 302):
+        raise SystemExit(f"send-absent-alerts returned HTTP {resp.status_code}")
+    return ScenarioResult("absent", len(roster), wall, recorder.take())
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _print_summary(summary: Dict[str, object]) -> None:
+    print(f"\n== {summary['scenario']} ({summary['students']} students) ==")
+    print(
+        f"messages: {summary['messages']}  delivered: {summary['delivered']}  failed: {summary['failed']}  "
+        f"wall: {summary['wall_seconds']}s"
+    )
+    print(f"throughput: {summary['messages_per_sec']} msg/s  ({summary['messages_per_min']} msg/min)")
+    for channel, stats in summary["channels"].items():  # type: ignore[union-attr]
+        print(
+            f"  {channel:5s} attempted={stats['attempted']} delivered={stats['delivered']} "
+            f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms max={stats['max_ms']}ms"
+        )
+    reasons = summary["failure_reasons"]
+    if reasons:
+        print("  failure reasons:")
+        for reason, count in reasons.items():  # type: ignore[union-attr]
+            print(f"    {count:5d}  {reason}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--students", type=int, default=50, help="synthetic roster size")
+    parser.add_argument(
+        "--scenario", choices=("attendance", "absent", "all"), default="all", help="notification path to drive"
+    )
+    parser.add_argument("--smtp-latency-ms", type=float, default=0.0)
+    parser.add_argument("--smtp-error-rate", type=float, default=0.0)
+    parser.add_argument("--sms-latency-ms", type=float, default=0.0)
+    parser.add_argument("--sms-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON instead of text")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    smtp = SMTPSink(FaultProfile(args.smtp_latency_ms, args.smtp_error_rate, args.seed))
+    twilio = FakeTwilio(FaultProfile(args.sms_latency_ms, args.sms_error_rate, args.seed + 1))
+    _serve_in_background(smtp)
+    _serve_in_background(twilio)
+
+    workdir = tempfile.mkdtemp(prefix="bench_notify_")
+    roster = _synthetic_roster(args.students)
+    roster_path = os.path.join(workdir, "student_data.json")
+    with open(roster_path, "w", encoding="utf-8") as f:
+        json.dump(roster, f)
+
+    os.environ.update(
+        {
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": str(smtp.server_address[1]),
+            "SMTP_USER": "bench",
+            "SMTP_PASS": "bench",
+            "SMTP_FROM": "bench@bench.local",
+            "SMTP_USE_TLS": "false",
+            "TWILIO_ACCOUNT_SID": "ACbench",
+            "TWILIO_AUTH_TOKEN": "bench",
+            "TWILIO_FROM_PHONE": "+15550000000",
+            "TWILIO_API_BASE": f"http://127.0.0.1:{twilio.server_address[1]}",
+        }
+    )
+    os.environ.pop("SUPABASE_URL", None)
+
+    sys.path.insert(0, REPO_ROOT)
+    import app as app_module  # noqa: E402 - env must be set first
+    import notifications  # noqa: E402
+
+    app_module.STUDENT_FILE = roster_path
+    recorder = SendRecorder(notifications)
+    recorder.install()
+
+    results = []
+    if args.scenario in ("attendance", "all"):
+        results.append(run_attendance_scenario(app_module, recorder, roster))
+    if args.scenario in ("absent", "all"):
+        results.append(run_absent_scenario(app_module, recorder, roster))
+
+    summaries = [r.summary() for r in results]
+    providers = {"smtp": dict(smtp.stats), "sms": dict(twilio.stats)}
+
+    if args.json:
+        print(json.dumps({"scenarios": summaries, "providers": providers}, indent=2))
+    else:
+        for summary in summaries:
+            _print_summary(summary)
+        print(f"\nprovider totals: {providers}")
+
+    smtp.shutdown()
+    twilio.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
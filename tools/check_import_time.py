@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for web worker boot.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter (temp SQLite
+DATABASE_URL, so no network) and fails when:
+- any heavy module that should only load on first use is imported at boot
+  (OpenCV, numpy, requests, smtplib, pypdf, redis, pytest), or
+- the cumulative import time of `app` exceeds the budget.
+
+Prints the slowest imports so a regression is easy to trace.
+
+Usage:
+  python tools/check_import_time.py --budget-ms 1500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ("cv2", "numpy", "requests", "smtplib", "pypdf", "redis", "pytest")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def run_importtime() -> List[Tuple[str, int, int, int]]:
+    """Return (module, self_us, cumulative_us, depth) for every import made by `import app`."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'importtime.db')}"
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app"],
+            cwd=REPO_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"`import app` failed with exit code {proc.returncode}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Max cumulative import time of `app`.")
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest imports to print.")
+    args = parser.parse_args()
+
+    rows = run_importtime()
+    app_rows = [row for row in rows if row[0] == "app"]
+    if not app_rows:
+        raise SystemExit("`import app` did not show up in -X importtime output")
+    total_ms = app_rows[-1][2] / 1000.0
+
+    imported = {row[0] for row in rows}
+    eager = [name for name in LAZY_MODULES if name in imported]
+
+    print(f"import app: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest imports (cumulative):")
+    for name, _self_us, cumulative_us, depth in sorted(rows, key=lambda row: -row[2])[: args.top]:
+        print(f"  {cumulative_us / 1000.0:8.1f} ms  {'  ' * depth}{name}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at boot but should be lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Fetch and verify the model files of the face detector backends.
+
+model/detectors/SHA256SUMS pins the SHA-256 of every detector model file
+(`<hex>  <file name>`). The LBP cascade is committed; the YuNet ONNX model is
+downloaded from the OpenCV model zoo:
+
+  python tools/fetch_face_detectors.py --verify            # check what is in model/detectors/
+  python tools/fetch_face_detectors.py yunet --sha256 <hex>
+
+Files live in FACE_DETECTOR_MODEL_DIR (default model/detectors/). A download
+is only kept when its hash matches the pinned one, and the file has to load in
+OpenCV. A model that is not pinned yet needs --sha256 (take it from the
+model's page in the zoo, not from the downloaded file); it is then added to
+SHA256SUMS, so the next fetch or --verify checks against it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import urllib.request
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import face_detectors  # noqa: E402 - needs the repo on sys.path
+
+SUMS_FILE = "SHA256SUMS"
+# backend: (file name, download URL, loader that raises if OpenCV cannot use the file)
+SOURCES = {
+    "yunet": (
+        face_detectors.YUNET_MODEL_FILE,
+        "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/"
+        + face_detectors.YUNET_MODEL_FILE,
+        face_detectors.YuNetDetector,
+    ),
+}
+
+
+def sha256_of(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_sums(model_dir: str) -> Dict[str, str]:
+    sums = {}
+    try:
+        with open(os.path.join(model_dir, SUMS_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip() and not line.startswith("#"):
+                    digest, name = line.split(None, 1)
+                    sums[name.strip()] = digest.lower()
+    except FileNotFoundError:
+        pass
+    return sums
+
+
+def pin(model_dir: str, name: str, digest: str) -> None:
+    with open(os.path.join(model_dir, SUMS_FILE), "a", encoding="utf-8") as f:
+        f.write(f"{digest}  {name}\n")
+
+
+def verify(model_dir: str) -> int:
+    sums = read_sums(model_dir)
+    failures = 0
+    for backend in face_detectors.BACKENDS:
+        try:
+            face_detectors.create_detector(backend)
+        except FileNotFoundError:
+            print(f"{backend:<10} not installed")
+            continue
+        except Exception as exc:
+            print(f"{backend:<10} not loadable: {exc}")
+            failures += 1
+            continue
+        print(f"{backend:<10} ok")
+    for name, expected in sorted(sums.items()):
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            print(f"{name}: missing")
+            continue
+        actual = sha256_of(path)
+        if actual != expected:
+            print(f"{name}: SHA-256 mismatch ({actual}, expected {expected})")
+            failures += 1
+        else:
+            print(f"{name}: SHA-256 ok")
+    return 1 if failures else 0
+
+
+def fetch(backend: str, model_dir: str, expected: Optional[str], url: Optional[str]) -> int:
+    name, default_url, loader = SOURCES[backend]
+    pinned = read_sums(model_dir).get(name)
+    if pinned and expected and pinned != expected.lower():
+        print(f"--sha256 does not match the hash pinned in {SUMS_FILE} for {name}")
+        return 1
+    expected = (pinned or expected or "").lower()
+    if not expected:
+        print(f"{name} is not pinned in {SUMS_FILE}; pass --sha256 with the published hash")
+        return 1
+
+    os.makedirs(model_dir, exist_ok=True)
+    # OpenCV picks the model format from the extension, so keep it on the temp file.
+    fd, tmp_path = tempfile.mkstemp(dir=model_dir, prefix=".part-", suffix="-" + name)
+    os.close(fd)
+    try:
+        print(f"downloading {url or default_url}")
+        try:
+            urllib.request.urlretrieve(url or default_url, tmp_path)
+        except OSError as exc:
+            print(f"download failed: {exc}")
+            return 1
+        actual = sha256_of(tmp_path)
+        if actual != expected:
+            print(f"SHA-256 mismatch for {name}: got {actual}, expected {expected}; nothing written")
+            return 1
+        try:
+            loader(tmp_path)
+        except Exception as exc:
+            print(f"OpenCV cannot load {name}: {exc}; nothing written")
+            return 1
+        os.replace(tmp_path, os.path.join(model_dir, name))
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    if not pinned:
+        pin(model_dir, name, expected)
+    print(f"{name}: ok ({expected})")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("backends", nargs="*", choices=sorted(SOURCES), help="models to download")
+    parser.add_argument("--verify", action="store_true", help="check the files already in the model directory")
+    parser.add_argument("--sha256", help="expected hash for a model that is not pinned yet")
+    parser.add_argument("--url", help="download from this mirror instead")
+    args = parser.parse_args(argv)
+
+    if args.verify or not args.backends:
+        return verify(face_detectors.MODEL_DIR)
+    if len(args.backends) > 1 and (args.sha256 or args.url):
+        parser.error("--sha256 and --url apply to a single model")
+    for backend in args.backends:
+        status = fetch(backend, face_detectors.MODEL_DIR, args.sha256, args.url)
+        if status:
+            return status
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
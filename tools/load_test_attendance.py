@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Morning-rush load test for the attendance flow.
+
+A synthetic roster (students, student/parent logins, teachers) is seeded into
+the target database, then concurrent workers run until --duration elapses:
+- kiosk:   teacher session posting frames to /teacher/face-attendance/verify
+- manual:  teacher session posting /mark-attendance-manual
+- student: student login, then /student/dashboard and /student/attendance
+- parent:  parent login, then /parent/dashboard
+
+Every worker logs in first; logins are reported as their own scenario.
+
+Two targets:
+- in-process (default): Flask test clients, one per worker thread, against a
+  temp SQLite file or --database-url (e.g. a local Postgres). The kiosk path
+  uses a stand-in recognizer (--recognize-ms of simulated work) so no trained
+  model is needed; decode, marking, the DB and notifications are real.
+- --base-url: plain HTTP against a running server (gunicorn), so worker count
+  and the DB pool are exercised as deployed. Pass the server's --database-url
+  so the roster is seeded where the server reads it. Kiosk frames come from
+  --kiosk-image; "no face" answers count as handled, not as errors.
+
+Output: requests, req/s, p50/p95/p99/max latency, status codes and error
+reasons per scenario, plus new attendance rows per minute. The --max-*/--min-*
+gates make the exit status non-zero so CI can use it as a regression check.
+
+Usage:
+  python tools/load_test_attendance.py --duration 20 --kiosks 4 --manual 2 --students-readers 8 --parents 4
+  python tools/load_test_attendance.py --max-error-rate 0.01 --max-p95-ms 500 --min-marks-per-min 300 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import datetime
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROSTER_PREFIX = "77"
+TEACHER_PASSWORD = "load-test"
+PARENT_PASSWORD = "load-test"
+# 1x1 grey PNG; only used when --base-url is set without --kiosk-image.
+BLANK_FRAME = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAAAAAA6fptVAAAACklEQVR4nGNoAAAAggCBd81ytgAAAABJRU5ErkJggg=="
+)
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class RequestRecord:
+    status: int
+    seconds: float
+    error: Optional[str]
+    marked: bool = False
+
+
+@dataclass
+class ScenarioStats:
+    name: str
+    records: List[RequestRecord] = field(default_factory=list)
+    workers: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, record: RequestRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self, wall_seconds: float) -> Dict[str, object]:
+        total = len(self.records)
+        errors = [r for r in self.records if r.error]
+        latencies = sorted(r.seconds * 1000.0 for r in self.records)
+        return {
+            "scenario": self.name,
+            "workers": self.workers,
+            "requests": total,
+            "errors": len(errors),
+            "error_rate": round(len(errors) / total, 4) if total else 0.0,
+            "requests_per_sec": round(total / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+            "marked": sum(1 for r in self.records if r.marked),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "status_codes": dict(Counter(str(r.status) for r in self.records)),
+            "error_reasons": dict(Counter(r.error for r in errors).most_common(5)),
+        }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Response:
+    status: int
+    location: str
+    body: Optional[dict]
+
+
+class InProcessClient:
+    def __init__(self, flask_app):
+        self._client = flask_app.test_client()
+
+    def request(self, method: str, path: str, data=None, json_body=None) -> Response:
+        resp = self._client.open(path, method=method, data=data, json=json_body)
+        return Response(resp.status_code, resp.headers.get("Location", ""), resp.get_json(silent=True))
+
+
+class HttpClient:
+    def __init__(self, base_url: str, timeout: float):
+        import requests
+
+        self._session = requests.Session()
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+
+    def request(self, method: str, path: str, data=None, json_body=None) -> Response:
+        resp = self._session.request(
+            method, self._base_url + path, data=data, json=json_body, allow_redirects=False, timeout=self._timeout
+        )
+        try:
+            body = resp.json()
+        except ValueError:
+            body = None
+        return Response(resp.status_code, resp.headers.get("Location", ""), body)
+
+
+def _redirect_param(location: str, key: str) -> str:
+    return (parse_qs(urlparse(location).query).get(key) or [""])[0]
+
+
+# ---------------------------------------------------------------------------
+# Roster
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Roster:
+    student_ids: List[str]
+    teachers: List[str]
+    parents: List[str]
+    _next: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def next_student(self) -> str:
+        # Round-robin so marks spread over the roster, then turn into re-scans.
+        with self._lock:
+            sid = self.student_ids[self._next % len(self.student_ids)]
+            self._next += 1
+            return sid
+
+
+def seed_roster(app_module, students: int, teachers: int, parents: int) -> Roster:
+    """Insert (or reuse) the synthetic roster and clear today's marks for it."""
+    from models import Attendance, Student, User, db
+
+    student_ids = [f"{ROSTER_PREFIX}{i:06d}" for i in range(students)]
+    teacher_names = [f"lt_teacher{i}" for i in range(teachers)]
+    parent_names = [f"lt_parent{i}" for i in range(parents)]
+    today = datetime.date.today().strftime("%Y-%m-%d")
+
+    with app_module.app.app_context():
+        app_module.ensure_db_initialized()
+        existing = {
+            row.student_id for row in db.session.query(Student.student_id).filter(Student.student_id.in_(student_ids))
+        }
+        existing_users = {
+            (row.role, row.username, row.linked_student_id)
+            for row in db.session.query(User.role, User.username, User.linked_student_id).filter(
+                User.username.in_(student_ids + teacher_names + parent_names)
+            )
+        }
+
+        for i, sid in enumerate(student_ids):
+            if sid not in existing:
+                db.session.add(Student(student_id=sid, name=f"Load Student {i}", branch="CSE", year="2nd Year"))
+        db.session.flush()
+
+        def add_user(username, role, password, linked_student_id=None):
+            if (role, username, linked_student_id) not in existing_users:
+                db.session.add(
+                    User(username=username, role=role, password=password, name=username, linked_student_id=linked_student_id)
+                )
+
+        for sid in student_ids:
+            add_user(sid, "student", sid[-4:], sid)
+        for name in teacher_names:
+            add_user(name, "teacher", TEACHER_PASSWORD)
+        for i, name in enumerate(parent_names):
+            # Two children each, like most sibling accounts.
+            for sid in (student_ids[(2 * i) % students], student_ids[(2 * i + 1) % students]):
+                add_user(name, "parent", PARENT_PASSWORD, sid)
+
+        Attendance.query.filter(Attendance.date == today, Attendance.student_id.in_(student_ids)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    return Roster(student_ids, teacher_names, parent_names)
+
+
+def count_marks_today(app_module, roster: Roster) -> int:
+    from models import Attendance
+
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    with app_module.app.app_context():
+        return Attendance.query.filter(
+            Attendance.date == today, Attendance.student_id.in_(roster.student_ids)
+        ).count()
+
+
+def install_stand_in_recognizer(roster: Roster, recognize_ms: float) -> None:
+    """Replace model loading and LBPH prediction with a fixed delay that 'sees' the next student."""
+    import face
+
+    face.load_face_tools = lambda model_path: (object(), object(), None)
+    face.decode_data_url_frame = lambda image_data: object()
+
+    def recognize(frame, recognizer, face_detector, is_known_student, thresholds=None):
+        if recognize_ms > 0:
+            time.sleep(recognize_ms / 1000.0)
+        sid = roster.next_student()
+        if not is_known_student(sid):
+            return None, 80.0, "Recognized face does not match a valid student."
+        return sid, 42.0, None
+
+    face.recognize_student_with_lighting_fallback = recognize
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+
+def _timed(stats: ScenarioStats, call: Callable[[], Response], check: Callable[[Response], Optional[str]]) -> Response:
+    started = time.perf_counter()
+    try:
+        resp = call()
+    except Exception as exc:  # connection refused, timeouts, app exceptions in-process
+        stats.add(RequestRecord(0, time.perf_counter() - started, type(exc).__name__))
+        return Response(0, "", None)
+    elapsed = time.perf_counter() - started
+    error = check(resp)
+    marked = resp.status == 302 and _redirect_param(resp.location, "status") == "Attendance marked successfully."
+    if resp.body and resp.body.get("message") == "Attendance marked successfully.":
+        marked = True
+    stats.add(RequestRecord(resp.status, elapsed, error, marked))
+    return resp
+
+
+def _expect_redirect_to(prefix: str) -> Callable[[Response], Optional[str]]:
+    def check(resp: Response) -> Optional[str]:
+        if resp.status != 302:
+            return f"HTTP {resp.status}"
+        if not urlparse(resp.location).path.startswith(prefix):
+            return f"redirected to {urlparse(resp.location).path}"
+        return None
+
+    return check
+
+
+def _expect_ok(resp: Response) -> Optional[str]:
+    return None if resp.status == 200 else f"HTTP {resp.status}"
+
+
+def _check_manual(resp: Response) -> Optional[str]:
+    if resp.status != 302:
+        return f"HTTP {resp.status}"
+    return _redirect_param(resp.location, "error") or None
+
+
+def _check_verify(resp: Response) -> Optional[str]:
+    if resp.status != 200 or resp.body is None:
+        return f"HTTP {resp.status}"
+    # ok=false with a "no face"/"not recognized" message is the app handling the frame.
+    return None
+
+
+def _login(client, stats: ScenarioStats, path: str, form: dict, landing: str) -> bool:
+    resp = _timed(stats, lambda: client.request("POST", path, data=form), _expect_redirect_to(landing))
+    return resp.status == 302 and urlparse(resp.location).path.startswith(landing)
+
+
+def run_worker(kind: str, index: int, client, roster: Roster, stats: Dict[str, ScenarioStats], deadline: float,
+               think_seconds: float, frame: str) -> None:
+    login = stats["login"]
+    if kind in ("kiosk", "manual"):
+        teacher = roster.teachers[index % len(roster.teachers)]
+        if not _login(client, login, "/login/teacher", {"username": teacher, "password": TEACHER_PASSWORD},
+                      "/teacher/dashboard"):
+            return
+    elif kind == "student":
+        sid = roster.student_ids[(index * 7) % len(roster.student_ids)]
+        if not _login(client, login, "/login/student", {"student_id": sid, "password": sid[-4:]},
+                      "/student/dashboard"):
+            return
+    else:
+        parent = roster.parents[index % len(roster.parents)]
+        if not _login(client, login, "/login/parent", {"username": parent, "password": PARENT_PASSWORD},
+                      "/parent/dashboard"):
+            return
+
+    scenario = stats[kind]
+    turn = 0
+    while time.perf_counter() < deadline:
+        if kind == "kiosk":
+            payload = {"image": frame}
+            _timed(scenario, lambda: client.request("POST", "/teacher/face-attendance/verify", json_body=payload),
+                   _check_verify)
+        elif kind == "manual":
+            form = {"student_id": roster.next_student()}
+            _timed(scenario, lambda: client.request("POST", "/mark-attendance-manual", data=form), _check_manual)
+        elif kind == "student":
+            path = "/student/dashboard" if turn % 2 == 0 else "/student/attendance"
+            _timed(scenario, lambda: client.request("GET", path), _expect_ok)
+        else:
+            _timed(scenario, lambda: client.request("GET", "/parent/dashboard"), _expect_ok)
+        turn += 1
+        if think_seconds > 0:
+            time.sleep(think_seconds)
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _print_summary(summary: Dict[str, object]) -> None:
+    print(f"\n== {summary['scenario']} ({summary['workers']} workers) ==")
+    print(
+        f"requests: {summary['requests']}  errors: {summary['errors']} ({summary['error_rate'] * 100:.2f}%)  "
+        f"throughput: {summary['requests_per_sec']} req/s"
+    )
+    print(
+        f"latency: p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+        f"max={summary['max_ms']}ms"
+    )
+    print(f"status codes: {summary['status_codes']}")
+    if summary["marked"]:
+        print(f"new marks: {summary['marked']}")
+    reasons = summary["error_reasons"]
+    if reasons:
+        print("  error reasons:")
+        for reason, count in reasons.items():  # type: ignore[union-attr]
+            print(f"    {count:5d}  {reason}")
+
+
+def check_gates(args: argparse.Namespace, summaries: List[Dict[str, object]], marks_per_min: float) -> List[str]:
+    failures = []
+    for summary in summaries:
+        if not summary["requests"]:
+            continue
+        if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+            failures.append(f"{summary['scenario']}: error rate {summary['error_rate']} > {args.max_error_rate}")
+        if args.max_p95_ms is not None and summary["p95_ms"] > args.max_p95_ms:
+            failures.append(f"{summary['scenario']}: p95 {summary['p95_ms']}ms > {args.max_p95_ms}ms")
+    if args.min_marks_per_min is not None and marks_per_min < args.min_marks_per_min:
+        failures.append(f"marks/min {marks_per_min:.1f} < {args.min_marks_per_min}")
+    return failures
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of traffic after login")
+    parser.add_argument("--students", type=int, default=300, help="synthetic roster size")
+    parser.add_argument("--teachers", type=int, default=4, help="teacher accounts shared by kiosk/manual workers")
+    parser.add_argument("--kiosks", type=int, default=4, help="concurrent kiosk verify workers")
+    parser.add_argument("--manual", type=int, default=2, help="concurrent manual-mark workers")
+    parser.add_argument("--students-readers", type=int, default=8, help="concurrent student dashboard readers")
+    parser.add_argument("--parents", type=int, default=4, help="concurrent parent dashboard readers")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between requests per worker")
+    parser.add_argument("--recognize-ms", type=float, default=40.0, help="stand-in recognizer time (in-process)")
+    parser.add_argument("--database-url", help="target DB (default: temp SQLite); must match the server's")
+    parser.add_argument("--base-url", help="drive a running server over HTTP instead of in-process")
+    parser.add_argument("--kiosk-image", help="JPEG/PNG posted by kiosk workers in --base-url mode")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout per request (--base-url)")
+    parser.add_argument("--max-error-rate", type=float, help="fail if any scenario's error rate is above this")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if any scenario's p95 latency is above this")
+    parser.add_argument("--min-marks-per-min", type=float, help="fail if new attendance rows/min is below this")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON instead of text")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's error logging")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="load_attendance_")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    # Marking sends notifications inline; keep real providers out of a load test.
+    for key in ("SMTP_HOST", "TWILIO_ACCOUNT_SID", "SUPABASE_URL"):
+        os.environ.pop(key, None)
+
+    sys.path.insert(0, REPO_ROOT)
+    import app as app_module  # noqa: E402 - env must be set first
+
+    app_module.STUDENT_FILE = os.path.join(workdir, "student_data.json")
+    if not args.verbose:
+        app_module.app.logger.setLevel(logging.CRITICAL)
+
+    roster = seed_roster(app_module, max(args.students, 2), max(args.teachers, 1), max(args.parents, 1))
+
+    if args.base_url:
+        frame_bytes = open(args.kiosk_image, "rb").read() if args.kiosk_image else base64.b64decode(BLANK_FRAME)
+        mime = "image/png" if frame_bytes.startswith(b"\x89PNG") else "image/jpeg"
+        frame = f"data:{mime};base64,{base64.b64encode(frame_bytes).decode('ascii')}"
+
+        def make_client():
+            return HttpClient(args.base_url, args.timeout)
+    else:
+        frame = f"data:image/png;base64,{BLANK_FRAME}"
+        install_stand_in_recognizer(roster, args.recognize_ms)
+        app_module.app.test_client().get("/healthz")
+
+        def make_client():
+            return InProcessClient(app_module.app)
+
+    stats = {name: ScenarioStats(name) for name in ("login", "kiosk", "manual", "student", "parent")}
+    plan = [("kiosk", args.kiosks), ("manual", args.manual), ("student", args.students_readers), ("parent", args.parents)]
+    marks_before = count_marks_today(app_module, roster)
+
+    threads = []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    for kind, count in plan:
+        stats[kind].workers = count
+        stats["login"].workers += count
+        for index in range(count):
+            thread = threading.Thread(
+                target=run_worker,
+                args=(kind, index, make_client(), roster, stats, deadline, args.think_ms / 1000.0, frame),
+                name=f"{kind}-{index}",
+                daemon=True,
+            )
+            threads.append(thread)
+            thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    new_marks = count_marks_today(app_module, roster) - marks_before
+    marks_per_min = new_marks / wall * 60.0 if wall > 0 else 0.0
+    summaries = [stats[name].summary(wall) for name in stats if stats[name].workers]
+    totals = {
+        "wall_seconds": round(wall, 3),
+        "roster": len(roster.student_ids),
+        "new_marks": new_marks,
+        "marks_per_min": round(marks_per_min, 1),
+        "target": args.base_url or "in-process",
+        "database": app_module.app.config["SQLALCHEMY_DATABASE_URI"].split("@")[-1],
+    }
+    if not args.base_url:
+        with app_module.app.app_context():
+            totals["db_pool"] = app_module.db.engine.pool.status()
+
+    failures = check_gates(args, summaries, marks_per_min)
+    if args.json:
+        print(json.dumps({"scenarios": summaries, "totals": totals, "gate_failures": failures}, indent=2))
+    else:
+        for summary in summaries:
+            _print_summary(summary)
+        print(f"\ntotals: {totals}")
+        for failure in failures:
+            print(f"GATE FAILED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,21 +1,86 @@
-import cv2
-import numpy as np
-import os
-
-dataset_path = "dataset"
-recognizer = cv2.face.LBPHFaceRecognizer_create()
-
-faces = []
-labels = []
-
-for student_id in os.listdir(dataset_path):
-    for img in os.listdir(f"{dataset_path}/{student_id}"):
-        img_path = f"{dataset_path}/{student_id}/{img}"
-        gray = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-        faces.append(gray)
-        labels.append(int(student_id))
-
-recognizer.train(faces, np.array(labels))
-recognizer.save("model/face_model.xml")
-
-print("Model trained & saved successfully!")
+import os
+
+import cv2
+import numpy as np
+
+import face_dataset
+
+dataset_path = "dataset"
+model_path = "model/face_model.xml"
+
+
+def load_student_sections():
+    """{section: (branch, year, student IDs)} from the students table ({} if it cannot be read)."""
+    try:
+        from app import app, ensure_db_initialized
+        from models import Student, db
+
+        with app.app_context():
+            ensure_db_initialized()
+            rows = db.session.query(Student.student_id, Student.branch, Student.year).all()
+    except Exception as exc:
+        print(f"Skipping section models: could not read students ({exc}).")
+        return {}
+    sections = {}
+    for student_id, branch, year in rows:
+        key = face_dataset.section_key(branch, year)
+        if key:
+            sections.setdefault(key, (branch.strip(), year.strip(), set()))[2].add(str(student_id))
+    return sections
+
+
+# Older captures are folders of JPEG crops; pack them once.
+packed = face_dataset.pack_legacy_folders(dataset_path)
+if packed:
+    print(f"Packed image folders into the dataset: {', '.join(packed)}")
+
+# Crops are stored normalized in one memory-mapped array: nothing to decode here.
+faces, labels = face_dataset.load_faces(dataset_path)
+if not labels:
+    raise SystemExit("No face samples found. Run capture_faces.py first.")
+
+label_ids = np.array([int(label) for label in labels], dtype=np.int32)
+
+# Calibrate per-student thresholds on crops the model has not seen, then train on everything.
+holdout = face_dataset.holdout_mask(labels)
+thresholds, stats = {}, {"holdout": 0, "genuine_rate": None}
+if holdout.any() and not holdout.all():
+    calibration = cv2.face.LBPHFaceRecognizer_create()
+    calibration.train([faces[i] for i in np.flatnonzero(~holdout)], label_ids[~holdout])
+    thresholds, stats = face_dataset.calibrate_thresholds(calibration, faces, labels, holdout)
+
+recognizer = cv2.face.LBPHFaceRecognizer_create()
+recognizer.train(list(faces), label_ids)
+os.makedirs(os.path.dirname(model_path), exist_ok=True)
+recognizer.save(model_path)
+face_dataset.save_thresholds(model_path, thresholds, stats)
+
+print(f"Model trained on {len(labels)} samples from {len(set(labels))} students & saved successfully!")
+# One smaller model per section, so a kiosk set to a section only searches its students.
+label_array = np.asarray(labels)
+shard_index = {}
+for key, (branch, year, student_ids) in sorted(load_student_sections().items()):
+    rows = np.flatnonzero(np.isin(label_array, sorted(student_ids)))
+    if not rows.size:
+        continue
+    shard = cv2.face.LBPHFaceRecognizer_create()
+    shard.train([faces[i] for i in rows], label_ids[rows])
+    shard_path = face_dataset.shard_model_path(model_path, key)
+    os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+    shard.save(shard_path)
+    shard_index[key] = {
+        "branch": branch,
+        "year": year,
+        "students": len(set(label_array[rows])),
+        "samples": int(rows.size),
+    }
+face_dataset.save_shard_index(model_path, shard_index)
+
+if stats["holdout"]:
+    print(
+        f"Calibrated thresholds for {len(thresholds)} students on {stats['holdout']} held-out samples "
+        f"({stats['genuine_rate']:.0%} matched the right student)."
+    )
+if shard_index:
+    summary = ", ".join(f"{key} ({info['students']} students)" for key, info in shard_index.items())
+    print(f"Section models: {summary}")